@@ -1,13 +1,28 @@
 import os
+import json
+import asyncio
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from PIL import Image
-import io
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
 
 from .services.embedding_service import EmbeddingService
-from .services.redis_service import RedisService
-from .security.validators import validate_image_file, validate_text_input
+from .services.redis_service import RedisService, AsyncRedisService
+from .services.embedding_batcher import EmbeddingBatcher
+from .services.vector_index import LocalVectorIndex
+from .services.embedding_store import EmbeddingStore
+from .services.startup import StartupState
+from .services.metrics import MetricsRegistry, MetricsMiddleware, CONTENT_TYPE
+from .services.cache import (
+    TieredCache, IndexGeneration, ImageEmbeddingCache,
+    normalize_query, encode_embedding, decode_embedding, content_hash, perceptual_hash
+)
+from .security.validators import (
+    read_image_upload, validate_text_input, validate_search_filters, validate_ef_runtime
+)
 
 app = FastAPI(title="Avatar Service API", version="1.0.0")
 
@@ -19,53 +34,492 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas en formato Prometheus expuestas en /metrics
+metrics = MetricsRegistry()
+http_requests = metrics.counter(
+    "avatar_http_requests_total", "Peticiones HTTP atendidas", ["method", "path", "status"]
+)
+http_request_seconds = metrics.histogram(
+    "avatar_http_request_duration_seconds", "Duración de las peticiones HTTP", ["method", "path"]
+)
+stage_seconds = metrics.histogram(
+    "avatar_stage_duration_seconds",
+    "Duración de cada fase de una búsqueda (validate, decode, embed, search, serialize)",
+    ["endpoint", "stage"]
+)
+embedding_batch_size = metrics.histogram(
+    "avatar_embedding_batch_size", "Consultas por forward de CLIP", ["kind"], buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+app.add_middleware(MetricsMiddleware, requests=http_requests, latency=http_request_seconds, routes=app.routes)
+
+startup_state = StartupState()
 embedding_service = EmbeddingService()
 redis_service = RedisService(
     host=os.environ.get("REDIS_HOST", "localhost"),
     port=int(os.environ.get("REDIS_PORT", 6379))
 )
+async_redis_service = AsyncRedisService(
+    host=os.environ.get("REDIS_HOST", "localhost"),
+    port=int(os.environ.get("REDIS_PORT", 6379)),
+    max_connections=int(os.environ.get("REDIS_POOL_SIZE", 20))
+)
+
+# Executor dedicado para el trabajo de CPU (decodificación y CLIP) fuera del event loop
+embedding_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("EMBEDDING_WORKERS", 2)),
+    thread_name_prefix="embedding"
+)
+
+# Agrupación de consultas concurrentes en un solo forward de CLIP
+USE_BATCHING = os.environ.get("EMBEDDING_BATCHING", "true").lower() == "true"
+embedding_batcher = EmbeddingBatcher(
+    embedding_service,
+    embedding_executor,
+    max_batch_size=int(os.environ.get("BATCH_MAX_SIZE", 16)),
+    max_wait_ms=float(os.environ.get("BATCH_MAX_WAIT_MS", 5)),
+    on_batch=lambda kind, size: embedding_batch_size.observe(size, kind=kind)
+)
+
+# Motor de búsqueda vectorial: RediSearch ("redis") o índice NumPy en proceso ("local")
+SEARCH_ENGINE = os.environ.get("SEARCH_ENGINE", "redis")
+
+# Cachés de embeddings de texto y de resultados, con nivel Redis opcional compartido. El
+# nombre (prefijo de las claves en Redis) incluye la versión del modelo y, en los
+# resultados, el motor: réplicas con otro backend o motor no comparten entradas
+shared_cache = async_redis_service if os.environ.get("QUERY_CACHE_REDIS", "false").lower() == "true" else None
+text_embedding_cache = TieredCache(
+    f"text_embedding:{embedding_service.model_version}",
+    max_entries=int(os.environ.get("QUERY_CACHE_SIZE", 1024)),
+    ttl=int(os.environ.get("QUERY_CACHE_TTL", 3600)),
+    redis_service=shared_cache,
+    encode=encode_embedding,
+    decode=decode_embedding
+)
+search_result_cache = TieredCache(
+    f"search_result:{SEARCH_ENGINE}:{embedding_service.model_version}",
+    max_entries=int(os.environ.get("RESULT_CACHE_SIZE", 1024)),
+    ttl=int(os.environ.get("RESULT_CACHE_TTL", 300)),
+    redis_service=shared_cache
+)
+image_embedding_cache = ImageEmbeddingCache(
+    max_entries=int(os.environ.get("IMAGE_CACHE_SIZE", 512)),
+    perceptual=os.environ.get("IMAGE_CACHE_PERCEPTUAL", "false").lower() == "true",
+    max_distance=int(os.environ.get("IMAGE_CACHE_MAX_DISTANCE", 4))
+)
+index_generation = IndexGeneration(async_redis_service, on_change=search_result_cache.local.clear)
+
+local_index = LocalVectorIndex(
+    mode=os.environ.get("LOCAL_INDEX_MODE", "exact"),
+    n_lists=int(os.environ.get("LOCAL_INDEX_LISTS", 0)),
+    n_probe=int(os.environ.get("LOCAL_INDEX_PROBES", 8)),
+    mmap_path=os.environ.get("LOCAL_INDEX_MMAP") or None
+)
+# Origen del índice local: los hashes de Redis ("redis") o el almacén de embeddings en disco ("store")
+LOCAL_INDEX_SOURCE = os.environ.get("LOCAL_INDEX_SOURCE", "redis")
+# Se crea en startup para que quede ligado al event loop del servidor
+local_index_lock = None
+
+# Número máximo de consultas de una petición a /search/batch
+MAX_BATCH_QUERIES = int(os.environ.get("BATCH_SEARCH_MAX_QUERIES", 32))
+
+def cache_stats():
+    return {
+        "text_embedding": text_embedding_cache.get_stats(),
+        "search_result": search_result_cache.get_stats(),
+        "image_embedding": image_embedding_cache.get_stats()
+    }
+
+def cache_lookups(stats):
+    stats = stats.get("exact", stats)
+    return stats["hits"] + stats["misses"]
+
+# Estadísticas que ya llevan las cachés y el pool de Redis, leídas solo al exponer /metrics
+metrics.callback(
+    "avatar_cache_hit_ratio", "Proporción de aciertos de cada caché",
+    lambda: {(name,): stats["hit_ratio"] for name, stats in cache_stats().items()}, labelnames=["cache"]
+)
+metrics.callback(
+    "avatar_cache_lookups_total", "Consultas a cada caché",
+    lambda: {(name,): cache_lookups(stats) for name, stats in cache_stats().items()},
+    kind="counter", labelnames=["cache"]
+)
+metrics.callback(
+    "avatar_redis_pool_connections", "Conexiones del pool asyncio de Redis",
+    lambda: {(state,): value for state, value in async_redis_service.get_pool_stats().items()},
+    labelnames=["state"]
+)
+metrics.callback("avatar_ready", "1 si el modelo y el índice están listos", lambda: int(startup_state.ready))
+
+def timed_json_response(endpoint, content):
+    with stage_seconds.time(endpoint=endpoint, stage="serialize"):
+        return JSONResponse(content=content)
+
+async def run_embedding(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(embedding_executor, fn, *args)
+
+async def embed_text(text):
+    if USE_BATCHING:
+        return await embedding_batcher.get_text_embedding(text)
+    return await run_embedding(embedding_service.get_text_embedding, text)
+
+async def embed_image(image_data):
+    if USE_BATCHING:
+        return await embedding_batcher.get_image_embedding(image_data)
+    return await run_embedding(embedding_service.get_image_embedding, image_data)
+
+async def cached_image_embedding(contents):
+    """Embedding de una imagen subida, reutilizando el de una subida idéntica o casi idéntica"""
+    digest = content_hash(contents)
+    embedding = image_embedding_cache.get(digest)
+    if embedding is not None:
+        return embedding
+        
+    # Decodificar fuera del event loop, ya reducida cerca de la resolución del modelo
+    try:
+        with stage_seconds.time(endpoint="image", stage="decode"):
+            image = await run_in_threadpool(embedding_service.load_image, contents)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Could not decode image")
+        
+    phash = None
+    if image_embedding_cache.perceptual is not None:
+        phash = await run_in_threadpool(perceptual_hash, image)
+        embedding = image_embedding_cache.get_perceptual(phash)
+        if embedding is not None:
+            image_embedding_cache.set(digest, embedding)
+            return embedding
+            
+    with stage_seconds.time(endpoint="image", stage="embed"):
+        embedding = await embed_image(image)
+    image_embedding_cache.set(digest, embedding, phash)
+    return embedding
+
+def load_local_index(generation):
+    if LOCAL_INDEX_SOURCE == "store":
+        store = EmbeddingStore(embedding_service.model_version)
+        if store.open():
+            return local_index.load_from_store(store, generation)
+        print(f"No hay un almacén de embeddings en {store.directory}, el índice local se carga desde Redis")
+    local_index.load_from_redis(redis_service, generation)
+
+async def refresh_local_index():
+    """Recarga el índice local (desde Redis o el almacén de embeddings) cuando cambia la generación del índice"""
+    generation = await index_generation.current()
+    if local_index.generation == generation:
+        return
+    # Mientras otra petición recarga se sigue buscando sobre la instantánea anterior
+    if local_index_lock.locked() and local_index.loaded:
+        return
+    async with local_index_lock:
+        if local_index.generation != generation:
+            await run_in_threadpool(load_local_index, generation)
+
+async def find_similar_avatars(embedding, top_k, filters=None, ef_runtime=None):
+    if SEARCH_ENGINE == "local":
+        await refresh_local_index()
+        return await run_in_threadpool(local_index.search, embedding, top_k, filters)
+    return await async_redis_service.find_similar_avatars(embedding, top_k, filters, ef_runtime)
+
+async def find_similar_avatars_batch(searches):
+    if SEARCH_ENGINE == "local":
+        await refresh_local_index()
+        return await run_in_threadpool(
+            lambda: [local_index.search(search["embedding"], search["top_k"], search["filters"]) for search in searches]
+        )
+    return await async_redis_service.find_similar_avatars_batch(searches)
+
+def search_options_key(filters, ef_runtime):
+    """Parte de la clave de caché de resultados que depende de los filtros y de EF_RUNTIME"""
+    parts = [f"{field}={','.join(sorted(values)) if isinstance(values, list) else values}"
+             for field, values in sorted(filters.items())]
+    parts.append(f"ef={ef_runtime or ''}")
+    return "&".join(parts)
+
+def result_cache_key(generation, top_k, filters, ef_runtime, query_key):
+    # Los resultados se indexan por generación: tras load_avatars las entradas viejas dejan de usarse
+    return f"{generation}:{top_k}:{search_options_key(filters, ef_runtime)}:{query_key}"
+
+def query_error(error):
+    if isinstance(error, HTTPException):
+        return {"status_code": error.status_code, "detail": error.detail}
+    return {"status_code": 500, "detail": str(error)}
+
+def parse_batch_query(query, images):
+    """Valida una consulta de /search/batch; images son los ficheros subidos ya leídos"""
+    if not isinstance(query, dict):
+        raise HTTPException(status_code=400, detail="Each query must be an object")
+    top_k = query.get("top_k", 5)
+    if not isinstance(top_k, int) or top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be a positive integer")
+    for field in ("age_min", "age_max", "ef_runtime"):
+        if query.get(field) is not None and not isinstance(query[field], int):
+            raise HTTPException(status_code=400, detail=f"{field} must be an integer")
+    # Los filtros de atributos admiten una cadena separada por comas o una lista
+    tag_filters = [",".join(value) if isinstance(value, list) else value
+                   for value in (query.get("gender"), query.get("race"), query.get("job"))]
+    item = {
+        "top_k": top_k,
+        "filters": validate_search_filters(*tag_filters, query.get("age_min"), query.get("age_max")),
+        "ef_runtime": validate_ef_runtime(query.get("ef_runtime"))
+    }
+    
+    if isinstance(query.get("text"), str):
+        item["text"] = validate_text_input(query["text"])
+        item["query_key"] = normalize_query(item["text"])
+    elif "image" in query:
+        index = query["image"]
+        if not isinstance(index, int) or not 0 <= index < len(images):
+            raise HTTPException(status_code=400, detail="image must be the index of an uploaded file")
+        if isinstance(images[index], Exception):
+            raise images[index]
+        item["image"] = images[index]
+    else:
+        raise HTTPException(status_code=400, detail="Each query needs a text or an image")
+    return item
+
+async def embed_batch_queries(items):
+    """
+    Asigna el embedding de cada consulta del lote.
+    
+    Los que no están en caché se calculan con un único forward de CLIP por modalidad;
+    un fallo solo marca como erróneas las consultas afectadas.
+    """
+    texts = {}
+    images = {}
+    for item in items:
+        if "text" in item:
+            item["embedding"] = await text_embedding_cache.get(item["query_key"])
+            if item["embedding"] is None:
+                texts.setdefault(item["query_key"], item["text"])
+        else:
+            item["digest"] = content_hash(item["image"])
+            item["embedding"] = image_embedding_cache.get(item["digest"])
+            if item["embedding"] is None:
+                images.setdefault(item["digest"], item["image"])
+                
+    embeddings = {}
+    if texts:
+        embedding_batch_size.observe(len(texts), kind="text")
+        try:
+            matrix = await run_embedding(embedding_service.get_text_embeddings, list(texts.values()))
+            for query_key, embedding in zip(texts, matrix):
+                embeddings[query_key] = embedding
+                await text_embedding_cache.set(query_key, embedding)
+        except Exception as e:
+            embeddings.update((query_key, e) for query_key in texts)
+    if images:
+        embedding_batch_size.observe(len(images), kind="image")
+        try:
+            # Las imágenes que no se pueden decodificar quedan como filas NaN
+            matrix = await run_embedding(
+                embedding_service.get_image_embeddings, list(images.values()), len(images), 4, True
+            )
+            for digest, embedding in zip(images, matrix):
+                if np.isnan(embedding).any():
+                    embeddings[digest] = HTTPException(status_code=400, detail="Could not decode image")
+                else:
+                    embeddings[digest] = embedding
+                    image_embedding_cache.set(digest, embedding)
+        except Exception as e:
+            embeddings.update((digest, e) for digest in images)
+            
+    for item in items:
+        if item["embedding"] is None:
+            embedding = embeddings[item["query_key"] if "text" in item else item["digest"]]
+            if isinstance(embedding, Exception):
+                item["error"] = query_error(embedding)
+            else:
+                item["embedding"] = embedding
+
+def initialize_model():
+    with startup_state.phase("model_load"):
+        embedding_service.initialize()
+    with startup_state.phase("warm_up"):
+        embedding_service.warm_up()
+
+async def prepare_service():
+    """Carga el modelo y el índice en segundo plano; /ready cambia a 200 al terminar"""
+    try:
+        await run_embedding(initialize_model)
+        startup_state.model_ready = True
+        
+        if os.environ.get("LOAD_AVATARS_IN_APP", "false").lower() == "true":
+            from .start import load_initial_avatars
+            with startup_state.phase("avatar_load"):
+                await run_in_threadpool(load_initial_avatars, embedding_service=embedding_service)
+                
+        startup_state.index_ready = await run_in_threadpool(redis_service.index_available)
+        if SEARCH_ENGINE == "local":
+            with startup_state.phase("local_index_load"):
+                await refresh_local_index()
+        if startup_state.ready:
+            startup_state.mark_ready()
+    except Exception as e:
+        startup_state.error = str(e)
+        print(f"[startup] failed: {str(e)}")
+
+def ensure_model_ready():
+    if not startup_state.model_ready:
+        raise HTTPException(status_code=503, detail="Model is still loading")
 
 @app.on_event("startup")
 async def startup():
-    embedding_service.initialize()
-    redis_service.connect()
-    redis_service.create_vector_index()
+    global local_index_lock
+    local_index_lock = asyncio.Lock()
+    with startup_state.phase("redis_connect"):
+        redis_service.connect()
+        redis_service.create_vector_index()
+        await async_redis_service.connect()
+    if USE_BATCHING:
+        embedding_batcher.start()
+    app.state.prepare_task = asyncio.create_task(prepare_service())
 
 @app.on_event("shutdown")
 async def shutdown():
+    if USE_BATCHING:
+        await embedding_batcher.stop()
     redis_service.close()
+    await async_redis_service.close()
+    embedding_executor.shutdown(wait=False)
 
 @app.post("/search/image")
-async def search_by_image(file: UploadFile = File(...), top_k: int = Form(5)):
+async def search_by_image(
+    file: UploadFile = File(...),
+    top_k: int = Form(5),
+    gender: Optional[str] = Form(None),
+    race: Optional[str] = Form(None),
+    job: Optional[str] = Form(None),
+    age_min: Optional[int] = Form(None),
+    age_max: Optional[int] = Form(None),
+    ef_runtime: Optional[int] = Form(None)
+):
+    ensure_model_ready()
+    with stage_seconds.time(endpoint="image", stage="validate"):
+        filters = validate_search_filters(gender, race, job, age_min, age_max)
+        ef_runtime = validate_ef_runtime(ef_runtime)
+        contents = await read_image_upload(file)
     try:
-        file = validate_image_file(file)
-        
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents)).convert("RGB")
+        embedding = await cached_image_embedding(contents)
         
-        embedding = embedding_service.get_image_embedding(image)
+        with stage_seconds.time(endpoint="image", stage="search"):
+            similar_avatars = await find_similar_avatars(embedding, top_k, filters, ef_runtime)
         
-        similar_avatars = redis_service.find_similar_avatars(embedding, top_k)
-        
-        return JSONResponse(content=similar_avatars)
+        return timed_json_response("image", similar_avatars)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/search/text")
-async def search_by_text(description: str = Form(...), top_k: int = Form(5)):
-    try:
+async def search_by_text(
+    description: str = Form(...),
+    top_k: int = Form(5),
+    gender: Optional[str] = Form(None),
+    race: Optional[str] = Form(None),
+    job: Optional[str] = Form(None),
+    age_min: Optional[int] = Form(None),
+    age_max: Optional[int] = Form(None),
+    ef_runtime: Optional[int] = Form(None)
+):
+    ensure_model_ready()
+    with stage_seconds.time(endpoint="text", stage="validate"):
+        filters = validate_search_filters(gender, race, job, age_min, age_max)
+        ef_runtime = validate_ef_runtime(ef_runtime)
         description = validate_text_input(description)
+    try:
+        query_key = normalize_query(description)
         
-        embedding = embedding_service.get_text_embedding(description)
+        generation = await index_generation.current()
+        result_key = result_cache_key(generation, top_k, filters, ef_runtime, query_key)
+        similar_avatars = await search_result_cache.get(result_key)
+        if similar_avatars is not None:
+            return timed_json_response("text", similar_avatars)
+            
+        embedding = await text_embedding_cache.get(query_key)
+        if embedding is None:
+            with stage_seconds.time(endpoint="text", stage="embed"):
+                embedding = await embed_text(description)
+            await text_embedding_cache.set(query_key, embedding)
         
-        similar_avatars = redis_service.find_similar_avatars(embedding, top_k)
+        with stage_seconds.time(endpoint="text", stage="search"):
+            similar_avatars = await find_similar_avatars(embedding, top_k, filters, ef_runtime)
+        await search_result_cache.set(result_key, similar_avatars)
         
-        return JSONResponse(content=similar_avatars)
+        return timed_json_response("text", similar_avatars)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/search/batch")
+async def search_batch(queries: str = Form(...), files: List[UploadFile] = File(None)):
+    """
+    Varias búsquedas en una sola petición.
+    
+    queries es una lista JSON de consultas {"text": ...} o {"image": <índice en files>}
+    con top_k, filtros y ef_runtime opcionales. La respuesta mantiene el orden: cada
+    elemento es {"results": [...]} o {"error": {...}} si esa consulta ha fallado.
+    """
+    ensure_model_ready()
+    with stage_seconds.time(endpoint="batch", stage="validate"):
+        try:
+            queries = json.loads(queries)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="queries must be a JSON list")
+        if not isinstance(queries, list) or not queries:
+            raise HTTPException(status_code=400, detail="queries must be a non-empty JSON list")
+        if len(queries) > MAX_BATCH_QUERIES:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+            
+        images = []
+        for file in files or []:
+            try:
+                images.append(await read_image_upload(file))
+            except Exception as e:
+                images.append(e)
+                
+        items = []
+        for query in queries:
+            try:
+                items.append(parse_batch_query(query, images))
+            except Exception as e:
+                items.append({"error": query_error(e)})
+            
+    generation = await index_generation.current()
+    for item in items:
+        if "text" in item:
+            item["result_key"] = result_cache_key(
+                generation, item["top_k"], item["filters"], item["ef_runtime"], item["query_key"]
+            )
+            item["results"] = await search_result_cache.get(item["result_key"])
+            
+    pending = [item for item in items if "error" not in item and item.get("results") is None]
+    if pending:
+        # Incluye la decodificación de las imágenes, que se hace dentro del forward por lotes
+        with stage_seconds.time(endpoint="batch", stage="embed"):
+            await embed_batch_queries(pending)
+        
+    searches = [item for item in pending if "error" not in item]
+    if searches:
+        try:
+            with stage_seconds.time(endpoint="batch", stage="search"):
+                results = await find_similar_avatars_batch(searches)
+        except Exception as e:
+            results = [e] * len(searches)
+        for item, result in zip(searches, results):
+            if isinstance(result, Exception):
+                item["error"] = query_error(result)
+                continue
+            item["results"] = result
+            if "result_key" in item:
+                await search_result_cache.set(item["result_key"], result)
+                
+    return timed_json_response("batch", [
+        {"error": item["error"]} if "error" in item else {"results": item["results"]}
+        for item in items
+    ])
+
 @app.post("/admin/load-avatars")
-async def run_load_avatars(password: str = Form(...)):
+async def run_load_avatars(password: str = Form(...), mode: str = Form("sync")):
     admin_password = os.environ.get("ADMIN_PASSWORD", "admin")
     if password != admin_password:
         raise HTTPException(status_code=403, detail="Unauthorized")
@@ -75,11 +529,42 @@ async def run_load_avatars(password: str = Form(...)):
         avatars_dir = os.environ.get("AVATARS_DIR", "./assets/avatars")
         metadata_file = os.environ.get("METADATA_FILE", "./assets/metadata.json")
         
-        load_avatars(avatars_dir, metadata_file)
-        return {"status": "success", "message": "Avatars loaded successfully"}
+        summary = await run_in_threadpool(
+            load_avatars, avatars_dir, metadata_file, mode=mode,
+            embedding_service=embedding_service if startup_state.model_ready else None
+        )
+        return {"status": "success", "message": "Avatars loaded successfully", "summary": summary}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "batcher": embedding_batcher.get_stats(),
+        "search_engine": SEARCH_ENGINE,
+        "local_index": local_index.get_stats() if SEARCH_ENGINE == "local" else None,
+        "cache": {
+            "index_generation": index_generation.value,
+            "text_embeddings": text_embedding_cache.get_stats(),
+            "search_results": search_result_cache.get_stats(),
+            "image_embeddings": image_embedding_cache.get_stats()
+        }
+    }
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/ready")
+async def readiness_check():
+    # Si el índice no existía al terminar el arranque se vuelve a comprobar en cada sondeo
+    if startup_state.model_ready and not startup_state.index_ready and startup_state.current_phase is None:
+        startup_state.index_ready = await run_in_threadpool(redis_service.index_available)
+        if startup_state.ready:
+            startup_state.mark_ready()
+    status_code = 200 if startup_state.ready else 503
+    return JSONResponse(status_code=status_code, content=startup_state.as_dict())
\ No newline at end of file
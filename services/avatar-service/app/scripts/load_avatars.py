@@ -1,158 +1,588 @@
 import os
 import glob
 import json
-import uuid
+import time
+import hashlib
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 
-def load_avatars(avatars_dir, metadata_file=None):
-    from ..services.embedding_service import EmbeddingService
+# Modelo y banco de prompts propios de cada proceso del pool de ingesta paralela
+_worker_state = {}
+
+def find_image_files(avatars_dir):
+    return glob.glob(os.path.join(avatars_dir, "*.jpg")) + \
+           glob.glob(os.path.join(avatars_dir, "*.png")) + \
+           glob.glob(os.path.join(avatars_dir, "*.jpeg"))
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """Identificador de avatar derivado del contenido del fichero"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+def read_metadata(metadata_file):
+    if metadata_file and os.path.exists(metadata_file):
+        try:
+            with open(metadata_file) as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"ERROR al leer metadatos de {metadata_file}: {str(e)}")
+    return {}
+
+def write_json_atomic(path, data):
+    """Escribe JSON en un fichero temporal y lo renombra: el fichero nunca queda a medias"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class IngestCheckpoint:
+    """
+    Registro en JSON por líneas de los avatares ya almacenados en Redis durante una carga.
+    
+    La primera línea describe la carga ({"mode": ...}) y cada lote escrito añade una
+    línea por avatar con su id, fichero y metadatos. Si la carga se interrumpe, la
+    siguiente ejecución lo lee y continúa sin volver a calcular esos embeddings.
+    Las líneas incompletas (una caída a mitad de escritura) se ignoran.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.mode = None
+        self.entries = {}
+        
+    def load(self):
+        self.mode = None
+        self.entries = {}
+        if not os.path.exists(self.path):
+            return self.entries
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if "mode" in entry:
+                    self.mode = entry["mode"]
+                else:
+                    self.entries[entry["avatar_id"]] = entry
+        return self.entries
+        
+    def start(self, mode):
+        """Empieza una carga nueva salvo que se esté reanudando una del mismo modo"""
+        if self.mode == mode and os.path.exists(self.path):
+            return
+        self.mode = mode
+        self.entries = {}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as f:
+            f.write(json.dumps({"mode": mode, "started_at": time.time()}) + "\n")
+            
+    def append(self, entries):
+        with open(self.path, "a") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+                self.entries[entry["avatar_id"]] = entry
+            f.flush()
+            os.fsync(f.fileno())
+            
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def load_avatars(avatars_dir, metadata_file=None, mode=None, embedding_service=None):
+    """
+    Indexa los avatares de avatars_dir en Redis.
+    
+    En modo "sync" (por defecto) los avatares se identifican por el hash de su contenido
+    y solo se procesan los ficheros nuevos o modificados; los renombrados solo actualizan
+    su nombre de fichero y se eliminan las claves de los ficheros que ya no existen. En
+    modo "full" se borra todo y se reindexa el directorio.
+    Devuelve un resumen con las claves added/updated/renamed/removed/skipped.
+    Si se pasa un embedding_service ya inicializado se reutiliza su modelo.
+    
+    Los avatares se procesan como un flujo de lotes (decodificar, calcular embeddings,
+    clasificar, escribir) y cada lote almacenado se anota en un checkpoint
+    (INGEST_CHECKPOINT, por defecto <metadata_file>.checkpoint.jsonl). Si la carga se
+    interrumpe, la siguiente ejecución continúa desde ese punto; los metadatos se
+    escriben de forma atómica al terminar y el checkpoint se borra.
+    
+    Los embeddings calculados se guardan además en el almacén en disco (EmbeddingStore,
+    desactivable con EMBEDDING_STORE=false). Los avatares que ya están en él no vuelven
+    a pasar por el modelo, y en modo "restore" Redis se repuebla solo desde el almacén.
+    """
     from ..services.redis_service import RedisService
+    from ..services.embedding_service import EmbeddingService
     
-    # Inicializar servicio de embeddings
-    print("Inicializando modelo CLIP...")
-    embedding_service = EmbeddingService()
-    embedding_service.initialize()
-    print("Modelo CLIP inicializado correctamente")
+    mode = mode or os.environ.get("LOAD_AVATARS_MODE", "sync")
+    if mode == "restore":
+        return restore_avatars(metadata_file, embedding_service)
+    summary = {"added": 0, "updated": 0, "renamed": 0, "removed": 0, "skipped": 0, "failed": 0}
     
     # Inicializar servicio de Redis
     redis_service = RedisService(
         host=os.environ.get("REDIS_HOST", "localhost"),
-        port=int(os.environ.get("REDIS_PORT", 6379))
+        port=int(os.environ.get("REDIS_PORT", 6379)),
+        write_chunk_size=int(os.environ.get("REDIS_WRITE_CHUNK_SIZE", 500))
     )
     redis_service.connect()
     redis_service.create_vector_index()
     
-    # Inicializar nuevo diccionario de metadatos (siempre vacío para generar nuevos)
-    metadata = {}
-    print("Se generarán metadatos nuevos para todas las imágenes")
-    
     # Buscar imágenes de avatares
-    image_files = glob.glob(os.path.join(avatars_dir, "*.jpg")) + \
-                  glob.glob(os.path.join(avatars_dir, "*.png")) + \
-                  glob.glob(os.path.join(avatars_dir, "*.jpeg"))
+    image_files = find_image_files(avatars_dir)
     
     print(f"Encontradas {len(image_files)} imágenes de avatares")
     
     # Si no hay imágenes, salir
     if not image_files:
         print(f"¡ERROR! No se encontraron imágenes en {avatars_dir}")
-        return
-    
-    # Opciones para clasificación automática con CLIP
-    categories = {
-        "gender": ["male", "female"],
-        "race": ["human", "elf", "dwarf", "orc", "undead"],
-        "job": ["warrior", "mage", "archer", "rogue", "paladin"]
-    }
-    age_ranges = {
-        "young": 20,
-        "adult": 30,
-        "middle-aged": 45,
-        "elderly": 60
-    }
-    
-    # Limpiar avatares existentes en Redis
-    print("Eliminando avatares existentes en Redis...")
-    existing_keys = redis_service.client.keys("avatar:*")
-    if existing_keys:
-        for key in existing_keys:
-            redis_service.client.delete(key)
-        print(f"Eliminados {len(existing_keys)} avatares existentes")
-    else:
-        print("No se encontraron avatares existentes en Redis")
-    
-    # Procesar cada imagen
+        redis_service.close()
+        return summary
+        
+    # Calcular el identificador de cada imagen a partir de su contenido
+    file_ids = {}
     for img_path in image_files:
-        filename = os.path.basename(img_path)
-        avatar_id = str(uuid.uuid4())
+        avatar_id = hash_file(img_path)
+        if avatar_id in file_ids:
+            print(f"{os.path.basename(img_path)} es un duplicado de {os.path.basename(file_ids[avatar_id])}, se omite")
+            summary["skipped"] += 1
+            continue
+        file_ids[avatar_id] = img_path
         
-        print(f"Procesando avatar: {filename}")
+    checkpoint_path = os.environ.get("INGEST_CHECKPOINT") or (
+        f"{metadata_file}.checkpoint.jsonl" if metadata_file else None
+    )
+    checkpoint = IngestCheckpoint(checkpoint_path) if checkpoint_path else None
+    resumed = checkpoint.load() if checkpoint else {}
+    if resumed:
+        print(f"Reanudando una carga interrumpida ({checkpoint.mode}): {len(resumed)} avatares ya almacenados")
         
-        # Siempre generar metadatos nuevos
-        print(f"Generando metadatos para {filename}...")
-        avatar_meta = {}
+    existing = None
+    renamed = {}
+    if mode == "full" and checkpoint is not None and checkpoint.mode == "full":
+        # Reanudar una carga completa: Redis ya se limpió y contiene lo anotado en el checkpoint
+        metadata = {entry["filename"]: entry["metadata"] for avatar_id, entry in resumed.items()
+                    if avatar_id in file_ids}
+        summary["added"] += len(metadata)
+        pending = {avatar_id: path for avatar_id, path in file_ids.items() if avatar_id not in resumed}
+        changes = {avatar_id: "added" for avatar_id in pending}
+    elif mode == "full":
+        # Limpiar avatares existentes en Redis
+        print("Eliminando avatares existentes en Redis...")
+        deleted = redis_service.clear_avatars()
+        print(f"Eliminados {deleted} avatares existentes")
+        metadata = {}
+        pending = dict(file_ids)
+        changes = {avatar_id: "added" for avatar_id in pending}
+    else:
+        # Comparar el contenido del directorio con lo que ya está indexado
+        existing = redis_service.get_indexed_avatars()
+        metadata = read_metadata(metadata_file)
+        current_filenames = {os.path.basename(path) for path in file_ids.values()}
+        existing_filenames = set(existing.values())
         
-        try:
-            # Obtener embedding de la imagen
-            img_embedding = embedding_service.get_image_embedding(img_path)
+        pending = {}
+        changes = {}
+        for avatar_id, img_path in file_ids.items():
+            if avatar_id in existing:
+                # Mismo contenido con otro nombre: no hace falta recalcular el embedding
+                if existing[avatar_id] != os.path.basename(img_path):
+                    renamed[avatar_id] = os.path.basename(img_path)
+                else:
+                    summary["skipped"] += 1
+                continue
+            pending[avatar_id] = img_path
+            changes[avatar_id] = "updated" if os.path.basename(img_path) in existing_filenames else "added"
             
-            # Clasificar cada categoría
-            for category, options in categories.items():
-                best_match = None
-                best_score = -1
-                
-                for option in options:
-                    prompt = f"a {option} character"
-                    text_embedding = embedding_service.get_text_embedding(prompt)
-                    
-                    # Calcular similitud
-                    similarity = float(np.dot(img_embedding, text_embedding))
-                    
-                    if similarity > best_score:
-                        best_score = similarity
-                        best_match = option
+        # Los metadatos de lo que una carga interrumpida llegó a almacenar solo están en el checkpoint
+        for avatar_id, entry in resumed.items():
+            if avatar_id in existing and avatar_id in file_ids:
+                metadata[entry["filename"]] = entry["metadata"]
                 
-                avatar_meta[category] = best_match
-                print(f"  - {category}: {best_match} (score: {best_score:.4f})")
-            
-            # Clasificar edad
-            best_age = None
-            best_score = -1
+        if renamed:
+            redis_service.rename_avatars(renamed)
+            previous_metadata = dict(metadata)
+            for avatar_id, filename in renamed.items():
+                old_filename = existing[avatar_id]
+                if old_filename not in current_filenames:
+                    metadata.pop(old_filename, None)
+                if old_filename in previous_metadata:
+                    metadata[filename] = previous_metadata[old_filename]
+            summary["renamed"] = len(renamed)
             
-            for age_desc, age_value in age_ranges.items():
-                prompt = f"a {age_desc} character"
-                text_embedding = embedding_service.get_text_embedding(prompt)
+        stale = [avatar_id for avatar_id in existing if avatar_id not in file_ids]
+        redis_service.delete_avatars(stale)
+        for avatar_id in stale:
+            filename = existing[avatar_id]
+            if filename not in current_filenames:
+                metadata.pop(filename, None)
+                summary["removed"] += 1
                 
-                similarity = float(np.dot(img_embedding, text_embedding))
-                
-                if similarity > best_score:
-                    best_score = similarity
-                    best_age = age_value
-            
-            avatar_meta["age"] = best_age
-            print(f"  - age: {best_age} (score: {best_score:.4f})")
-            
-            # Guardar en el diccionario de metadatos
-            metadata[filename] = avatar_meta
-        
-        except Exception as e:
-            print(f"ERROR al generar metadatos para {filename}: {str(e)}")
-            # Usar valores predeterminados si hay error
-            avatar_meta = {
-                "gender": "unknown",
-                "race": "unknown",
-                "job": "unknown",
-                "age": 30
-            }
+    if checkpoint is not None:
+        checkpoint.start(mode)
         
+    # El modelo solo se carga si hay avatares que no están en el almacén de embeddings
+    embedding_service = embedding_service or EmbeddingService()
+    store = open_embedding_store(embedding_service.model_version)
+    store_writer = None
+    if store is not None:
         try:
-            # Obtener embedding para almacenar en Redis
-            embedding = embedding_service.get_image_embedding(img_path)
+            store_writer = store.writer()
+        except OSError as e:
+            # El almacén es opcional: si su directorio no admite escrituras se carga sin él
+            print(f"ERROR al preparar el almacén de embeddings en {store.directory}: {str(e)}")
+    try:
+        if store_writer is not None:
+            store_writer.rename(renamed)
+            backfilled = backfill_embedding_store(store_writer, redis_service, file_ids, existing)
+            if backfilled:
+                print(f"Copiados {backfilled} embeddings de Redis al almacén de embeddings")
             
-            # Almacenar en Redis
-            redis_service.store_avatar(
-                avatar_id=avatar_id,
-                filename=filename,
-                gender=avatar_meta.get("gender", "unknown"),
-                race=avatar_meta.get("race", "unknown"),
-                job=avatar_meta.get("job", "unknown"),
-                age=avatar_meta.get("age", 30),
-                embedding=embedding
+        if pending:
+            indexed_metadata, stored_ids = index_avatars(
+                list(pending.items()), redis_service, embedding_service, checkpoint=checkpoint,
+                store=store, store_writer=store_writer
             )
+            metadata.update(indexed_metadata)
+            for avatar_id in stored_ids:
+                summary[changes[avatar_id]] += 1
+            summary["failed"] = len(pending) - len(stored_ids)
+        else:
+            print("No hay avatares nuevos o modificados, no es necesario cargar el modelo")
+        
+        changed = bool(pending) or bool(resumed) or bool(renamed) or mode == "full" or summary["removed"] > 0
+        if store_writer is not None:
+            if changed or store_writer.entries or any(avatar_id not in file_ids for avatar_id in store.entries):
+                try:
+                    store_writer.commit(keep_ids=set(file_ids))
+                except Exception as e:
+                    print(f"ERROR al guardar el almacén de embeddings: {str(e)}")
+    finally:
+        # Sin commit (o si la carga falla a medias) se cierra y borra el fichero temporal de filas
+        if store_writer is not None:
+            store_writer.abort()
             
-            print(f"Avatar {filename} almacenado con ID {avatar_id} y metadatos {avatar_meta}")
+    if changed:
+        # Invalidar las cachés de resultados de búsqueda de todas las réplicas
+        redis_service.bump_index_generation()
+        
+    # Guardar los metadatos en el archivo
+    metadata_saved = True
+    if metadata_file and changed:
+        try:
+            write_json_atomic(metadata_file, metadata)
+            print(f"Metadatos guardados en {metadata_file}")
         except Exception as e:
-            print(f"ERROR al almacenar avatar {filename} en Redis: {str(e)}")
+            metadata_saved = False
+            print(f"ERROR al guardar metadatos en {metadata_file}: {str(e)}")
+            
+    # La carga ha terminado: la siguiente ejecución no debe reanudarla salvo que
+    # los metadatos no se hayan podido guardar
+    if checkpoint is not None and metadata_saved:
+        checkpoint.remove()
+            
+    redis_service.close()
+    print(
+        f"Sincronización completada ({mode}): {summary['added']} añadidos, "
+        f"{summary['updated']} actualizados, {summary['renamed']} renombrados, {summary['removed']} eliminados, "
+        f"{summary['skipped']} sin cambios, {summary['failed']} con errores"
+    )
+    return summary
+
+def restore_avatars(metadata_file=None, embedding_service=None):
+    """
+    Repuebla Redis desde el almacén de embeddings sin ejecutar el modelo ni leer imágenes.
+    
+    Borra los avatares de Redis, escribe en bloque todos los del almacén de la versión
+    de modelo actual y regenera el fichero de metadatos a partir de él.
+    """
+    from ..services.redis_service import RedisService
+    from ..services.embedding_service import EmbeddingService
+    from ..services.embedding_store import EmbeddingStore
+    
+    summary = {"added": 0, "updated": 0, "renamed": 0, "removed": 0, "skipped": 0, "failed": 0}
+    embedding_service = embedding_service or EmbeddingService()
+    store = EmbeddingStore(embedding_service.model_version)
+    if not store.open():
+        print(f"¡ERROR! No hay un almacén de embeddings válido en {store.directory}")
+        return summary
+        
+    redis_service = RedisService(
+        host=os.environ.get("REDIS_HOST", "localhost"),
+        port=int(os.environ.get("REDIS_PORT", 6379)),
+        write_chunk_size=int(os.environ.get("REDIS_WRITE_CHUNK_SIZE", 500))
+    )
+    redis_service.connect()
+    redis_service.create_vector_index()
+    
+    start = time.perf_counter()
+    summary["removed"] = redis_service.clear_avatars()
+    stored_ids = redis_service.store_avatars(store.iter_avatars())
+    summary["added"] = len(stored_ids)
+    summary["failed"] = len(store) - len(stored_ids)
+    redis_service.bump_index_generation()
+    print(f"Restaurados {len(stored_ids)} avatares desde {store.directory} en {time.perf_counter() - start:.1f}s")
     
-    # Guardar los nuevos metadatos en el archivo
     if metadata_file:
         try:
-            os.makedirs(os.path.dirname(metadata_file), exist_ok=True)
-            with open(metadata_file, 'w') as f:
-                json.dump(metadata, f, indent=2)
-            print(f"Nuevos metadatos guardados en {metadata_file}")
+            write_json_atomic(metadata_file, {
+                entry["filename"]: entry["metadata"] for entry in store.entries.values()
+            })
         except Exception as e:
             print(f"ERROR al guardar metadatos en {metadata_file}: {str(e)}")
-    
     redis_service.close()
-    print(f"Cargados exitosamente {len(image_files)} avatares en Redis con metadatos generados")
\ No newline at end of file
+    return summary
+
+def open_embedding_store(model_version):
+    """Almacén de embeddings de la versión de modelo indicada, o None si está desactivado"""
+    from ..services.embedding_store import EmbeddingStore
+    
+    if os.environ.get("EMBEDDING_STORE", "true").lower() != "true":
+        return None
+    store = EmbeddingStore(model_version)
+    if store.open():
+        print(f"Almacén de embeddings con {len(store)} avatares en {store.directory}")
+    return store
+
+def backfill_embedding_store(store_writer, redis_service, file_ids, existing=None):
+    """
+    Añade al almacén los avatares que ya están en Redis pero no en el almacén (por
+    ejemplo, indexados antes de que existiera o por una carga interrumpida), leyendo
+    sus embeddings de Redis. Solo se hace con embeddings float32: los formatos
+    reducidos perderían precisión.
+    """
+    if redis_service.storage != "float32":
+        return 0
+    if existing is None:
+        existing = redis_service.get_indexed_avatars()
+    missing = {avatar_id for avatar_id in existing
+               if avatar_id in file_ids and avatar_id not in store_writer.store}
+    if not missing:
+        return 0
+    records = [record for record in redis_service.iter_avatars() if record["avatar_id"] in missing]
+    store_writer.add(records, {record["filename"]: {
+        "gender": record["gender"], "race": record["race"], "job": record["job"], "age": record["age"]
+    } for record in records})
+    return len(records)
+
+def index_avatars(pending, redis_service, embedding_service=None, workers=None, checkpoint=None,
+                  store=None, store_writer=None):
+    """
+    Calcula embeddings y metadatos de [(avatar_id, ruta)] y los almacena en Redis.
+    
+    Los lotes se escriben en Redis (y en el checkpoint, si se indica) según se
+    terminan. Con workers > 1 (INGEST_WORKERS) las imágenes se reparten entre un
+    pool de procesos. Los avatares que ya están en store se leen de él en lugar de
+    pasar por el modelo, y todo lo almacenado se añade a store_writer. Devuelve los
+    metadatos por nombre de fichero y la lista de ids almacenados.
+    """
+    total = len(pending)
+    chunks = iter(())
+    if store is not None and len(store):
+        stored = [(avatar_id, img_path) for avatar_id, img_path in pending if avatar_id in store]
+        pending = [(avatar_id, img_path) for avatar_id, img_path in pending if avatar_id not in store]
+        if stored:
+            print(f"{len(stored)} avatares se cargan desde el almacén de embeddings, sin inferencia")
+            chunks = store_chunks(stored, store, redis_service.write_chunk_size)
+            
+    workers = workers or int(os.environ.get("INGEST_WORKERS", 1))
+    if workers > 1 and len(pending) > 1:
+        chunks = itertools.chain(chunks, embed_chunks_parallel(pending, workers, embedding_service))
+    elif pending:
+        chunks = itertools.chain(chunks, embed_chunks(pending, embedding_service))
+    return write_chunks(chunks, redis_service, total, checkpoint, store_writer)
+
+def store_chunks(pending, store, chunk_size):
+    """Versión de embed_chunks que lee embeddings y metadatos del almacén de embeddings"""
+    for start in range(0, len(pending), chunk_size):
+        shard = pending[start:start + chunk_size]
+        records = []
+        metadata = {}
+        for avatar_id, img_path in shard:
+            record = store.get_record(avatar_id)
+            # El mismo contenido puede estar ahora con otro nombre de fichero
+            record["filename"] = os.path.basename(img_path)
+            records.append(record)
+            metadata[record["filename"]] = store.entries[avatar_id]["metadata"]
+        yield records, metadata, len(shard)
+
+def embed_chunks(pending, embedding_service=None):
+    """Genera (registros, metadatos, nº de imágenes) por cada lote de [(avatar_id, ruta)]"""
+    from ..services.embedding_service import EmbeddingService
+    from ..services.prompt_bank import PromptBank
+    
+    # Inicializar servicio de embeddings salvo que ya exista uno compartido
+    if embedding_service is None or not embedding_service.initialized:
+        print("Inicializando modelo CLIP...")
+        embedding_service = embedding_service or EmbeddingService()
+        embedding_service.initialize()
+        print("Modelo CLIP inicializado correctamente")
+    
+    # Matriz de prompts para la clasificación automática con CLIP (cacheada en disco)
+    prompt_bank = PromptBank()
+    prompt_bank.load(embedding_service)
+    
+    # Calcular los embeddings de imagen en lotes (una sola pasada por imagen)
+    batch_size = int(os.environ.get("EMBEDDING_BATCH_SIZE", 32))
+    print(f"Calculando embeddings de {len(pending)} imágenes en lotes de {batch_size}...")
+    batches = embedding_service.iter_image_embeddings(
+        [img_path for _, img_path in pending],
+        batch_size=batch_size,
+        num_workers=int(os.environ.get("DECODE_WORKERS", 4)),
+        skip_errors=True
+    )
+    for start, image_embeddings in batches:
+        shard = pending[start:start + len(image_embeddings)]
+        records, metadata = build_records(shard, image_embeddings, prompt_bank)
+        yield records, metadata, len(shard)
+    
+def write_chunks(chunks, redis_service, total, checkpoint=None, store_writer=None):
+    """
+    Almacena en Redis cada lote según llega, lo anota en el checkpoint y en el almacén
+    de embeddings e informa del progreso
+    """
+    metadata = {}
+    stored_ids = []
+    processed = 0
+    start = time.perf_counter()
+    for records, chunk_metadata, count in chunks:
+        processed += count
+        # Almacenar en Redis en bloque reutilizando los embeddings ya calculados
+        try:
+            stored = set(redis_service.store_avatars(records))
+        except Exception as e:
+            print(f"ERROR al almacenar avatares en Redis: {str(e)}")
+            stored = set()
+            
+        entries = []
+        for record in records:
+            if record["avatar_id"] in stored:
+                stored_ids.append(record["avatar_id"])
+                metadata[record["filename"]] = chunk_metadata[record["filename"]]
+                entries.append({
+                    "avatar_id": record["avatar_id"],
+                    "filename": record["filename"],
+                    "metadata": chunk_metadata[record["filename"]]
+                })
+        if checkpoint is not None and entries:
+            checkpoint.append(entries)
+        if store_writer is not None:
+            store_writer.add([record for record in records if record["avatar_id"] in stored], chunk_metadata)
+            
+        elapsed = time.perf_counter() - start
+        print(f"[ingesta] {processed}/{total} imágenes, {len(stored_ids)} almacenadas, "
+              f"{processed / elapsed:.1f} img/s")
+              
+    elapsed = time.perf_counter() - start
+    print(f"Almacenados {len(stored_ids)} de {total} avatares en Redis en {elapsed:.1f}s "
+          f"({total / elapsed if elapsed else 0:.1f} img/s)")
+    return metadata, stored_ids
+
+def build_records(pending, image_embeddings, prompt_bank, verbose=True):
+    """Clasifica los embeddings de [(avatar_id, ruta)] y construye los registros para Redis"""
+    # Clasificar todas las imágenes con una sola multiplicación de matrices
+    valid = ~np.isnan(image_embeddings).any(axis=1)
+    classified, scores = prompt_bank.classify(np.nan_to_num(image_embeddings))
+    
+    metadata = {}
+    records = []
+    
+    # Procesar cada imagen
+    for row, ((avatar_id, img_path), img_embedding) in enumerate(zip(pending, image_embeddings)):
+        filename = os.path.basename(img_path)
+        
+        if verbose:
+            print(f"Procesando avatar: {filename}")
+            
+        if not valid[row]:
+            print(f"ERROR al generar el embedding de {filename}, se omite")
+            continue
+            
+        avatar_meta = classified[row]
+        if verbose:
+            for category, value in avatar_meta.items():
+                print(f"  - {category}: {value} (score: {scores[category][row]:.4f})")
+                
+        metadata[filename] = avatar_meta
+        records.append({
+            "avatar_id": avatar_id,
+            "filename": filename,
+            "gender": avatar_meta.get("gender", "unknown"),
+            "race": avatar_meta.get("race", "unknown"),
+            "job": avatar_meta.get("job", "unknown"),
+            "age": avatar_meta.get("age", 30),
+            "embedding": img_embedding
+        })
+    return records, metadata
+
+def _init_ingest_worker(model_name, backend, num_threads):
+    from ..services.embedding_service import EmbeddingService
+    from ..services.prompt_bank import PromptBank
+    
+    embedding_service = EmbeddingService(model_name, backend=backend, num_threads=num_threads)
+    embedding_service.initialize()
+    prompt_bank = PromptBank()
+    prompt_bank.load(embedding_service)
+    _worker_state["embedding_service"] = embedding_service
+    _worker_state["prompt_bank"] = prompt_bank
+
+def _embed_shard(shard):
+    """Embeddings y registros de un lote de [(avatar_id, ruta)] dentro de un proceso del pool"""
+    image_embeddings = _worker_state["embedding_service"].get_image_embeddings(
+        [img_path for _, img_path in shard],
+        batch_size=len(shard),
+        num_workers=int(os.environ.get("DECODE_WORKERS", 2)),
+        skip_errors=True
+    )
+    return build_records(shard, image_embeddings, _worker_state["prompt_bank"], verbose=False)
+
+def embed_chunks_parallel(pending, workers, embedding_service=None):
+    """
+    Versión de embed_chunks que reparte los lotes entre workers procesos.
+    
+    Cada proceso carga su propio modelo limitado a num_threads hilos de torch
+    (INGEST_THREADS_PER_WORKER, por defecto núcleos / workers) y devuelve los registros
+    de cada lote en cuanto los termina; el proceso que consume el generador es el
+    único que escribe en Redis, con pipelines, mientras los demás siguen calculando.
+    """
+    from ..services.embedding_service import EmbeddingService
+    from ..services.prompt_bank import PromptBank
+    
+    embedding_service = embedding_service or EmbeddingService()
+    num_threads = int(os.environ.get("INGEST_THREADS_PER_WORKER", 0)) or max(1, (os.cpu_count() or 1) // workers)
+    shard_size = int(os.environ.get("EMBEDDING_BATCH_SIZE", 32))
+    shards = [pending[start:start + shard_size] for start in range(0, len(pending), shard_size)]
+    
+    # El banco de prompts (y la exportación a ONNX del backend onnx) se preparan una sola vez
+    # aquí, antes de arrancar el pool: los procesos solo leen las cachés en disco en lugar
+    # de escribirlas todos a la vez
+    if not embedding_service.initialized:
+        embedding_service.initialize()
+    PromptBank().load(embedding_service)
+        
+    print(f"Ingesta paralela de {len(pending)} imágenes: {workers} procesos x {num_threads} hilos, "
+          f"{len(shards)} lotes de {shard_size}")
+          
+    # spawn evita heredar el estado de torch (hilos de OpenMP) del proceso padre
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_ingest_worker,
+        initargs=(embedding_service.model_name, embedding_service.backend_name, num_threads)
+    ) as executor:
+        futures = {executor.submit(_embed_shard, shard): shard for shard in shards}
+        for future in as_completed(futures):
+            try:
+                records, shard_metadata = future.result()
+            except Exception as e:
+                print(f"ERROR al procesar un lote de {len(futures[future])} imágenes: {str(e)}")
+                records, shard_metadata = [], {}
+            yield records, shard_metadata, len(futures[future])
\ No newline at end of file
@@ -1,28 +1,50 @@
 from fastapi import HTTPException, UploadFile
-import os
-import mimetypes
-from typing import List
+import re
 
 # Lista de tipos MIME permitidos para imÃ¡genes
 ALLOWED_MIME_TYPES = ["image/jpeg", "image/png", "image/webp"]
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5 MB
+# Valores admitidos en los filtros de atributos (gender, race, job)
+FILTER_VALUE_PATTERN = re.compile(r"^[A-Za-z0-9_\- ]{1,50}$")
+MAX_FILTER_VALUES = 10
+MAX_EF_RUNTIME = 4096
+# Firmas (magic bytes) de los formatos admitidos; WebP es RIFF????WEBP
+IMAGE_SIGNATURES = ((b"\xff\xd8\xff", "image/jpeg"), (b"\x89PNG\r\n\x1a\n", "image/png"))
+# Cada lectura de un UploadFile volcado a disco es un salto al threadpool: bloques grandes
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
-def validate_image_file(file: UploadFile):
-    """Valida que el archivo sea una imagen segura"""
-    # Verificar tamaÃ±o
-    file.file.seek(0, os.SEEK_END)
-    file_size = file.file.tell()
-    file.file.seek(0)
-    
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="El archivo es demasiado grande")
-    
-    # Verificar tipo MIME
-    content_type = file.content_type
-    if content_type not in ALLOWED_MIME_TYPES:
-        raise HTTPException(status_code=400, detail="Tipo de archivo no permitido")
+def sniff_image_type(header: bytes):
+    """Tipo MIME según los primeros bytes del fichero, sin fiarse del que declara el cliente"""
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return mime_type
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+async def read_image_upload(file: UploadFile, max_size: int = MAX_FILE_SIZE):
+    """
+    Lee una imagen subida por bloques y devuelve sus bytes.
     
-    return file
+    El tipo se comprueba con los magic bytes del primer bloque y la lectura se corta
+    en cuanto se supera max_size, sin llegar a cargar en memoria el resto del fichero.
+    """
+    chunks = []
+    size = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        if not chunks and sniff_image_type(chunk) not in ALLOWED_MIME_TYPES:
+            raise HTTPException(status_code=400, detail="Tipo de archivo no permitido")
+        size += len(chunk)
+        if size > max_size:
+            raise HTTPException(status_code=400, detail="El archivo es demasiado grande")
+        chunks.append(chunk)
+        
+    if not chunks:
+        raise HTTPException(status_code=400, detail="El archivo está vacío")
+    return b"".join(chunks)
 
 def validate_text_input(text: str, max_length: int = 500):
     """Valida que el texto de entrada sea seguro"""
@@ -32,4 +54,31 @@ def validate_text_input(text: str, max_length: int = 500):
     if len(text) > max_length:
         raise HTTPException(status_code=400, detail=f"El texto excede el tamaÃ±o mÃ¡ximo de {max_length} caracteres")
     
-    return text
\ No newline at end of file
+    return text
+
+def validate_search_filters(gender=None, race=None, job=None, age_min=None, age_max=None):
+    """Valida los filtros de búsqueda; cada atributo admite varios valores separados por comas"""
+    filters = {}
+    for field, raw in (("gender", gender), ("race", race), ("job", job)):
+        if not raw:
+            continue
+        values = [value.strip().lower() for value in raw.split(",") if value.strip()]
+        if len(values) > MAX_FILTER_VALUES or not all(FILTER_VALUE_PATTERN.match(value) for value in values):
+            raise HTTPException(status_code=400, detail=f"Filtro {field} incorrecto")
+        if values:
+            filters[field] = values
+            
+    if age_min is not None and age_max is not None and age_min > age_max:
+        raise HTTPException(status_code=400, detail="El rango de edad es incorrecto")
+    if age_min is not None:
+        filters["age_min"] = age_min
+    if age_max is not None:
+        filters["age_max"] = age_max
+        
+    return filters
+
+def validate_ef_runtime(ef_runtime):
+    """Valida el parámetro EF_RUNTIME del HNSW indicado en la consulta"""
+    if ef_runtime is not None and not 1 <= ef_runtime <= MAX_EF_RUNTIME:
+        raise HTTPException(status_code=400, detail=f"ef_runtime debe estar entre 1 y {MAX_EF_RUNTIME}")
+    return ef_runtime
\ No newline at end of file
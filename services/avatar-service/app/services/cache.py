@@ -0,0 +1,227 @@
+import io
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+
+GENERATION_KEY = "avatar_idx:generation"
+
+def normalize_query(text):
+    return " ".join(text.lower().split())
+
+def hash_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class LRUCache:
+    """Caché en memoria acotada por número de entradas, con expulsión LRU y TTL opcional"""
+    
+    def __init__(self, max_entries=1024, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+            self.misses += 1
+            return None
+            
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+                
+    def find(self, predicate):
+        """Devuelve el valor de la entrada más reciente cuya clave cumple predicate"""
+        with self.lock:
+            for key in reversed(self.entries):
+                value, expires_at = self.entries[key]
+                if predicate(key) and (expires_at is None or expires_at > time.monotonic()):
+                    self.entries.move_to_end(key)
+                    return value
+        return None
+                
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+class TieredCache:
+    """
+    LRUCache local con un segundo nivel opcional en Redis compartido entre réplicas.
+    
+    Los fallos del nivel Redis nunca rompen la petición: se tratan como un miss.
+    """
+    
+    def __init__(self, name, max_entries=1024, ttl=None, redis_service=None, encode=None, decode=None):
+        self.name = name
+        self.local = LRUCache(max_entries, ttl)
+        self.ttl = ttl
+        self.redis_service = redis_service
+        self.encode = encode or (lambda value: json.dumps(value).encode("utf-8"))
+        self.decode = decode or (lambda data: json.loads(data))
+        self.redis_hits = 0
+        self.redis_errors = 0
+        
+    def _redis_key(self, key):
+        return f"avatar_cache:{self.name}:{hash_key(key)}"
+        
+    async def get(self, key):
+        value = self.local.get(key)
+        if value is not None or self.redis_service is None:
+            return value
+        try:
+            data = await self.redis_service.client.get(self._redis_key(key))
+        except Exception as e:
+            self.redis_errors += 1
+            print(f"Cache {self.name}: Redis tier error: {str(e)}")
+            return None
+        if data is None:
+            return None
+        value = self.decode(data)
+        self.redis_hits += 1
+        self.local.set(key, value)
+        return value
+        
+    async def set(self, key, value):
+        self.local.set(key, value)
+        if self.redis_service is None:
+            return
+        try:
+            await self.redis_service.client.set(self._redis_key(key), self.encode(value), ex=self.ttl)
+        except Exception as e:
+            self.redis_errors += 1
+            print(f"Cache {self.name}: Redis tier error: {str(e)}")
+            
+    def get_stats(self):
+        stats = self.local.get_stats()
+        stats["redis_tier"] = self.redis_service is not None
+        stats["redis_hits"] = self.redis_hits
+        stats["redis_errors"] = self.redis_errors
+        # Un miss local resuelto por Redis cuenta como acierto de la caché en conjunto
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["hits"] + self.redis_hits) / lookups if lookups else 0.0
+        return stats
+
+def encode_embedding(embedding):
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+def decode_embedding(data):
+    return np.frombuffer(data, dtype=np.float32)
+
+class IndexGeneration:
+    """
+    Generación actual del índice de avatares, que load_avatars incrementa en cada cambio.
+    
+    Se consulta a Redis como mucho una vez cada refresh_seconds para no añadir un
+    round trip a cada búsqueda.
+    """
+    
+    def __init__(self, redis_service, refresh_seconds=1.0, on_change=None):
+        self.redis_service = redis_service
+        self.refresh_seconds = refresh_seconds
+        self.on_change = on_change
+        self.value = 0
+        self.checked_at = None
+        
+    async def current(self):
+        now = time.monotonic()
+        if self.checked_at is None or now - self.checked_at >= self.refresh_seconds:
+            try:
+                value = int(await self.redis_service.client.get(GENERATION_KEY) or 0)
+                self.checked_at = now
+                if value != self.value and self.on_change:
+                    self.on_change()
+                self.value = value
+            except Exception as e:
+                print(f"Could not read index generation: {str(e)}")
+        return self.value
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def perceptual_hash(data, hash_size=8):
+    """dHash de 64 bits de unos bytes (decodificados en modo draft a muy baja resolución) o de una imagen PIL"""
+    if isinstance(data, Image.Image):
+        image = data
+    else:
+        image = Image.open(io.BytesIO(data))
+        image.draft("L", (hash_size * 4, hash_size * 4))
+    image = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(image, dtype=np.int16)
+    return np.packbits(pixels[:, 1:] > pixels[:, :-1]).tobytes().hex()
+
+class ImageEmbeddingCache:
+    """
+    Caché de embeddings de imágenes subidas.
+    
+    La clave principal es el hash de los bytes recibidos, de modo que un acierto evita
+    tanto la decodificación con PIL como el modelo. Opcionalmente se añade un segundo
+    índice por hash perceptual para reconocer la misma imagen re-codificada.
+    """
+    
+    def __init__(self, max_entries=512, perceptual=False, max_distance=4):
+        self.exact = LRUCache(max_entries)
+        self.perceptual = LRUCache(max_entries) if perceptual else None
+        self.max_distance = max_distance
+        self.perceptual_hits = 0
+        
+    def get(self, digest):
+        return self.exact.get(digest)
+        
+    def get_perceptual(self, phash):
+        """Busca una imagen con un hash perceptual a distancia de Hamming <= max_distance"""
+        if self.perceptual is None:
+            return None
+        target = int(phash, 16)
+        embedding = self.perceptual.find(
+            lambda key: bin(int(key, 16) ^ target).count("1") <= self.max_distance
+        )
+        if embedding is not None:
+            self.perceptual_hits += 1
+        return embedding
+        
+    def set(self, digest, embedding, phash=None):
+        self.exact.set(digest, embedding)
+        if self.perceptual is not None and phash is not None:
+            self.perceptual.set(phash, embedding)
+            
+    def get_stats(self):
+        exact = self.exact.get_stats()
+        stats = {
+            "exact": exact,
+            "approx_bytes": sum(value.nbytes for value, _ in list(self.exact.entries.values()))
+        }
+        if self.perceptual is not None:
+            stats["perceptual"] = {"entries": len(self.perceptual.entries), "hits": self.perceptual_hits}
+        lookups = exact["hits"] + exact["misses"]
+        stats["hit_ratio"] = (exact["hits"] + self.perceptual_hits) / lookups if lookups else 0.0
+        return stats
\ No newline at end of file
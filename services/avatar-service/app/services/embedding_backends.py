@@ -0,0 +1,132 @@
+import os
+import numpy as np
+
+class TorchBackend:
+    """Modelo CLIP de PyTorch en precisión completa"""
+    
+    name = "torch"
+    
+    def __init__(self, model_name, num_threads=None):
+        import torch
+        from transformers import CLIPModel
+        
+        self.torch = torch
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model = self._prepare(CLIPModel.from_pretrained(model_name).eval())
+        
+    def _prepare(self, model):
+        return model
+        
+    def encode_images(self, pixel_values):
+        with self.torch.no_grad():
+            features = self.model.get_image_features(pixel_values=self.torch.from_numpy(pixel_values))
+        return features.numpy()
+        
+    def encode_texts(self, input_ids, attention_mask):
+        with self.torch.no_grad():
+            features = self.model.get_text_features(
+                input_ids=self.torch.from_numpy(input_ids),
+                attention_mask=self.torch.from_numpy(attention_mask)
+            )
+        return features.numpy()
+
+class QuantizedTorchBackend(TorchBackend):
+    """Modelo CLIP de PyTorch con las capas Linear cuantizadas dinámicamente a int8"""
+    
+    name = "torch-int8"
+    
+    def _prepare(self, model):
+        return self.torch.quantization.quantize_dynamic(model, {self.torch.nn.Linear}, dtype=self.torch.qint8)
+
+class OnnxBackend:
+    """
+    Grafos ONNX de las torres de visión y texto ejecutados con ONNX Runtime.
+    
+    Si los grafos no existen en model_dir se exportan una vez desde el modelo de PyTorch.
+    """
+    
+    name = "onnx"
+    
+    def __init__(self, model_name, num_threads=None, model_dir=None):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("The onnx embedding backend requires the onnxruntime package")
+            
+        model_dir = model_dir or os.path.join(
+            os.environ.get("ONNX_MODEL_DIR", "./assets/cache/onnx"),
+            model_name.replace("/", "__")
+        )
+        vision_path = os.path.join(model_dir, "vision.onnx")
+        text_path = os.path.join(model_dir, "text.onnx")
+        if not (os.path.exists(vision_path) and os.path.exists(text_path)):
+            export_onnx(model_name, model_dir)
+            
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = num_threads or 0
+        options.inter_op_num_threads = 1
+        providers = ["CPUExecutionProvider"]
+        self.vision = ort.InferenceSession(vision_path, options, providers=providers)
+        self.text = ort.InferenceSession(text_path, options, providers=providers)
+        
+    def encode_images(self, pixel_values):
+        return self.vision.run(None, {"pixel_values": pixel_values.astype(np.float32)})[0]
+        
+    def encode_texts(self, input_ids, attention_mask):
+        return self.text.run(None, {
+            "input_ids": input_ids.astype(np.int64),
+            "attention_mask": attention_mask.astype(np.int64)
+        })[0]
+
+def export_onnx(model_name, model_dir, opset=14):
+    """Exporta las torres de visión y texto de CLIP a ONNX con batch y secuencia dinámicos"""
+    import torch
+    from transformers import CLIPModel
+    
+    print(f"Exporting {model_name} to ONNX in {model_dir}...")
+    model = CLIPModel.from_pretrained(model_name).eval()
+    
+    class VisionTower(torch.nn.Module):
+        def forward(self, pixel_values):
+            return model.get_image_features(pixel_values=pixel_values)
+            
+    class TextTower(torch.nn.Module):
+        def forward(self, input_ids, attention_mask):
+            return model.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+            
+    os.makedirs(model_dir, exist_ok=True)
+    image_size = model.config.vision_config.image_size
+    exports = [
+        ("vision.onnx", VisionTower(), (torch.zeros(1, 3, image_size, image_size),),
+         ["pixel_values"], {"pixel_values": {0: "batch"}}),
+        ("text.onnx", TextTower(), (torch.ones(1, 16, dtype=torch.long), torch.ones(1, 16, dtype=torch.long)),
+         ["input_ids", "attention_mask"], {"input_ids": {0: "batch", 1: "sequence"},
+                                           "attention_mask": {0: "batch", 1: "sequence"}}),
+    ]
+    for filename, module, inputs, input_names, dynamic_axes in exports:
+        path = os.path.join(model_dir, filename)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                module, inputs, tmp_path,
+                input_names=input_names,
+                output_names=["embeds"],
+                dynamic_axes={**dynamic_axes, "embeds": {0: "batch"}},
+                opset_version=opset
+            )
+        os.replace(tmp_path, path)
+    print("ONNX export finished")
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    QuantizedTorchBackend.name: QuantizedTorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+def create_backend(name, model_name, num_threads=None):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](model_name, num_threads=num_threads)
\ No newline at end of file
@@ -0,0 +1,118 @@
+import asyncio
+import time
+import numpy as np
+
+class EmbeddingBatcher:
+    """
+    Agrupa las peticiones concurrentes de embeddings en una sola pasada del modelo.
+    
+    Cada tipo de consulta (texto o imagen) tiene su propia cola. Un worker toma la
+    primera petición, espera como mucho max_wait_ms a que lleguen más (hasta
+    max_batch_size), ejecuta un único forward en el executor y resuelve el future
+    de cada llamante con su propio vector. on_batch(kind, tamaño) se llama con cada
+    lote formado.
+    """
+    
+    def __init__(self, embedding_service, executor, max_batch_size=16, max_wait_ms=5, on_batch=None):
+        self.embedding_service = embedding_service
+        self.on_batch = on_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queues = {}
+        self.workers = []
+        self.stats = {
+            kind: {"requests": 0, "batches": 0, "max_batch_size": 0, "batch_sizes": {}}
+            for kind in ("text", "image")
+        }
+        
+    def start(self):
+        for kind in ("text", "image"):
+            self.queues[kind] = asyncio.Queue()
+            self.workers.append(asyncio.create_task(self._worker(kind)))
+            
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        
+    async def get_text_embedding(self, text):
+        return await self._submit("text", text)
+        
+    async def get_image_embedding(self, image_data):
+        return await self._submit("image", image_data)
+        
+    async def _submit(self, kind, item):
+        future = asyncio.get_running_loop().create_future()
+        await self.queues[kind].put((item, future))
+        return await future
+        
+    async def _collect(self, queue):
+        batch = [await queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Lo que ya esté en cola entra en el lote sin esperar más
+        while len(batch) < self.max_batch_size and not queue.empty():
+            batch.append(queue.get_nowait())
+        return batch
+        
+    async def _worker(self, kind):
+        queue = self.queues[kind]
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect(queue)
+            items = [item for item, _ in batch]
+            self._record(kind, len(batch))
+            try:
+                embeddings = await loop.run_in_executor(self.executor, self._encode, kind, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+                
+            for (_, future), embedding in zip(batch, embeddings):
+                if future.done():
+                    continue
+                if np.isnan(embedding).any():
+                    future.set_exception(ValueError("Could not decode image"))
+                else:
+                    future.set_result(embedding)
+                    
+    def _encode(self, kind, items):
+        if kind == "text":
+            return self.embedding_service.get_text_embeddings(items)
+        return self.embedding_service.get_image_embeddings(
+            items, batch_size=len(items), num_workers=min(4, len(items)), skip_errors=True
+        )
+        
+    def _record(self, kind, batch_size):
+        stats = self.stats[kind]
+        stats["requests"] += batch_size
+        stats["batches"] += 1
+        stats["max_batch_size"] = max(stats["max_batch_size"], batch_size)
+        stats["batch_sizes"][batch_size] = stats["batch_sizes"].get(batch_size, 0) + 1
+        if self.on_batch is not None:
+            self.on_batch(kind, batch_size)
+        
+    def get_stats(self):
+        result = {}
+        for kind, stats in self.stats.items():
+            queue = self.queues.get(kind)
+            result[kind] = {
+                "queue_depth": queue.qsize() if queue else 0,
+                "requests": stats["requests"],
+                "batches": stats["batches"],
+                "avg_batch_size": stats["requests"] / stats["batches"] if stats["batches"] else 0.0,
+                "max_batch_size": stats["max_batch_size"],
+                "batch_sizes": dict(sorted(stats["batch_sizes"].items()))
+            }
+        return result
\ No newline at end of file
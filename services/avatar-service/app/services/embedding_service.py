@@ -1,44 +1,172 @@
-import torch
-from transformers import CLIPProcessor, CLIPModel
+import os
 from PIL import Image
 import numpy as np
 import io
+from concurrent.futures import ThreadPoolExecutor
+
+from .embedding_backends import create_backend
+
+EMBEDDING_DIM = 512
+MODEL_NAME = "openai/clip-vit-base-patch32"
+
+# El procesador de CLIP reduce el lado corto a 224 px: basta con decodificar a unas 2x
+DECODE_MIN_SIDE = 448
+# Modos cuyos valores son índices de paleta o bits sueltos
+PALETTE_MODES = ("1", "P", "PA")
+
+def reduce_image(image, min_side):
+    """
+    Prepara la decodificación de una imagen aún sin cargar para que su lado corto quede
+    cerca de min_side (nunca por debajo). En JPEG, draft() hace que el decodificador
+    escale la DCT (1/2, 1/4, 1/8) y no llega a reconstruir la imagen completa; en el
+    resto de formatos reduce() promedia bloques de factor x factor justo tras decodificar,
+    antes de convertir a RGB.
+    """
+    if not min_side or min(image.size) < 2 * min_side:
+        return image
+    if image.format == "JPEG":
+        scale = min(image.size) / min_side
+        image.draft("RGB", (int(image.width / scale) + 1, int(image.height / scale) + 1))
+    factor = min(image.size) // min_side
+    if factor >= 2:
+        # En paleta y bilevel promediar los valores no tiene sentido (y reduce() no los
+        # admite): se pasan antes a RGB
+        if image.mode in PALETTE_MODES:
+            image = image.convert("RGB")
+        try:
+            image = image.reduce(factor)
+        except ValueError:
+            # Otros modos que reduce() no admite (I;16...) se decodifican a tamaño completo
+            pass
+    return image
+
+def load_image(image_data, min_side=None):
+    """
+    Decodifica una ruta, bytes o imagen PIL a una imagen RGB.
+    
+    Con min_side las rutas y bytes se decodifican directamente a una resolución
+    reducida cuyo lado corto no baja de min_side (ver reduce_image).
+    """
+    if isinstance(image_data, str):
+        image = Image.open(image_data)
+    elif isinstance(image_data, bytes):
+        image = Image.open(io.BytesIO(image_data))
+    else:
+        return image_data
+    return reduce_image(image, min_side).convert("RGB")
+
+def _normalize_rows(features):
+    features = features.astype(np.float32)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return features / norms
 
 class EmbeddingService:
-    def __init__(self):
-        self.model = None
+    def __init__(self, model_name=MODEL_NAME, backend=None, num_threads=None):
+        self.model_name = model_name
+        self.backend_name = backend or os.environ.get("EMBEDDING_BACKEND", "torch")
+        self.num_threads = num_threads or int(os.environ.get("EMBEDDING_THREADS", 0)) or None
+        # Lado corto mínimo al decodificar imágenes (0 decodifica a resolución completa)
+        self.decode_min_side = int(os.environ.get("IMAGE_DECODE_MIN_SIDE", DECODE_MIN_SIDE))
+        # Identifica los embeddings producidos: cambiar de backend o la resolución a la que se
+        # decodifican las imágenes altera ligeramente los vectores
+        self.model_version = f"{self.model_name}@{self.backend_name}@decode{self.decode_min_side}"
+        self.backend = None
         self.processor = None
         
+    @property
+    def initialized(self):
+        return self.backend is not None
+        
     def initialize(self):
-        self.model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-        self.processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-        print("CLIP model initialized")
+        # transformers y torch se importan aquí para no pagar su coste al importar el módulo
+        from transformers import CLIPProcessor
+        
+        self.backend = create_backend(self.backend_name, self.model_name, num_threads=self.num_threads)
+        self.processor = CLIPProcessor.from_pretrained(self.model_name)
+        print(f"CLIP model initialized ({self.backend_name} backend)")
+        
+    def warm_up(self):
+        """Primera pasada de ambas torres para que la primera petición real no pague la inicialización"""
+        self.get_text_embedding("a warrior character")
+        self.get_image_embedding(Image.new("RGB", (224, 224)))
+        
+    def _encode_images(self, images):
+        inputs = self.processor(images=images, return_tensors="np")
+        return _normalize_rows(self.backend.encode_images(inputs["pixel_values"]))
+        
+    def _encode_texts(self, texts):
+        inputs = self.processor(text=texts, return_tensors="np", padding=True)
+        return _normalize_rows(self.backend.encode_texts(inputs["input_ids"], inputs["attention_mask"]))
+        
+    def load_image(self, image_data):
+        return load_image(image_data, self.decode_min_side)
         
     def get_image_embedding(self, image_data):
-        if isinstance(image_data, str):
-            image = Image.open(image_data).convert("RGB")
-        elif isinstance(image_data, bytes):
-            image = Image.open(io.BytesIO(image_data)).convert("RGB")
-        else:
-            image = image_data
-            
-        inputs = self.processor(images=image, return_tensors="pt", padding=True)
+        image = self.load_image(image_data)
+        return self._encode_images([image])[0]
         
-        with torch.no_grad():
-            image_features = self.model.get_image_features(**inputs)
-            
-        image_embedding = image_features.squeeze().numpy().astype(np.float32)
-        image_embedding = image_embedding / np.linalg.norm(image_embedding)
+    def get_image_embeddings(self, images, batch_size=32, num_workers=4, skip_errors=False):
+        """
+        Calcula los embeddings de una lista de imágenes (rutas, bytes o PIL) en lotes.
         
-        return image_embedding
+        Devuelve una matriz (N, 512) float32 normalizada. Con skip_errors=True las
+        imágenes que no se pueden decodificar quedan como filas NaN en lugar de abortar
+        todo el lote.
+        """
+        images = list(images)
+        embeddings = np.full((len(images), EMBEDDING_DIM), np.nan, dtype=np.float32)
+        for start, batch_embeddings in self.iter_image_embeddings(images, batch_size, num_workers, skip_errors):
+            embeddings[start:start + len(batch_embeddings)] = batch_embeddings
+        return embeddings
         
-    def get_text_embedding(self, text):
-        inputs = self.processor(text=text, return_tensors="pt", padding=True)
+    def iter_image_embeddings(self, images, batch_size=32, num_workers=4, skip_errors=False):
+        """
+        Generador de embeddings por lotes: devuelve (posición inicial, matriz) de cada lote.
         
-        with torch.no_grad():
-            text_features = self.model.get_text_features(**inputs)
+        La decodificación se hace en un pool de hilos que va preparando el siguiente
+        lote mientras el modelo procesa el actual, de modo que quien consume el
+        generador (por ejemplo, escribiendo en Redis) no detiene la decodificación.
+        """
+        images = list(images)
+        if not images:
+            return
             
-        text_embedding = text_features.squeeze().numpy().astype(np.float32)
-        text_embedding = text_embedding / np.linalg.norm(text_embedding)
+        batches = [range(start, min(start + batch_size, len(images)))
+                   for start in range(0, len(images), batch_size)]
+                   
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            pending = [executor.submit(self.load_image, images[i]) for i in batches[0]]
+            
+            for batch_number, batch in enumerate(batches):
+                decoded = []
+                rows = []
+                for i, future in zip(batch, pending):
+                    try:
+                        decoded.append(future.result())
+                        rows.append(i - batch.start)
+                    except Exception as e:
+                        if not skip_errors:
+                            raise
+                        print(f"Could not decode image {images[i]}: {str(e)}")
+                        
+                # Lanzar la decodificación del siguiente lote antes de usar el modelo
+                if batch_number + 1 < len(batches):
+                    pending = [executor.submit(self.load_image, images[i])
+                               for i in batches[batch_number + 1]]
+                               
+                embeddings = np.full((len(batch), EMBEDDING_DIM), np.nan, dtype=np.float32)
+                if decoded:
+                    embeddings[rows] = self._encode_images(decoded)
+                yield batch.start, embeddings
+        
+    def get_text_embedding(self, text):
+        return self._encode_texts([text])[0]
         
-        return text_embedding
\ No newline at end of file
+    def get_text_embeddings(self, texts):
+        """Calcula los embeddings normalizados de una lista de textos en una sola pasada"""
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+            
+        return self._encode_texts(texts)
\ No newline at end of file
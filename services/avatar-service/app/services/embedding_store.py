@@ -0,0 +1,204 @@
+import os
+import json
+import uuid
+import hashlib
+import numpy as np
+
+from .embedding_service import EMBEDDING_DIM
+
+EMBEDDING_STORE_DIR = "./assets/cache/embeddings"
+
+def _write_json_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _indexed_matrix(index_path):
+    """Nombre de la matriz que nombra el índice actual, o None si no hay un índice legible"""
+    try:
+        with open(index_path) as f:
+            return json.load(f).get("matrix", "embeddings.npy")
+    except (OSError, ValueError):
+        return None
+
+class EmbeddingStore:
+    """
+    Almacén persistente de embeddings de avatares compartido por la carga y el servicio.
+    
+    Cada versión de modelo tiene su propio directorio con una matriz embeddings-<token>.npy
+    (N, 512) float32 y un índice JSON con el nombre de esa matriz y el id (hash del
+    contenido), el fichero y los metadatos de cada fila. La matriz se abre con
+    np.load(mmap_mode="r"), de modo que leerla no copia nada a memoria y varios procesos
+    comparten las mismas páginas.
+    """
+    
+    def __init__(self, model_version, root=None):
+        self.model_version = model_version
+        self.root = root or os.environ.get("EMBEDDING_STORE_DIR", EMBEDDING_STORE_DIR)
+        key = hashlib.sha256(model_version.encode("utf-8")).hexdigest()[:16]
+        self.directory = os.path.join(self.root, key)
+        self.matrix_path = None
+        self.index_path = os.path.join(self.directory, "index.json")
+        self.embeddings = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        self.entries = {}
+        
+    def __len__(self):
+        return len(self.entries)
+        
+    def __contains__(self, avatar_id):
+        return avatar_id in self.entries
+        
+    def open(self, attempts=3):
+        """
+        Carga el índice y abre con mmap la matriz que nombra. Devuelve False si el almacén
+        no existe, es de otra versión de modelo o la matriz y el índice no concuerdan; en
+        ese caso el almacén queda vacío.
+        """
+        self.embeddings = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        self.entries = {}
+        self.matrix_path = None
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            for attempt in range(attempts):
+                with open(self.index_path) as f:
+                    index = json.load(f)
+                matrix_path = os.path.join(self.directory, index.get("matrix", "embeddings.npy"))
+                try:
+                    embeddings = np.load(matrix_path, mmap_mode="r")
+                    break
+                except FileNotFoundError:
+                    # Un commit() concurrente acaba de sustituir el índice y borrar la matriz
+                    # anterior: se vuelve a leer el índice
+                    if attempt == attempts - 1:
+                        raise
+        except Exception as e:
+            print(f"ERROR al abrir el almacén de embeddings {self.directory}: {str(e)}")
+            return False
+        if index.get("model_version") != self.model_version:
+            print(f"El almacén de embeddings {self.directory} es de otro modelo, se ignora")
+            return False
+        if embeddings.shape != (len(index["avatars"]), EMBEDDING_DIM):
+            print(f"El almacén de embeddings {self.directory} está incompleto, se ignora")
+            return False
+        self.embeddings = embeddings
+        self.matrix_path = matrix_path
+        self.entries = {entry["avatar_id"]: entry for entry in index["avatars"]}
+        return True
+        
+    def get_embedding(self, avatar_id):
+        """Fila de la matriz mapeada en memoria (una vista, sin copia)"""
+        return self.embeddings[self.entries[avatar_id]["row"]]
+        
+    def get_record(self, avatar_id):
+        """Registro con el formato de RedisService.store_avatars"""
+        entry = self.entries[avatar_id]
+        metadata = entry["metadata"]
+        return {
+            "avatar_id": avatar_id,
+            "filename": entry["filename"],
+            "gender": metadata.get("gender", "unknown"),
+            "race": metadata.get("race", "unknown"),
+            "job": metadata.get("job", "unknown"),
+            "age": metadata.get("age", 30),
+            "embedding": self.embeddings[entry["row"]]
+        }
+        
+    def iter_avatars(self, avatar_ids=None):
+        """Registros de los avatares indicados (todos por defecto) en orden de fila"""
+        if avatar_ids is None:
+            avatar_ids = self.entries
+        rows = sorted((self.entries[avatar_id]["row"], avatar_id) for avatar_id in avatar_ids
+                      if avatar_id in self.entries)
+        for _, avatar_id in rows:
+            yield self.get_record(avatar_id)
+            
+    def writer(self):
+        return EmbeddingStoreWriter(self)
+
+class EmbeddingStoreWriter:
+    """
+    Acumula los embeddings calculados durante una carga y al terminar escribe el almacén.
+    
+    Las filas nuevas se van añadiendo a un fichero temporal en disco (no se retienen en
+    memoria); commit() compone la nueva matriz con las filas existentes que se
+    conservan y las nuevas en un fichero con un nombre nuevo y después sustituye el
+    índice, que la nombra, con os.replace: ese es el único punto en que cambia el
+    almacén, así que una caída antes deja intacto el anterior. Los procesos que ya
+    tengan abierta la matriz anterior siguen leyendo su copia.
+    """
+    
+    def __init__(self, store):
+        self.store = store
+        os.makedirs(store.directory, exist_ok=True)
+        self.rows_path = os.path.join(store.directory, f".rows-{os.getpid()}.f32")
+        self.matrix_tmp_path = os.path.join(store.directory, f".embeddings-{os.getpid()}.tmp.npy")
+        self.rows_file = open(self.rows_path, "wb")
+        self.entries = []
+        self.renamed = {}
+        
+    def add(self, records, metadata):
+        for record in records:
+            np.asarray(record["embedding"], dtype=np.float32).tofile(self.rows_file)
+            self.entries.append({
+                "avatar_id": record["avatar_id"],
+                "filename": record["filename"],
+                "metadata": metadata[record["filename"]]
+            })
+            
+    def rename(self, filenames):
+        """Anota el nuevo nombre de fichero {avatar_id: filename} de filas ya almacenadas"""
+        self.renamed.update(filenames)
+        
+    def commit(self, keep_ids, chunk_size=8192):
+        """Escribe el almacén con las filas existentes de keep_ids más las añadidas y lo reabre"""
+        store = self.store
+        self.rows_file.close()
+        added_ids = {entry["avatar_id"] for entry in self.entries}
+        kept = [dict(entry, filename=self.renamed.get(avatar_id, entry["filename"]))
+                for avatar_id, entry in store.entries.items()
+                if avatar_id in keep_ids and avatar_id not in added_ids]
+        kept.sort(key=lambda entry: entry["row"])
+        total = len(kept) + len(self.entries)
+        
+        tmp_path = self.matrix_tmp_path
+        matrix = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(total, EMBEDDING_DIM))
+        for start in range(0, len(kept), chunk_size):
+            rows = [entry["row"] for entry in kept[start:start + chunk_size]]
+            matrix[start:start + len(rows)] = store.embeddings[rows]
+        if self.entries:
+            matrix[len(kept):] = np.memmap(self.rows_path, dtype=np.float32, mode="r",
+                                           shape=(len(self.entries), EMBEDDING_DIM))
+        matrix.flush()
+        del matrix
+        
+        avatars = [dict(entry, row=row) for row, entry in enumerate(kept + self.entries)]
+        matrix_name = f"embeddings-{uuid.uuid4().hex[:16]}.npy"
+        os.replace(tmp_path, os.path.join(store.directory, matrix_name))
+        previous_matrix = _indexed_matrix(store.index_path)
+        _write_json_atomic(store.index_path, {
+            "model_version": store.model_version,
+            "dim": EMBEDDING_DIM,
+            "matrix": matrix_name,
+            "avatars": avatars
+        })
+        os.remove(self.rows_path)
+        # La matriz anterior ya no la nombra el índice (quien la tenga abierta con mmap
+        # conserva su copia hasta cerrarla)
+        if previous_matrix and previous_matrix != matrix_name:
+            previous_path = os.path.join(store.directory, previous_matrix)
+            if os.path.exists(previous_path):
+                os.remove(previous_path)
+        store.open()
+        print(f"Almacén de embeddings actualizado: {total} avatares ({len(self.entries)} nuevos) en {store.directory}")
+        return total
+        
+    def abort(self):
+        """Descarta la escritura y borra los ficheros temporales (no hace nada tras commit())"""
+        self.rows_file.close()
+        for path in (self.rows_path, self.matrix_tmp_path):
+            if os.path.exists(path):
+                os.remove(path)
\ No newline at end of file
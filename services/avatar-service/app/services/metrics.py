@@ -0,0 +1,186 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Formato de exposición de texto de Prometheus (Starlette añade el charset)
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Buckets de latencia en segundos, de 0,5 ms a 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(labelnames, values):
+    if not labelnames:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Metric:
+    """
+    Base de las métricas: un valor por combinación de etiquetas, protegido por un lock
+    (se actualizan desde el event loop y desde los hilos del executor de embeddings).
+    """
+    kind = "untyped"
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+        
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labelnames, key), value
+            
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{labels} {_format_value(value)}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+    
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Histogram(Metric):
+    """Histograma con buckets fijos: observe() es una búsqueda binaria y tres sumas"""
+    kind = "histogram"
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+            
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+            
+    def samples(self):
+        with self._lock:
+            values = {key: (list(state[0]), state[1], state[2]) for key, state in self._values.items()}
+        labelnames = self.labelnames + ("le",)
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", _format_labels(labelnames, key + (_format_value(bound),)), cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+class CallbackMetric(Metric):
+    """
+    Métrica que se calcula al exponerla a partir de las estadísticas que ya lleva otro
+    componente (cachés, pool de Redis...). El callback devuelve un número o un dict
+    {tupla de valores de etiquetas: número}.
+    """
+    
+    def __init__(self, name, documentation, kind, labelnames, callback):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+        
+    def samples(self):
+        try:
+            values = self.callback()
+        except Exception as e:
+            print(f"Could not collect metric {self.name}: {str(e)}")
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            if value is not None:
+                yield self.name, _format_labels(self.labelnames, key), value
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+        
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+        
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+        
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+        
+    def callback(self, name, documentation, callback, kind="gauge", labelnames=()):
+        return self.register(CallbackMetric(name, documentation, kind, labelnames, callback))
+        
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que cuenta las peticiones HTTP y mide su duración por ruta, método
+    y código de estado. Las rutas que no son de la aplicación se agrupan en "other"
+    para no crear una serie por cada URL desconocida.
+    """
+    
+    def __init__(self, app, requests, latency, routes):
+        self.app = app
+        self.requests = requests
+        self.latency = latency
+        self.routes = routes
+        self.paths = None
+        
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+            
+        start = time.perf_counter()
+        status = [500]
+        
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+            
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Las rutas se leen en la primera petición, cuando ya están todas registradas
+            if self.paths is None:
+                self.paths = {route.path for route in self.routes}
+            path = scope["path"] if scope["path"] in self.paths else "other"
+            self.requests.inc(method=scope["method"], path=path, status=status[0])
+            self.latency.observe(time.perf_counter() - start, method=scope["method"], path=path)
\ No newline at end of file
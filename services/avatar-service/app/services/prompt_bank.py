@@ -0,0 +1,86 @@
+import os
+import hashlib
+import numpy as np
+
+# Categorías para la clasificación zero-shot: cada opción se asocia al valor que se guarda
+DEFAULT_CATEGORIES = {
+    "gender": {"male": "male", "female": "female"},
+    "race": {"human": "human", "elf": "elf", "dwarf": "dwarf", "orc": "orc", "undead": "undead"},
+    "job": {"warrior": "warrior", "mage": "mage", "archer": "archer", "rogue": "rogue", "paladin": "paladin"},
+    "age": {"young": 20, "adult": 30, "middle-aged": 45, "elderly": 60}
+}
+PROMPT_TEMPLATE = "a {option} character"
+
+class PromptBank:
+    """Matriz precalculada de embeddings de prompts para clasificar avatares con CLIP"""
+    
+    def __init__(self, categories=None, template=PROMPT_TEMPLATE, cache_dir=None):
+        self.categories = categories or DEFAULT_CATEGORIES
+        self.template = template
+        self.cache_dir = cache_dir if cache_dir is not None else os.environ.get("PROMPT_CACHE_DIR", "./assets/cache")
+        self.prompts = []
+        self.slices = {}
+        for category, options in self.categories.items():
+            start = len(self.prompts)
+            self.prompts.extend(self.template.format(option=option) for option in options)
+            self.slices[category] = slice(start, len(self.prompts))
+        self.matrix = None
+        
+    def cache_path(self, model_version):
+        key = hashlib.sha256("\n".join([model_version] + self.prompts).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"prompt_bank_{key[:16]}.npy")
+        
+    def load(self, embedding_service):
+        """Carga la matriz desde disco o la calcula con el codificador de texto y la persiste"""
+        path = self.cache_path(embedding_service.model_version)
+        if os.path.exists(path):
+            try:
+                matrix = np.load(path)
+            except (OSError, ValueError) as e:
+                # Un fichero ilegible se trata como un fallo de caché: se recalcula y se reescribe
+                print(f"Could not read prompt bank from {path}: {str(e)}")
+                matrix = np.empty((0, 0), dtype=np.float32)
+            if matrix.shape[0] == len(self.prompts):
+                self.matrix = matrix.astype(np.float32, copy=False)
+                print(f"Prompt bank loaded from {path}")
+                return self.matrix
+                
+        self.matrix = embedding_service.get_text_embeddings(self.prompts)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Nombre temporal propio de cada proceso: varios pueden guardar la matriz a la vez
+            tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, self.matrix)
+            os.replace(tmp_path, path)
+            print(f"Prompt bank saved to {path}")
+        except OSError as e:
+            print(f"Could not persist prompt bank to {path}: {str(e)}")
+        return self.matrix
+        
+    def classify(self, image_embeddings):
+        """
+        Clasifica un lote de embeddings de imagen (N, D) en todas las categorías.
+        
+        Devuelve una lista de N diccionarios de metadatos y un diccionario con las
+        puntuaciones ganadoras (N,) por categoría.
+        """
+        if self.matrix is None:
+            raise RuntimeError("PromptBank not loaded")
+            
+        image_embeddings = np.atleast_2d(np.asarray(image_embeddings, dtype=np.float32))
+        scores = image_embeddings @ self.matrix.T
+        
+        labels = {}
+        best_scores = {}
+        for category, options in self.categories.items():
+            category_scores = scores[:, self.slices[category]]
+            best = np.argmax(category_scores, axis=1)
+            values = list(options.values())
+            labels[category] = [values[i] for i in best]
+            best_scores[category] = category_scores[np.arange(len(best)), best]
+            
+        metadata = [
+            {category: labels[category][row] for category in self.categories}
+            for row in range(image_embeddings.shape[0])
+        ]
+        return metadata, best_scores
\ No newline at end of file
@@ -1,12 +1,39 @@
+import os
 import redis
+import redis.asyncio as aioredis
 import numpy as np
 from redis.commands.search.query import Query
+from redis.commands.search.result import Result
+
+from .cache import GENERATION_KEY
+
+# Campos TAG del índice que admiten filtros exactos en la búsqueda
+FILTER_TAG_FIELDS = ("gender", "race", "job")
+
+# Formatos de almacenamiento de los embeddings: tipo numpy y TYPE del campo VECTOR.
+# FLOAT16 requiere RediSearch 2.10 (Redis Stack 7.4) e INT8 RediSearch 8.0 (Redis 8)
+EMBEDDING_STORAGE_TYPES = {
+    "float32": (np.float32, "FLOAT32"),
+    "float16": (np.float16, "FLOAT16"),
+    "int8": (np.int8, "INT8")
+}
+# Formato con el que están codificados los embeddings guardados en los hashes
+STORAGE_KEY = "avatar_idx:storage"
+# Existe mientras dura una conversión de formato: si el proceso cae, se reanuda al arrancar
+CONVERSION_KEY = "avatar_idx:storage:converting"
+# Índice vacío con el que se comprueba si Redis admite un TYPE antes de borrar avatar_idx
+PROBE_INDEX = "avatar_idx:probe"
+# Dimensión de los embeddings de CLIP (igual que EMBEDDING_DIM de embedding_service)
+EMBEDDING_DIM = 512
 
 class RedisService:
-    def __init__(self, host="localhost", port=6379, password=None):
+    def __init__(self, host="localhost", port=6379, password=None, write_chunk_size=500, scan_count=1000, storage=None):
         self.host = host
         self.port = port
         self.password = password
+        self.write_chunk_size = write_chunk_size
+        self.scan_count = scan_count
+        self.storage = _storage_name(storage)
         self.client = None
         
     def connect(self):
@@ -24,28 +51,70 @@ class RedisService:
             self.client.close()
             print("Redis connection closed")
         
+    def index_field_types(self):
+        """Devuelve {campo: tipo} del índice avatar_idx, o {} si no existe"""
+        try:
+            info = self.client.ft("avatar_idx").info()
+        except redis.exceptions.ResponseError:
+            return {}
+        field_types = {}
+        for attribute in info.get("attributes", []):
+            attribute = [_to_str(value) for value in attribute]
+            if "attribute" in attribute and "type" in attribute:
+                name = attribute[attribute.index("attribute") + 1]
+                field_types[name] = attribute[attribute.index("type") + 1]
+        return field_types
+        
+    def stored_embedding_storage(self):
+        storage = self.client.get(STORAGE_KEY)
+        return _to_str(storage) if storage else "float32"
+        
+    def vector_type_supported(self, storage):
+        """Crea y borra un índice de prueba vacío para saber si este Redis admite el TYPE del formato"""
+        try:
+            self.client.execute_command("FT.DROPINDEX", PROBE_INDEX)
+        except redis.exceptions.ResponseError:
+            pass
+        try:
+            self.client.execute_command(*index_create_args(PROBE_INDEX, f"{PROBE_INDEX}:", storage))
+        except redis.exceptions.ResponseError as e:
+            print(f"Redis does not support {storage} embeddings: {str(e)}")
+            return False
+        self.client.execute_command("FT.DROPINDEX", PROBE_INDEX)
+        return True
+        
     def create_vector_index(self):
         try:
-            embedding_dim = 512
-            
-            self.client.execute_command(
-                "FT.CREATE", 
-                "avatar_idx",
-                "ON", "HASH",
-                "PREFIX", "1", "avatar:",
-                "SCHEMA",
-                "avatar_id", "TEXT",
-                "filename", "TEXT",
-                "gender", "TEXT",
-                "race", "TEXT", 
-                "job", "TEXT",
-                "age", "NUMERIC",
-                "embedding", "VECTOR", "HNSW", "6", 
-                    "TYPE", "FLOAT32",
-                    "DIM", str(embedding_dim),
-                    "DISTANCE_METRIC", "COSINE"
-            )
+            # Los índices antiguos definían gender/race/job como TEXT y no admiten filtros TAG;
+            # FT.DROPINDEX sin DD conserva los hashes, que se reindexan al recrear el índice.
+            # Lo mismo ocurre si cambia el formato de almacenamiento de los embeddings
+            stored_storage = self.stored_embedding_storage()
+            # Una conversión interrumpida deja hashes en ambos formatos: se retoma aunque
+            # STORAGE_KEY ya coincida con el formato configurado
+            storage_changed = stored_storage != self.storage or bool(self.client.exists(CONVERSION_KEY))
+            field_types = self.index_field_types()
+            outdated_schema = any(field_types.get(field) != "TAG" for field in FILTER_TAG_FIELDS)
+            if field_types and (outdated_schema or storage_changed):
+                # Si Redis no admite el nuevo TYPE se conserva el índice actual en lugar de
+                # borrarlo y quedarse sin ninguno
+                if not self.vector_type_supported(self.storage):
+                    return False
+                print("Index schema is outdated, recreating it")
+                self.client.execute_command("FT.DROPINDEX", "avatar_idx")
+                
+            self.client.execute_command(*index_create_args("avatar_idx", "avatar:", self.storage))
             print("Vector index created")
+            
+            # Los hashes se recodifican después de crear el índice para no dejarlos en un
+            # formato que este Redis no sabe indexar; cada HSET los vuelve a indexar
+            if storage_changed:
+                self.client.set(CONVERSION_KEY, self.storage)
+                converted = self.convert_embeddings(self.storage)
+                self.client.set(STORAGE_KEY, self.storage)
+                self.client.delete(CONVERSION_KEY)
+                print(f"Converted {converted} embeddings from {stored_storage} to {self.storage}")
+                if converted:
+                    self.bump_index_generation()
             return True
         except redis.exceptions.ResponseError as e:
             if "Index already exists" in str(e):
@@ -55,42 +124,378 @@ class RedisService:
                 print(f"Error creating index: {str(e)}")
                 return False
                 
-    def store_avatar(self, avatar_id, filename, gender, race, job, age, embedding):
-        embedding_bytes = embedding.astype(np.float32).tobytes()
+    def _avatar_mapping(self, avatar_id, filename, gender, race, job, age, embedding):
+        embedding_bytes, scale = encode_vector(embedding, self.storage)
+        mapping = {
+            "avatar_id": str(avatar_id),
+            "filename": filename,
+            "gender": gender,
+            "race": race,
+            "job": job,
+            "age": str(age),
+            "embedding": embedding_bytes
+        }
+        if scale is not None:
+            mapping["embedding_scale"] = repr(scale)
+        return mapping
         
+    def store_avatar(self, avatar_id, filename, gender, race, job, age, embedding):
         self.client.hset(
             f"avatar:{avatar_id}",
-            mapping={
-                "avatar_id": str(avatar_id),
-                "filename": filename,
-                "gender": gender,
-                "race": race,
-                "job": job,
-                "age": str(age),
-                "embedding": embedding_bytes
-            }
+            mapping=self._avatar_mapping(avatar_id, filename, gender, race, job, age, embedding)
         )
         
-    def find_similar_avatars(self, embedding, top_k=5):
-        embedding_bytes = embedding.astype(np.float32).tobytes()
-        query = (
-            Query(f"(*)=>[KNN {top_k} @embedding $embedding_param AS vector_score]")
-            .dialect(2)
+    def store_avatars(self, avatars, chunk_size=None):
+        """
+        Almacena avatares en bloque mediante pipelines de chunk_size comandos.
+        
+        avatars es un iterable de diccionarios con los mismos campos que store_avatar.
+        Devuelve la lista de avatar_id almacenados correctamente.
+        """
+        chunk_size = chunk_size or self.write_chunk_size
+        stored = []
+        chunk = []
+        for avatar in avatars:
+            chunk.append(avatar)
+            if len(chunk) >= chunk_size:
+                stored.extend(self._store_chunk(chunk))
+                chunk = []
+        if chunk:
+            stored.extend(self._store_chunk(chunk))
+        return stored
+        
+    def _store_chunk(self, chunk):
+        pipe = self.client.pipeline(transaction=False)
+        for avatar in chunk:
+            pipe.hset(f"avatar:{avatar['avatar_id']}", mapping=self._avatar_mapping(**avatar))
+        results = pipe.execute(raise_on_error=False)
+        
+        stored = []
+        for avatar, result in zip(chunk, results):
+            if isinstance(result, Exception):
+                print(f"Error storing avatar {avatar['avatar_id']}: {str(result)}")
+            else:
+                stored.append(avatar["avatar_id"])
+        return stored
+        
+    def rename_avatars(self, filenames, chunk_size=None):
+        """Actualiza en bloque el campo filename de los avatares {avatar_id: filename}"""
+        chunk_size = chunk_size or self.write_chunk_size
+        items = list(filenames.items())
+        for start in range(0, len(items), chunk_size):
+            pipe = self.client.pipeline(transaction=False)
+            for avatar_id, filename in items[start:start + chunk_size]:
+                pipe.hset(f"avatar:{avatar_id}", "filename", filename)
+            pipe.execute()
+            
+    def scan_avatar_keys(self, batch_size=None):
+        """Recorre las claves avatar:* con SCAN y las devuelve en lotes sin bloquear Redis"""
+        batch_size = batch_size or self.scan_count
+        batch = []
+        for key in self.client.scan_iter(match="avatar:*", count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+            
+    def has_avatars(self):
+        """Indica si hay algún avatar almacenado; SCAN en lugar de KEYS para no bloquear Redis"""
+        return any(True for _ in self.client.scan_iter(match="avatar:*", count=self.scan_count))
+        
+    def get_indexed_avatars(self):
+        """Devuelve {avatar_id: filename} de todos los avatares almacenados"""
+        avatars = {}
+        for keys in self.scan_avatar_keys():
+            pipe = self.client.pipeline(transaction=False)
+            for key in keys:
+                pipe.hget(key, "filename")
+            for key, filename in zip(keys, pipe.execute()):
+                avatar_id = key.decode("utf-8").split(":", 1)[1]
+                avatars[avatar_id] = filename.decode("utf-8") if filename else None
+        return avatars
+        
+    def iter_avatars(self):
+        """Recorre todos los avatares almacenados (atributos y embedding) por lotes de SCAN"""
+        fields = ["avatar_id", "filename", "gender", "race", "job", "age", "embedding", "embedding_scale"]
+        for keys in self.scan_avatar_keys():
+            pipe = self.client.pipeline(transaction=False)
+            for key in keys:
+                pipe.hmget(key, fields)
+            for values in pipe.execute():
+                avatar = dict(zip(fields, values))
+                if avatar["embedding"] is None:
+                    continue
+                yield {
+                    "avatar_id": _to_str(avatar["avatar_id"]),
+                    "filename": _to_str(avatar["filename"]),
+                    "gender": _to_str(avatar["gender"]),
+                    "race": _to_str(avatar["race"]),
+                    "job": _to_str(avatar["job"]),
+                    "age": int(avatar["age"]),
+                    "embedding": decode_vector(avatar["embedding"], blob_storage(avatar["embedding"]) or self.storage,
+                                               avatar["embedding_scale"])
+                }
+                
+    def convert_embeddings(self, to_storage):
+        """
+        Recodifica en bloque los embeddings guardados al formato to_storage.
+        
+        El formato de cada hash se deduce de la longitud de su embedding, de modo que los
+        que ya están en to_storage se omiten: una conversión interrumpida o lanzada a la
+        vez por dos procesos no vuelve a recodificar (ni corrompe) los ya convertidos.
+        """
+        converted = 0
+        for keys in self.scan_avatar_keys():
+            pipe = self.client.pipeline(transaction=False)
+            for key in keys:
+                pipe.hmget(key, ["embedding", "embedding_scale"])
+            values = pipe.execute()
+            
+            # MULTI por lote: el embedding y su escala cambian a la vez
+            pipe = self.client.pipeline(transaction=True)
+            for key, (embedding_bytes, scale) in zip(keys, values):
+                from_storage = blob_storage(embedding_bytes) if embedding_bytes is not None else None
+                if from_storage is None or from_storage == to_storage:
+                    continue
+                embedding = decode_vector(embedding_bytes, from_storage, scale)
+                embedding_bytes, scale = encode_vector(embedding, to_storage)
+                pipe.hset(key, "embedding", embedding_bytes)
+                if scale is None:
+                    pipe.hdel(key, "embedding_scale")
+                else:
+                    pipe.hset(key, "embedding_scale", repr(scale))
+                converted += 1
+            pipe.execute()
+        return converted
+                
+    def unlink_keys(self, keys, batch_size=None):
+        """Elimina claves con UNLINK en lotes; la memoria se libera en segundo plano"""
+        batch_size = batch_size or self.write_chunk_size
+        keys = list(keys)
+        deleted = 0
+        for start in range(0, len(keys), batch_size):
+            deleted += self.client.unlink(*keys[start:start + batch_size])
+        return deleted
+        
+    def delete_avatars(self, avatar_ids):
+        return self.unlink_keys(f"avatar:{avatar_id}" for avatar_id in avatar_ids)
+        
+    def clear_avatars(self):
+        deleted = 0
+        for keys in self.scan_avatar_keys():
+            deleted += self.unlink_keys(keys)
+        return deleted
+        
+    def index_available(self):
+        try:
+            self.client.ft("avatar_idx").info()
+            return True
+        except redis.exceptions.ResponseError:
+            return False
+            
+    def bump_index_generation(self):
+        """Marca el índice como modificado para invalidar las cachés de resultados"""
+        return self.client.incr(GENERATION_KEY)
+        
+    def find_similar_avatars(self, embedding, top_k=5, filters=None, ef_runtime=None):
+        query, params = build_similarity_query(embedding, top_k, filters, ef_runtime, self.storage)
+        results = self.client.ft("avatar_idx").search(query, params).docs
+        return parse_avatar_results(results)
+
+class AsyncRedisService:
+    """Cliente asyncio con un pool de conexiones acotado para las búsquedas de la API"""
+
+    def __init__(self, host="localhost", port=6379, password=None, max_connections=20, pool_timeout=5, storage=None):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self.storage = _storage_name(storage)
+        self.pool = None
+        self.client = None
+
+    async def connect(self):
+        # BlockingConnectionPool hace esperar a las peticiones cuando el pool está lleno
+        # en lugar de abrir conexiones sin límite
+        self.pool = aioredis.BlockingConnectionPool(
+            host=self.host,
+            port=self.port,
+            password=self.password,
+            max_connections=self.max_connections,
+            timeout=self.pool_timeout,
+            decode_responses=False
         )
-        params = {"embedding_param": embedding_bytes}
+        self.client = aioredis.Redis(connection_pool=self.pool)
+        await self.client.ping()
+        print(f"Async Redis pool connected to {self.host}:{self.port} (max {self.max_connections} connections)")
+        
+    async def close(self):
+        if self.client:
+            await self.client.close()
+            await self.pool.disconnect()
+            print("Async Redis pool closed")
+            
+    def get_pool_stats(self):
+        """Conexiones del pool: máximo, creadas y en uso (las libres esperan en la cola del pool)"""
+        if self.pool is None:
+            return {}
+        stats = {"max": self.max_connections, "created": len(getattr(self.pool, "_connections", []))}
+        idle = getattr(self.pool, "pool", None)
+        if idle is not None:
+            stats["in_use"] = self.max_connections - idle.qsize()
+        return stats
+        
+    async def find_similar_avatars(self, embedding, top_k=5, filters=None, ef_runtime=None):
+        query, params = build_similarity_query(embedding, top_k, filters, ef_runtime, self.storage)
+        results = await self.client.ft("avatar_idx").search(query, params)
+        return parse_avatar_results(results.docs)
 
-        results = self.client.ft("avatar_idx").search(query, params).docs
+    async def find_similar_avatars_batch(self, searches):
+        """
+        Ejecuta varias búsquedas KNN en un solo round trip mediante un pipeline no transaccional.
+        
+        searches es una lista de diccionarios con embedding, top_k, filters y ef_runtime.
+        Devuelve, en el mismo orden, los avatares de cada búsqueda o la excepción de Redis
+        de esa consulta, sin que un error afecte a las demás.
+        """
+        pipe = self.client.pipeline(transaction=False)
+        for search in searches:
+            query, params = build_similarity_query(
+                search["embedding"], search.get("top_k", 5), search.get("filters"),
+                search.get("ef_runtime"), self.storage
+            )
+            pipe.execute_command(*similarity_search_args(query, params))
+        results = await pipe.execute(raise_on_error=False)
+        return [result if isinstance(result, Exception) else parse_avatar_results(Result(result, True).docs)
+                for result in results]
 
-        avatars = []
-        for res in results:
-            avatars.append({
-                "id": res["avatar_id"],
-                "filename": res["filename"],
-                "gender": res["gender"],
-                "race": res["race"],
-                "job": res["job"],
-                "age": int(res["age"]),
-                "similarity": 1.0 - float(res["vector_score"])
-            })
-        return avatars
+def _to_str(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+def _storage_name(storage):
+    storage = storage or os.environ.get("EMBEDDING_STORAGE", "float32")
+    if storage not in EMBEDDING_STORAGE_TYPES:
+        raise ValueError(f"Unknown embedding storage '{storage}', expected one of {list(EMBEDDING_STORAGE_TYPES)}")
+    return storage
+
+def encode_vector(embedding, storage="float32"):
+    """
+    Codifica un embedding en el formato de almacenamiento indicado.
+    
+    Devuelve (bytes, escala). En int8 cada vector se cuantiza con su propia escala
+    (max|x| / 127), que se guarda aparte para poder recuperar los valores; la
+    distancia coseno del índice no depende de ella.
+    """
+    embedding = np.asarray(embedding, dtype=np.float32)
+    if storage == "int8":
+        scale = float(np.abs(embedding).max()) / 127 or 1.0
+        return np.clip(np.round(embedding / scale), -127, 127).astype(np.int8).tobytes(), scale
+    return embedding.astype(EMBEDDING_STORAGE_TYPES[storage][0]).tobytes(), None
+
+def decode_vector(embedding_bytes, storage="float32", scale=None):
+    """Inversa de encode_vector: devuelve el embedding como float32"""
+    embedding = np.frombuffer(embedding_bytes, dtype=EMBEDDING_STORAGE_TYPES[storage][0]).astype(np.float32)
+    if storage == "int8" and scale is not None:
+        embedding *= float(scale)
+    return embedding
+
+def blob_storage(embedding_bytes, dim=EMBEDDING_DIM):
+    """Formato de un embedding guardado según su longitud (4, 2 o 1 bytes por componente)"""
+    for storage, (dtype, _) in EMBEDDING_STORAGE_TYPES.items():
+        if len(embedding_bytes) == dim * np.dtype(dtype).itemsize:
+            return storage
+    return None
+
+def index_create_args(index_name, prefix, storage):
+    """Argumentos de FT.CREATE del índice de avatares con los embeddings en el formato indicado"""
+    return [
+        "FT.CREATE",
+        index_name,
+        "ON", "HASH",
+        "PREFIX", "1", prefix,
+        "SCHEMA",
+        "avatar_id", "TEXT",
+        "filename", "TEXT",
+        "gender", "TAG",
+        "race", "TAG",
+        "job", "TAG",
+        "age", "NUMERIC",
+        "embedding", "VECTOR", "HNSW", "6",
+            "TYPE", EMBEDDING_STORAGE_TYPES[storage][1],
+            "DIM", str(EMBEDDING_DIM),
+            "DISTANCE_METRIC", "COSINE"
+    ]
+
+def escape_tag_value(value):
+    """Escapa los caracteres especiales de RediSearch dentro de un valor TAG"""
+    return "".join(f"\\{char}" if not char.isalnum() and char != "_" else char for char in str(value))
+
+def build_filter_expression(filters):
+    """
+    Traduce filtros estructurados al prefiltro de la consulta KNN.
+    
+    filters admite gender/race/job (un valor o una lista de valores alternativos)
+    y age_min/age_max. Sin filtros devuelve "*" (todo el conjunto).
+    """
+    clauses = []
+    for field in FILTER_TAG_FIELDS:
+        values = (filters or {}).get(field)
+        if not values:
+            continue
+        if isinstance(values, str):
+            values = [values]
+        clauses.append(f"@{field}:{{{' | '.join(escape_tag_value(value) for value in values)}}}")
+        
+    age_min = (filters or {}).get("age_min")
+    age_max = (filters or {}).get("age_max")
+    if age_min is not None or age_max is not None:
+        lower = "-inf" if age_min is None else age_min
+        upper = "+inf" if age_max is None else age_max
+        clauses.append(f"@age:[{lower} {upper}]")
+        
+    return " ".join(clauses) if clauses else "*"
+
+def build_similarity_query(embedding, top_k, filters=None, ef_runtime=None, storage="float32"):
+    """
+    Consulta KNN con los filtros aplicados como prefiltro: solo se ordenan los avatares
+    que los cumplen. ef_runtime ajusta por consulta la amplitud de búsqueda del HNSW.
+    El vector de consulta se codifica con el mismo formato que el índice.
+    """
+    embedding_bytes, _ = encode_vector(embedding, storage)
+    params = {"embedding_param": embedding_bytes}
+    knn = f"KNN {int(top_k)} @embedding $embedding_param"
+    if ef_runtime:
+        knn += " EF_RUNTIME $ef_runtime"
+        params["ef_runtime"] = int(ef_runtime)
+    query = (
+        Query(f"({build_filter_expression(filters)})=>[{knn} AS vector_score]")
+        .sort_by("vector_score")
+        .paging(0, int(top_k))
+        .dialect(2)
+    )
+    return query, params
+
+def similarity_search_args(query, params):
+    """Argumentos de FT.SEARCH de una consulta KNN, para enviarla dentro de un pipeline"""
+    args = ["FT.SEARCH", "avatar_idx", *query.get_args(), "PARAMS", len(params) * 2]
+    for key, value in params.items():
+        args.extend([key, value])
+    return args
+
+def parse_avatar_results(results):
+    avatars = []
+    for res in results:
+        avatars.append({
+            "id": res["avatar_id"],
+            "filename": res["filename"],
+            "gender": res["gender"],
+            "race": res["race"],
+            "job": res["job"],
+            "age": int(res["age"]),
+            "similarity": 1.0 - float(res["vector_score"])
+        })
+    return avatars
 
@@ -0,0 +1,47 @@
+import time
+from contextlib import contextmanager
+
+PROCESS_START = time.monotonic()
+
+class StartupState:
+    """Fases de arranque cronometradas y estado de liveness/readiness del servicio"""
+    
+    def __init__(self):
+        self.phases = {}
+        self.current_phase = None
+        self.model_ready = False
+        self.index_ready = False
+        self.ready_after = None
+        self.error = None
+        
+    @contextmanager
+    def phase(self, name):
+        self.current_phase = name
+        print(f"[startup] {name}...")
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = round(elapsed, 3)
+            self.current_phase = None
+            print(f"[startup] {name} took {elapsed:.2f}s")
+            
+    @property
+    def ready(self):
+        return self.model_ready and self.index_ready
+        
+    def mark_ready(self):
+        self.ready_after = round(time.monotonic() - PROCESS_START, 3)
+        print(f"[startup] service ready {self.ready_after:.2f}s after process start: {self.phases}")
+        
+    def as_dict(self):
+        return {
+            "ready": self.ready,
+            "model_ready": self.model_ready,
+            "index_ready": self.index_ready,
+            "current_phase": self.current_phase,
+            "phases": self.phases,
+            "ready_after_seconds": self.ready_after,
+            "error": self.error
+        }
\ No newline at end of file
@@ -0,0 +1,208 @@
+import os
+import time
+import numpy as np
+
+from .embedding_service import EMBEDDING_DIM
+from .redis_service import FILTER_TAG_FIELDS
+
+def kmeans(embeddings, n_lists, iterations=10, sample_size=None, seed=0):
+    """
+    K-means esférico sobre vectores normalizados (similitud coseno = producto escalar).
+    
+    Se entrena sobre una muestra de como mucho sample_size vectores y devuelve los
+    centroides normalizados (n_lists, dim).
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = sample_size or n_lists * 64
+    if len(embeddings) > sample_size:
+        embeddings = embeddings[rng.choice(len(embeddings), sample_size, replace=False)]
+    centroids = embeddings[rng.choice(len(embeddings), n_lists, replace=False)].copy()
+    
+    for _ in range(iterations):
+        assignments = np.argmax(embeddings @ centroids.T, axis=1)
+        for list_id in range(n_lists):
+            members = embeddings[assignments == list_id]
+            if len(members):
+                centroids[list_id] = members.sum(axis=0)
+            else:
+                # Lista vacía: se vuelve a sembrar con un vector al azar
+                centroids[list_id] = embeddings[rng.integers(len(embeddings))]
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+class LocalVectorIndex:
+    """
+    Índice vectorial en memoria sobre una matriz float32 contigua de embeddings normalizados.
+    
+    En modo "exact" calcula la similitud con todo el catálogo y extrae el top-k con
+    argpartition. En modo "ivf" agrupa los vectores con k-means en n_lists listas
+    contiguas y solo compara la consulta con las n_probe listas más cercanas.
+    Con mmap_path la matriz se guarda en disco y se abre con np.load(mmap_mode="r").
+    """
+    
+    def __init__(self, mode="exact", n_lists=0, n_probe=8, mmap_path=None):
+        if mode not in ("exact", "ivf"):
+            raise ValueError(f"Unknown local index mode '{mode}'")
+        self.mode = mode
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.mmap_path = mmap_path
+        self.generation = None
+        self.load_seconds = None
+        self._set_data(self._empty_data())
+        
+    @property
+    def size(self):
+        return len(self.ids)
+        
+    @property
+    def loaded(self):
+        return self.generation is not None
+        
+    def _empty_data(self):
+        return {
+            "ids": np.empty(0, dtype=object),
+            "filenames": np.empty(0, dtype=object),
+            "attributes": {field: np.empty(0, dtype=object) for field in FILTER_TAG_FIELDS},
+            "ages": np.empty(0, dtype=np.int32),
+            "embeddings": np.empty((0, EMBEDDING_DIM), dtype=np.float32),
+            "centroids": None,
+            "offsets": None
+        }
+        
+    def _set_data(self, data):
+        # Se sustituye todo de una vez: las búsquedas en curso siguen con la instantánea anterior
+        self.data = data
+        self.ids = data["ids"]
+        
+    def build(self, avatars, generation=None):
+        """Construye el índice a partir de un iterable de avatares como los de store_avatars"""
+        start = time.perf_counter()
+        avatars = list(avatars)
+        data = self._empty_data()
+        if avatars:
+            embeddings = np.stack([avatar["embedding"] for avatar in avatars]).astype(np.float32)
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
+            order = np.arange(len(avatars))
+            
+            if self.mode == "ivf" and len(avatars) > 1:
+                n_lists = min(self.n_lists or max(1, int(np.sqrt(len(avatars)))), len(avatars))
+                centroids = kmeans(embeddings, n_lists)
+                assignments = np.argmax(embeddings @ centroids.T, axis=1)
+                # Cada lista ocupa un tramo contiguo de la matriz
+                order = np.argsort(assignments, kind="stable")
+                counts = np.bincount(assignments, minlength=n_lists)
+                data["centroids"] = centroids
+                data["offsets"] = np.concatenate([[0], np.cumsum(counts)])
+                
+            self._fill_attributes(data, [avatars[i] for i in order])
+            data["embeddings"] = self._store_matrix(np.ascontiguousarray(embeddings[order]))
+            
+        self._finish_build(data, generation, start)
+        
+    def _fill_attributes(self, data, avatars):
+        data["ids"] = np.array([avatar["avatar_id"] for avatar in avatars], dtype=object)
+        data["filenames"] = np.array([avatar["filename"] for avatar in avatars], dtype=object)
+        for field in FILTER_TAG_FIELDS:
+            data["attributes"][field] = np.array([avatar[field] for avatar in avatars], dtype=object)
+        data["ages"] = np.array([int(avatar["age"]) for avatar in avatars], dtype=np.int32)
+        
+    def _finish_build(self, data, generation, start):
+        self._set_data(data)
+        self.generation = generation
+        self.load_seconds = round(time.perf_counter() - start, 3)
+        print(f"Local vector index built ({self.mode}): {self.size} avatars in {self.load_seconds:.2f}s")
+        
+    def _store_matrix(self, embeddings):
+        if not self.mmap_path:
+            return embeddings
+        os.makedirs(os.path.dirname(self.mmap_path) or ".", exist_ok=True)
+        tmp_path = f"{self.mmap_path}.tmp.npy"
+        np.save(tmp_path, embeddings)
+        os.replace(tmp_path, self.mmap_path)
+        return np.load(self.mmap_path, mmap_mode="r")
+        
+    def load_from_redis(self, redis_service, generation=None):
+        self.build(redis_service.iter_avatars(), generation)
+        
+    def load_from_store(self, store, generation=None):
+        """
+        Construye el índice desde un EmbeddingStore abierto. En modo exact (sin mmap_path)
+        se busca directamente sobre la matriz mapeada del almacén, que ya está
+        normalizada, sin copiarla a memoria; en modo ivf hay que reordenarla.
+        """
+        if self.mode == "ivf" or self.mmap_path:
+            return self.build(store.iter_avatars(), generation)
+        start = time.perf_counter()
+        data = self._empty_data()
+        if len(store):
+            self._fill_attributes(data, list(store.iter_avatars()))
+            data["embeddings"] = store.embeddings
+        self._finish_build(data, generation, start)
+        
+    def _filter_mask(self, data, rows, filters):
+        mask = np.ones(len(rows), dtype=bool)
+        for field in FILTER_TAG_FIELDS:
+            values = filters.get(field)
+            if values:
+                if isinstance(values, str):
+                    values = [values]
+                mask &= np.isin(data["attributes"][field][rows], values)
+        if filters.get("age_min") is not None:
+            mask &= data["ages"][rows] >= filters["age_min"]
+        if filters.get("age_max") is not None:
+            mask &= data["ages"][rows] <= filters["age_max"]
+        return mask
+        
+    def _candidate_rows(self, data, query):
+        if data["centroids"] is None:
+            return None
+        n_probe = min(self.n_probe, len(data["centroids"]))
+        probes = np.argpartition(-(data["centroids"] @ query), n_probe - 1)[:n_probe]
+        offsets = data["offsets"]
+        return np.concatenate([np.arange(offsets[p], offsets[p + 1]) for p in probes])
+        
+    def search(self, embedding, top_k=5, filters=None):
+        """Top-k por similitud coseno con el mismo formato que RedisService.find_similar_avatars"""
+        data = self.data
+        query = embedding.astype(np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        
+        rows = self._candidate_rows(data, query)
+        if filters:
+            if rows is None:
+                rows = np.arange(len(data["ids"]))
+            rows = rows[self._filter_mask(data, rows, filters)]
+        if rows is None:
+            scores = data["embeddings"] @ query
+            rows = np.arange(len(scores))
+        else:
+            scores = data["embeddings"][rows] @ query
+            
+        if not len(rows):
+            return []
+        top_k = min(top_k, len(rows))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        
+        return [{
+            "id": data["ids"][rows[i]],
+            "filename": data["filenames"][rows[i]],
+            "gender": data["attributes"]["gender"][rows[i]],
+            "race": data["attributes"]["race"][rows[i]],
+            "job": data["attributes"]["job"][rows[i]],
+            "age": int(data["ages"][rows[i]]),
+            "similarity": float(scores[i])
+        } for i in best]
+        
+    def get_stats(self):
+        return {
+            "mode": self.mode,
+            "size": self.size,
+            "lists": 0 if self.data["centroids"] is None else len(self.data["centroids"]),
+            "probes": self.n_probe if self.mode == "ivf" else None,
+            "memory_mapped": isinstance(self.data["embeddings"], np.memmap),
+            "generation": self.generation,
+            "load_seconds": self.load_seconds
+        }
\ No newline at end of file
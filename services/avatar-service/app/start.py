@@ -4,6 +4,7 @@ import redis
 import subprocess
 import sys
 from app.scripts.load_avatars import load_avatars
+from app.services.redis_service import RedisService
 
 def wait_for_redis():
     """Esperar a que Redis esté disponible"""
@@ -29,20 +30,23 @@ def wait_for_redis():
 
 def check_redis_has_avatars():
     """Verificar si Redis ya tiene avatares cargados"""
-    redis_host = os.environ.get("REDIS_HOST", "localhost")
-    redis_port = int(os.environ.get("REDIS_PORT", 6379))
+    redis_service = RedisService(
+        host=os.environ.get("REDIS_HOST", "localhost"),
+        port=int(os.environ.get("REDIS_PORT", 6379))
+    )
     
     try:
-        client = redis.Redis(host=redis_host, port=redis_port)
-        avatar_keys = client.keys("avatar:*")
-        client.close()
-        return len(avatar_keys) > 0
+        redis_service.connect()
+        try:
+            return redis_service.has_avatars()
+        finally:
+            redis_service.close()
     except Exception as e:
         print(f"Error verificando avatares en Redis: {str(e)}")
         return False
 
-def load_initial_avatars(force=False):
-    """Cargar avatares iniciales en Redis"""
+def load_initial_avatars(force=False, embedding_service=None):
+    """Cargar avatares iniciales en Redis, reutilizando el modelo de embedding_service si se pasa"""
     has_avatars = check_redis_has_avatars()
     force_load = os.environ.get("LOAD_AVATARS_ON_STARTUP", "true").lower() == "true"
     
@@ -59,7 +63,8 @@ def load_initial_avatars(force=False):
             # Asegurar que existe el directorio para el archivo de metadatos
             os.makedirs(os.path.dirname(metadata_file), exist_ok=True)
                 
-            load_avatars(avatars_dir, metadata_file)
+            load_avatars(avatars_dir, metadata_file, mode="full" if force else None,
+                         embedding_service=embedding_service)
             print("Avatares cargados correctamente")
             return True
         except Exception as e:
@@ -73,6 +78,13 @@ if __name__ == "__main__":
     if not wait_for_redis():
         sys.exit(1)
     
-    load_initial_avatars()
+    if os.environ.get("AVATAR_STARTUP_MODE", "shared") == "shared":
+        # Un solo proceso: la API responde a /health enseguida y la carga de avatares
+        # se hace dentro de la aplicación reutilizando su modelo CLIP
+        import uvicorn
+        os.environ["LOAD_AVATARS_IN_APP"] = "true"
+        uvicorn.run("app.main:app", host="0.0.0.0", port=8080)
+    else:
+        load_initial_avatars()
     
-    subprocess.run(["uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8080"])
\ No newline at end of file
+        subprocess.run(["uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8080"])
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""
+Comparativa de backends de inferencia de EmbeddingService (torch, torch-int8, onnx).
+
+Cada backend se ejecuta en un subproceso propio para medir su memoria residente de
+forma aislada. Se informa de la latencia por consulta de texto, el throughput de
+imágenes en lote, la memoria y la precisión: solapamiento del top-k de avatares
+frente al backend de referencia para consultas de texto y de imagen.
+
+    python -m benchmarks.bench_backends --avatars ../../assets/avatars --limit 200
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+QUERIES = [
+    "elf mage", "female dwarf warrior", "old human paladin", "orc rogue", "undead archer",
+    "young elf archer", "male human warrior", "dwarf paladin", "a hooded rogue with daggers",
+    "an elderly wizard with a long beard", "a female orc berserker", "a skeleton knight"
+]
+
+def resident_memory_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_worker(args):
+    from app.services.embedding_service import EmbeddingService
+
+    files = sorted(glob.glob(os.path.join(args.avatars, "*.png")))[:args.limit]
+    baseline_mb = resident_memory_mb()
+
+    start = time.perf_counter()
+    service = EmbeddingService(model_name=args.model, backend=args.worker, num_threads=args.threads)
+    service.initialize()
+    load_seconds = time.perf_counter() - start
+    loaded_mb = resident_memory_mb()
+
+    service.get_text_embedding(QUERIES[0])
+    latencies = []
+    for i in range(args.repeats):
+        start = time.perf_counter()
+        service.get_text_embedding(QUERIES[i % len(QUERIES)])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    images = service.get_image_embeddings(files, batch_size=args.batch_size)
+    batch_seconds = time.perf_counter() - start
+
+    single_image = []
+    for path in files[:min(len(files), args.repeats)]:
+        start = time.perf_counter()
+        service.get_image_embedding(path)
+        single_image.append(time.perf_counter() - start)
+
+    texts = service.get_text_embeddings(QUERIES)
+    np.save(os.path.join(args.out, f"{args.worker}_images.npy"), images)
+    np.save(os.path.join(args.out, f"{args.worker}_texts.npy"), texts)
+
+    latencies = np.array(latencies) * 1000
+    single_image = np.array(single_image) * 1000
+    result = {
+        "backend": args.worker,
+        "load_seconds": load_seconds,
+        "text_p50_ms": float(np.percentile(latencies, 50)),
+        "text_p95_ms": float(np.percentile(latencies, 95)),
+        "image_p50_ms": float(np.percentile(single_image, 50)),
+        "images_per_second": len(files) / batch_seconds,
+        "model_rss_mb": loaded_mb - baseline_mb,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+    with open(os.path.join(args.out, f"{args.worker}.json"), "w") as f:
+        json.dump(result, f)
+
+def top_k(queries, catalog, k):
+    scores = queries @ catalog.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+def overlap(reference, candidate):
+    return float(np.mean([len(set(r) & set(c)) / len(r) for r, c in zip(reference, candidate)]))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--avatars", default=os.environ.get("AVATARS_DIR", "./assets/avatars"))
+    parser.add_argument("--model", default="openai/clip-vit-base-patch32")
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch-int8", "onnx"])
+    parser.add_argument("--limit", type=int, default=200, help="Número máximo de avatares")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--json", help="Fichero donde guardar los resultados en JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    out = tempfile.mkdtemp(prefix="bench_backends_")
+    results = []
+    for backend in args.backends:
+        command = [
+            sys.executable, "-m", "benchmarks.bench_backends", "--worker", backend, "--out", out,
+            "--avatars", args.avatars, "--model", args.model, "--limit", str(args.limit),
+            "--batch-size", str(args.batch_size), "--repeats", str(args.repeats)
+        ]
+        if args.threads:
+            command += ["--threads", str(args.threads)]
+        print(f"Ejecutando backend {backend}...")
+        if subprocess.run(command).returncode != 0:
+            print(f"El backend {backend} ha fallado, se omite")
+            continue
+        with open(os.path.join(out, f"{backend}.json")) as f:
+            results.append(json.load(f))
+
+    if not results:
+        sys.exit(1)
+
+    reference = results[0]["backend"]
+    ref_images = np.load(os.path.join(out, f"{reference}_images.npy"))
+    ref_texts = np.load(os.path.join(out, f"{reference}_texts.npy"))
+    k = min(args.top_k, len(ref_images))
+    for result in results:
+        images = np.load(os.path.join(out, f"{result['backend']}_images.npy"))
+        texts = np.load(os.path.join(out, f"{result['backend']}_texts.npy"))
+        # Se compara con el catálogo de referencia, como ocurriría al cambiar de backend
+        # en el servicio sin reindexar, y con su propio catálogo
+        result["text_topk_overlap"] = overlap(top_k(ref_texts, ref_images, k), top_k(texts, images, k))
+        result["image_topk_overlap"] = overlap(top_k(ref_images, ref_images, k), top_k(images, images, k))
+        result["mixed_topk_overlap"] = overlap(top_k(ref_texts, ref_images, k), top_k(texts, ref_images, k))
+        result["max_abs_diff"] = float(np.abs(images - ref_images).max())
+
+    print(f"\nReferencia de precisión: {reference} (top-{k})")
+    print(f"{'backend':<11} {'carga s':>8} {'texto p50':>10} {'img p50':>8} {'img/s':>7} "
+          f"{'RSS MB':>7} {'top-k txt':>9} {'top-k img':>9} {'top-k mix':>9}")
+    for r in results:
+        print(f"{r['backend']:<11} {r['load_seconds']:>8.1f} {r['text_p50_ms']:>10.1f} {r['image_p50_ms']:>8.1f} "
+              f"{r['images_per_second']:>7.1f} {r['model_rss_mb']:>7.0f} {r['text_topk_overlap']:>9.3f} "
+              f"{r['image_topk_overlap']:>9.3f} {r['mixed_topk_overlap']:>9.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
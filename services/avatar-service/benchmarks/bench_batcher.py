@@ -0,0 +1,114 @@
+"""
+Benchmark del micro-batching de consultas con un modelo stub en CPU.
+
+El stub imita el perfil de coste de CLIP: cada llamada recorre unas matrices de
+pesos grandes, de modo que el coste por llamada domina con lotes pequeños. No
+necesita torch, transformers ni Redis:
+
+    python -m benchmarks.bench_batcher --clients 1 8 32 --requests 50
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+class StubEmbeddingService:
+    """Codificador sintético con la misma interfaz que EmbeddingService"""
+
+    def __init__(self, input_dim=1024, hidden_dim=4096, output_dim=512, seed=0):
+        rng = np.random.default_rng(seed)
+        self.w1 = rng.standard_normal((input_dim, hidden_dim)).astype(np.float32)
+        self.w2 = rng.standard_normal((hidden_dim, output_dim)).astype(np.float32)
+        self.input_dim = input_dim
+
+    def _features(self, items):
+        rows = []
+        for item in items:
+            seed = hash(item) & 0xFFFFFFFF
+            rows.append(np.random.default_rng(seed).standard_normal(self.input_dim, dtype=np.float32))
+        x = np.stack(rows)
+        out = np.maximum(x @ self.w1, 0) @ self.w2
+        return out / np.linalg.norm(out, axis=1, keepdims=True)
+
+    def get_text_embedding(self, text):
+        return self._features([text])[0]
+
+    def get_text_embeddings(self, texts):
+        return self._features(texts)
+
+    def get_image_embedding(self, image_data):
+        return self._features([image_data])[0]
+
+    def get_image_embeddings(self, images, batch_size=32, num_workers=4, skip_errors=False):
+        return self._features(images)
+
+async def run_clients(embed, clients, requests_per_client):
+    latencies = []
+
+    async def client(client_id):
+        for i in range(requests_per_client):
+            start = time.perf_counter()
+            await embed(f"query {client_id} {i}")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    return {
+        "throughput": clients * requests_per_client / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95))
+    }
+
+async def bench(clients, requests_per_client, max_batch_size, max_wait_ms, workers):
+    service = StubEmbeddingService()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    loop = asyncio.get_running_loop()
+    results = []
+
+    for n in clients:
+        direct = await run_clients(
+            lambda text: loop.run_in_executor(executor, service.get_text_embedding, text),
+            n, requests_per_client
+        )
+        results.append({"clients": n, "mode": "direct", **direct})
+
+        batcher = EmbeddingBatcher(service, executor, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        batcher.start()
+        batched = await run_clients(batcher.get_text_embedding, n, requests_per_client)
+        stats = batcher.get_stats()["text"]
+        await batcher.stop()
+        results.append({"clients": n, "mode": "batched", **batched, "avg_batch_size": stats["avg_batch_size"]})
+
+    executor.shutdown()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=50, help="Peticiones por cliente")
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=2, help="Hilos del executor de embeddings")
+    parser.add_argument("--json", help="Fichero donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(bench(args.clients, args.requests, args.max_batch_size, args.max_wait_ms, args.workers))
+
+    print(f"{'clientes':>8} {'modo':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'lote medio':>10}")
+    for r in results:
+        print(f"{r['clients']:>8} {r['mode']:<8} {r['throughput']:>8.1f} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r.get('avg_batch_size', 1.0):>10.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
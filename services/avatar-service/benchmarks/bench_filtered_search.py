@@ -0,0 +1,175 @@
+"""
+Benchmark de búsqueda KNN filtrada: latencia y recall@k según la selectividad del filtro.
+
+Carga un catálogo sintético con atributos aleatorios y compara, para cada filtro y
+cada valor de EF_RUNTIME:
+
+  - prefiltro: el filtro va dentro de la consulta KNN (lo que hace la API)
+  - postfiltro: KNN sobre todo el índice y filtrado posterior en el cliente (antes)
+
+El recall se mide frente a la búsqueda exacta por fuerza bruta sobre el subconjunto
+que cumple el filtro. Requiere un Redis Stack local:
+
+    docker run -d -p 6379:6379 redis/redis-stack:latest
+    python -m benchmarks.bench_filtered_search --size 100000 --ef 10 50 200
+
+ATENCIÓN: borra todas las claves avatar:* de la instancia indicada.
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+from app.services.redis_service import RedisService
+
+GENDERS = ["male", "female"]
+RACES = ["human", "elf", "dwarf", "orc", "undead"]
+JOBS = ["warrior", "mage", "archer", "rogue", "paladin"]
+AGES = [20, 30, 45, 60]
+
+# Filtros de selectividad creciente (fracción aproximada del catálogo entre paréntesis)
+SCENARIOS = [
+    ("sin filtro (100%)", {}),
+    ("race (20%)", {"race": ["elf"]}),
+    ("race+job (4%)", {"race": ["elf"], "job": ["mage"]}),
+    ("race+job+gender (2%)", {"race": ["elf"], "job": ["mage"], "gender": ["female"]}),
+    ("race+job+gender+age (1%)", {"race": ["elf"], "job": ["mage"], "gender": ["female"], "age_min": 20, "age_max": 30}),
+]
+
+def synthetic_catalog(count, dim=512, seed=0):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((count, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    attributes = {
+        "gender": np.array(GENDERS)[rng.integers(len(GENDERS), size=count)],
+        "race": np.array(RACES)[rng.integers(len(RACES), size=count)],
+        "job": np.array(JOBS)[rng.integers(len(JOBS), size=count)],
+        "age": np.array(AGES)[rng.integers(len(AGES), size=count)],
+    }
+    return embeddings, attributes
+
+def catalog_records(embeddings, attributes):
+    for i, embedding in enumerate(embeddings):
+        yield {
+            "avatar_id": f"bench{i:08d}",
+            "filename": f"bench_{i:08d}.png",
+            "gender": attributes["gender"][i],
+            "race": attributes["race"][i],
+            "job": attributes["job"][i],
+            "age": int(attributes["age"][i]),
+            "embedding": embedding
+        }
+
+def filter_mask(attributes, filters):
+    mask = np.ones(len(attributes["age"]), dtype=bool)
+    for field in ("gender", "race", "job"):
+        if filters.get(field):
+            mask &= np.isin(attributes[field], filters[field])
+    if filters.get("age_min") is not None:
+        mask &= attributes["age"] >= filters["age_min"]
+    if filters.get("age_max") is not None:
+        mask &= attributes["age"] <= filters["age_max"]
+    return mask
+
+def matches(avatar, filters):
+    for field in ("gender", "race", "job"):
+        if filters.get(field) and avatar[field] not in filters[field]:
+            return False
+    if filters.get("age_min") is not None and avatar["age"] < filters["age_min"]:
+        return False
+    if filters.get("age_max") is not None and avatar["age"] > filters["age_max"]:
+        return False
+    return True
+
+def exact_top_k(embeddings, mask, query, top_k):
+    candidates = np.flatnonzero(mask)
+    scores = embeddings[candidates] @ query
+    best = candidates[np.argsort(-scores)[:top_k]]
+    return {f"bench{i:08d}" for i in best}
+
+def wait_for_indexing(redis_service, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = redis_service.client.ft("avatar_idx").info()
+        if float(info.get("percent_indexed", 1)) >= 1.0 and int(info.get("indexing", 0)) == 0:
+            return
+        time.sleep(0.5)
+    raise TimeoutError("El índice no terminó de construirse")
+
+def percentile(values, q):
+    return float(np.percentile(values, q) * 1000) if values else 0.0
+
+def run(redis_service, embeddings, attributes, ef_values, top_k, num_queries, seed=1):
+    rng = np.random.default_rng(seed)
+    # Consultas cercanas a avatares del catálogo, como las de una búsqueda real
+    anchors = rng.integers(len(embeddings), size=num_queries)
+    queries = embeddings[anchors] + 0.5 * rng.standard_normal((num_queries, embeddings.shape[1])).astype(np.float32) / np.sqrt(embeddings.shape[1])
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    results = []
+    for name, filters in SCENARIOS:
+        mask = filter_mask(attributes, filters)
+        truth = [exact_top_k(embeddings, mask, query, top_k) for query in queries]
+        for ef_runtime in ef_values:
+            for strategy in ("prefiltro", "postfiltro"):
+                if strategy == "postfiltro" and not filters:
+                    continue
+                latencies = []
+                recalls = []
+                for query, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    if strategy == "prefiltro":
+                        found = redis_service.find_similar_avatars(query, top_k, filters, ef_runtime)
+                    else:
+                        found = [avatar for avatar in redis_service.find_similar_avatars(query, top_k, None, ef_runtime)
+                                 if matches(avatar, filters)]
+                    latencies.append(time.perf_counter() - start)
+                    ids = {avatar["id"] for avatar in found}
+                    recalls.append(len(ids & expected) / len(expected) if expected else 1.0)
+                results.append({
+                    "scenario": name,
+                    "matching": int(mask.sum()),
+                    "strategy": strategy,
+                    "ef_runtime": ef_runtime,
+                    "p50_ms": percentile(latencies, 50),
+                    "p95_ms": percentile(latencies, 95),
+                    "recall": float(np.mean(recalls))
+                })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("REDIS_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("REDIS_PORT", 6379)))
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ef", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--json", help="Fichero donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    redis_service = RedisService(host=args.host, port=args.port)
+    redis_service.connect()
+    redis_service.create_vector_index()
+    try:
+        embeddings, attributes = synthetic_catalog(args.size)
+        redis_service.clear_avatars()
+        redis_service.store_avatars(catalog_records(embeddings, attributes))
+        wait_for_indexing(redis_service)
+        results = run(redis_service, embeddings, attributes, args.ef, args.top_k, args.queries)
+        redis_service.clear_avatars()
+    finally:
+        redis_service.close()
+
+    print(f"{'filtro':<26} {'avatares':>9} {'estrategia':<11} {'ef':>5} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7}")
+    for r in results:
+        print(f"{r['scenario']:<26} {r['matching']:>9} {r['strategy']:<11} {r['ef_runtime']:>5} "
+              f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['recall']:>7.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark de la decodificación de imágenes subidas a /search/image.
+
+Genera imágenes grandes en JPEG, PNG y WebP y compara, para cada una:
+
+  - full: file.read() completo, decodificación a resolución nativa y conversión a RGB
+  - reduced: read_image_upload (lectura por bloques con magic bytes) y load_image con
+    draft/reduce al lado corto IMAGE_DECODE_MIN_SIDE
+
+Mide la latencia (p50/p95, incluido el preprocesado de CLIP si se indica --model) y
+el pico de memoria residente sobre el RSS previo de cada decodificación (VmHWM,
+reiniciado con /proc/self/clear_refs; requiere Linux). Cada caso se ejecuta en un
+proceso nuevo tras una pasada de calentamiento. Con --model también se calcula la
+similitud coseno entre los embeddings de ambas decodificaciones.
+
+    python -m benchmarks.bench_image_decode --sizes 2048 4096 6000
+    python -m benchmarks.bench_image_decode --model openai/clip-vit-base-patch32
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import numpy as np
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+from app.security.validators import read_image_upload
+from app.services.embedding_service import load_image, DECODE_MIN_SIDE
+from benchmarks.bench_filtered_search import percentile
+
+FORMATS = {"jpeg": "JPEG", "png": "PNG", "webp": "WEBP"}
+
+def generate_image(path, size, image_format):
+    # Degradado con ruido: comprime como una ilustración real, no como un color plano
+    rng = np.random.default_rng(size)
+    height, width = size * 3 // 4, size
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None, None]
+    pixels = (x * [1.0, 0.3, 0.6] + y * [0.2, 0.8, 0.4]) / 1.5
+    pixels += rng.normal(0, 12, (height, width, 3))
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    image.save(path, FORMATS[image_format], quality=90)
+
+def memory_status_mb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def reset_peak_rss():
+    # Escribir 5 en clear_refs reinicia VmHWM (el pico de RSS) del proceso
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+def spooled_upload(data):
+    # Como en Starlette, la subida llega en un SpooledTemporaryFile (a disco pasado 1 MB)
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(data)
+    spooled.seek(0)
+    return UploadFile(file=spooled, filename="upload")
+
+def decode_full(upload, processor):
+    contents = asyncio.run(upload.read())
+    image = Image.open(io.BytesIO(contents)).convert("RGB")
+    return processor(images=[image], return_tensors="np") if processor else image
+
+def decode_reduced(upload, processor, min_side, max_size):
+    contents = asyncio.run(read_image_upload(upload, max_size=max_size))
+    image = load_image(contents, min_side)
+    return processor(images=[image], return_tensors="np") if processor else image
+
+def run_case(path, method, repeats, model, min_side, queue):
+    processor = None
+    if model:
+        from transformers import CLIPProcessor
+        processor = CLIPProcessor.from_pretrained(model)
+    with open(path, "rb") as f:
+        data = f.read()
+    if method == "full":
+        decode = decode_full
+    else:
+        # Sin el límite de MAX_FILE_SIZE: aquí interesa el coste de imágenes grandes
+        decode = lambda upload, processor: decode_reduced(upload, processor, min_side, len(data))
+    # Calentamiento: imports perezosos de PIL y primera llamada al procesador
+    decode(spooled_upload(data), processor)
+
+    latencies = []
+    peaks = []
+    for _ in range(repeats):
+        upload = spooled_upload(data)
+        reset_peak_rss()
+        before = memory_status_mb("VmRSS")
+        start = time.perf_counter()
+        decode(upload, processor)
+        latencies.append(time.perf_counter() - start)
+        peaks.append(memory_status_mb("VmHWM") - before)
+    queue.put({
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "peak_mb": max(peaks)
+    })
+
+def measure(path, method, repeats, model, min_side):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_case, args=(path, method, repeats, model, min_side, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def embedding_similarity(embedding_service, path, min_side):
+    full = embedding_service.get_image_embedding(load_image(path))
+    reduced = embedding_service.get_image_embedding(load_image(path, min_side))
+    return float(np.dot(full, reduced))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2048, 4096], help="Ancho de las imágenes (4:3)")
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=list(FORMATS))
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--min-side", type=int, default=int(os.environ.get("IMAGE_DECODE_MIN_SIDE", DECODE_MIN_SIDE)))
+    parser.add_argument("--model", help="Incluir el preprocesado de CLIP y comparar embeddings con este modelo")
+    parser.add_argument("--json", help="Fichero donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    embedding_service = None
+    if args.model:
+        from app.services.embedding_service import EmbeddingService
+        embedding_service = EmbeddingService(args.model)
+        embedding_service.initialize()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="avatar_decode_") as directory:
+        for size in args.sizes:
+            for image_format in args.formats:
+                path = os.path.join(directory, f"upload_{size}.{image_format}")
+                generate_image(path, size, image_format)
+                for method in ("full", "reduced"):
+                    result = measure(path, method, args.repeats, args.model, args.min_side)
+                    result.update({
+                        "size": size,
+                        "format": image_format,
+                        "file_mb": os.path.getsize(path) / 2 ** 20,
+                        "method": method
+                    })
+                    if embedding_service and method == "reduced":
+                        result["cosine"] = embedding_similarity(embedding_service, path, args.min_side)
+                    results.append(result)
+
+    print(f"{'ancho':>6} {'formato':<7} {'MB':>6} {'método':<8} {'p50 ms':>8} {'p95 ms':>8} {'pico MB':>8} {'coseno':>7}")
+    for r in results:
+        cosine = f"{r['cosine']:.4f}" if "cosine" in r else "-"
+        print(f"{r['size']:>6} {r['format']:<7} {r['file_mb']:>6.1f} {r['method']:<8} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['peak_mb']:>8.1f} {cosine:>7}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
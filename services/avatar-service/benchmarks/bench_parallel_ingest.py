@@ -0,0 +1,106 @@
+"""
+Benchmark de escalado de la ingesta paralela de avatares (INGEST_WORKERS).
+
+Genera un conjunto sintético de imágenes PNG y ejecuta index_avatars con distinto
+número de procesos, midiendo el throughput (imágenes/s, incluida la carga de los
+modelos) y la aceleración frente a un único proceso:
+
+    python -m benchmarks.bench_parallel_ingest --images 4000 --workers 1 2 4 8
+    python -m benchmarks.bench_parallel_ingest --skip-redis --images 2000
+
+Sin --skip-redis escribe en el Redis indicado y borra todas las claves avatar:*.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app.scripts.load_avatars import index_avatars, find_image_files, hash_file
+from app.services.embedding_service import EmbeddingService, MODEL_NAME
+from app.services.redis_service import RedisService
+
+class NullWriter:
+    """Sustituye a RedisService para medir solo decodificación, modelo y clasificación"""
+
+    def store_avatars(self, avatars):
+        return [avatar["avatar_id"] for avatar in avatars]
+
+def generate_images(directory, count, size=512, start=0):
+    rng = np.random.default_rng(start)
+    for i in range(start, start + count):
+        background = rng.integers(0, 255, 3)
+        gradient = np.linspace(0, 1, size)[None, :, None] * rng.integers(0, 255, 3)
+        pixels = np.clip(background * 0.5 + gradient * 0.5, 0, 255).astype(np.uint8)
+        image = Image.fromarray(np.broadcast_to(pixels, (size, size, 3)).copy())
+        draw = ImageDraw.Draw(image)
+        for _ in range(8):
+            x0, y0 = rng.integers(0, size - 64, 2)
+            x1, y1 = x0 + rng.integers(16, 64), y0 + rng.integers(16, 64)
+            draw.ellipse([int(x0), int(y0), int(x1), int(y1)], fill=tuple(int(c) for c in rng.integers(0, 255, 3)))
+        image.save(os.path.join(directory, f"synthetic_{i:06d}.png"))
+
+def run(pending, writer, worker_counts, model_name):
+    results = []
+    for workers in worker_counts:
+        if hasattr(writer, "clear_avatars"):
+            writer.clear_avatars()
+        start = time.perf_counter()
+        _, stored_ids = index_avatars(pending, writer, EmbeddingService(model_name), workers=workers)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "workers": workers,
+            "images": len(pending),
+            "stored": len(stored_ids),
+            "seconds": elapsed,
+            "images_per_second": len(pending) / elapsed
+        })
+    baseline = results[0]["images_per_second"]
+    for result in results:
+        result["speedup"] = result["images_per_second"] / baseline
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("REDIS_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("REDIS_PORT", 6379)))
+    parser.add_argument("--images", type=int, default=4000)
+    parser.add_argument("--images-dir", help="Directorio con imágenes ya generadas (se reutiliza entre ejecuciones)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--skip-redis", action="store_true", help="No escribir en Redis")
+    parser.add_argument("--json", help="Fichero donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    images_dir = args.images_dir or tempfile.mkdtemp(prefix="avatar_ingest_")
+    os.makedirs(images_dir, exist_ok=True)
+    existing = len(find_image_files(images_dir))
+    if existing < args.images:
+        print(f"Generando {args.images - existing} imágenes sintéticas en {images_dir}...")
+        generate_images(images_dir, args.images - existing, start=existing)
+    pending = [(hash_file(path), path) for path in sorted(find_image_files(images_dir))[:args.images]]
+
+    writer = NullWriter()
+    if not args.skip_redis:
+        writer = RedisService(host=args.host, port=args.port)
+        writer.connect()
+        writer.create_vector_index()
+    try:
+        results = run(pending, writer, args.workers, args.model)
+    finally:
+        if not args.skip_redis:
+            writer.clear_avatars()
+            writer.close()
+
+    print(f"{'procesos':>8} {'imágenes':>9} {'segundos':>9} {'img/s':>8} {'aceleración':>12}")
+    for r in results:
+        print(f"{r['workers']:>8} {r['images']:>9} {r['seconds']:>9.1f} {r['images_per_second']:>8.1f} {r['speedup']:>11.2f}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark de escritura de avatares en Redis: HSET por clave frente a pipelines.
+
+Requiere un Redis Stack local (el índice avatar_idx se mantiene durante la carga,
+igual que en producción):
+
+    docker run -d -p 6379:6379 redis/redis-stack:latest
+    python -m benchmarks.bench_redis_ingest --sizes 10000 100000
+
+ATENCIÓN: borra todas las claves avatar:* de la instancia indicada.
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+from app.services.redis_service import RedisService
+
+def synthetic_avatars(count, dim=512, seed=0):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((count, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    genders = ["male", "female"]
+    races = ["human", "elf", "dwarf", "orc", "undead"]
+    jobs = ["warrior", "mage", "archer", "rogue", "paladin"]
+    for i in range(count):
+        yield {
+            "avatar_id": f"bench{i:08d}",
+            "filename": f"bench_{i:08d}.png",
+            "gender": genders[i % len(genders)],
+            "race": races[i % len(races)],
+            "job": jobs[i % len(jobs)],
+            "age": (20, 30, 45, 60)[i % 4],
+            "embedding": embeddings[i]
+        }
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def per_key_ingest(redis_service, avatars):
+    for avatar in avatars:
+        redis_service.store_avatar(**avatar)
+    return len(avatars)
+
+def per_key_delete(redis_service):
+    keys = redis_service.client.keys("avatar:*")
+    for key in keys:
+        redis_service.client.delete(key)
+    return len(keys)
+
+def run(redis_service, sizes, chunk_sizes):
+    results = []
+    for size in sizes:
+        avatars = list(synthetic_avatars(size))
+        redis_service.clear_avatars()
+
+        elapsed, _ = timed(lambda: per_key_ingest(redis_service, avatars))
+        results.append({"size": size, "operation": "ingest", "path": "per-key", "seconds": elapsed})
+        elapsed, _ = timed(lambda: per_key_delete(redis_service))
+        results.append({"size": size, "operation": "delete", "path": "KEYS+DEL", "seconds": elapsed})
+
+        for chunk_size in chunk_sizes:
+            elapsed, _ = timed(lambda: redis_service.store_avatars(avatars, chunk_size=chunk_size))
+            results.append({"size": size, "operation": "ingest", "path": f"pipeline[{chunk_size}]", "seconds": elapsed})
+            elapsed, _ = timed(redis_service.clear_avatars)
+            results.append({"size": size, "operation": "delete", "path": "SCAN+UNLINK", "seconds": elapsed})
+
+    for result in results:
+        result["per_second"] = result["size"] / result["seconds"] if result["seconds"] else float("inf")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("REDIS_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("REDIS_PORT", 6379)))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--json", help="Fichero donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    redis_service = RedisService(host=args.host, port=args.port)
+    redis_service.connect()
+    redis_service.create_vector_index()
+    try:
+        results = run(redis_service, args.sizes, args.chunk_sizes)
+    finally:
+        redis_service.close()
+
+    print(f"{'avatares':>10} {'operación':<10} {'camino':<16} {'segundos':>10} {'avatares/s':>12}")
+    for r in results:
+        print(f"{r['size']:>10} {r['operation']:<10} {r['path']:<16} {r['seconds']:>10.2f} {r['per_second']:>12.0f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Suite reproducible de carga y recall de las búsquedas del avatar-service.
+
+Carga en un Redis Stack local un catálogo sintético agrupado en clusters (determinista
+para un --size y --seed dados), arranca el servicio en un proceso aparte con un
+codificador stub (o un CLIP pequeño en CPU con --model) y, para cada nivel de
+concurrencia, lanza consultas únicas contra:
+
+  - redis: RedisService.find_similar_avatars directamente (solo la consulta KNN)
+  - text: POST /search/text
+  - image: POST /search/image con imágenes PNG sintéticas
+
+De cada combinación mide p50/p95/p99, throughput y el recall@k del HNSW frente a la
+búsqueda exacta por fuerza bruta sobre el catálogo con el mismo vector de consulta.
+Las consultas no se repiten entre niveles, así que los cachés del servicio no
+intervienen. No necesita red ni descargar modelos con el codificador stub:
+
+    docker run -d -p 6379:6379 redis/redis-stack:latest
+    python -m benchmarks.bench_search_suite --size 20000 --concurrency 1 4 16 --json run.json
+    python -m benchmarks.bench_search_suite --model ./models/tiny-clip --targets text image
+    python -m benchmarks.bench_search_suite --engine local --size 100000 --keep-catalog
+
+ATENCIÓN: salvo con --keep-catalog, borra todas las claves avatar:* de la instancia indicada.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.services.embedding_service import EmbeddingService
+from app.services.redis_service import RedisService
+from benchmarks.bench_filtered_search import catalog_records, wait_for_indexing, percentile
+from benchmarks.bench_parallel_ingest import generate_images
+from benchmarks.bench_vector_engines import clustered_catalog
+from benchmarks.load_test_search import text_request, image_request
+
+TARGETS = ["redis", "text", "image"]
+
+class CatalogStubEncoder(EmbeddingService):
+    """
+    Codificador sin modelo: cada texto o imagen decodificada se convierte, de forma
+    determinista (hash del texto o de los píxeles), en un vector cercano a un avatar del
+    catálogo sintético, como las consultas de una búsqueda real. La decodificación de
+    imágenes es la de EmbeddingService, de modo que el servicio y la verdad de
+    referencia calculan exactamente los mismos vectores.
+    """
+
+    def __init__(self, size, clusters, seed, noise=0.5):
+        super().__init__(model_name=f"stub-{size}-{clusters}-{seed}", backend="stub")
+        self.catalog = (size, clusters, seed)
+        self.noise = noise
+        self.embeddings = None
+
+    def initialize(self):
+        size, clusters, seed = self.catalog
+        self.embeddings = clustered_catalog(size, clusters=clusters, seed=seed)[0]
+        self.backend = "stub"
+
+    def _vector(self, data):
+        rng = np.random.default_rng(int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little"))
+        dim = self.embeddings.shape[1]
+        vector = self.embeddings[rng.integers(len(self.embeddings))] + \
+            self.noise * rng.standard_normal(dim, dtype=np.float32) / np.sqrt(dim)
+        return vector / np.linalg.norm(vector)
+
+    def _encode_images(self, images):
+        return np.stack([self._vector(image.tobytes()) for image in images])
+
+    def _encode_texts(self, texts):
+        return np.stack([self._vector(text.encode("utf-8")) for text in texts])
+
+def make_encoder(spec):
+    if spec.get("model"):
+        return EmbeddingService(spec["model"])
+    return CatalogStubEncoder(spec["size"], spec["clusters"], spec["seed"])
+
+def serve(port, encoder_spec):
+    """Proceso del servicio: la app de FastAPI con el codificador indicado bajo uvicorn"""
+    import uvicorn
+    from app import main as service
+
+    encoder = make_encoder(encoder_spec)
+    service.embedding_service = encoder
+    service.embedding_batcher.embedding_service = encoder
+    uvicorn.run(service.app, host="127.0.0.1", port=port, log_level="warning")
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_service(encoder_spec, timeout=600):
+    port = free_port()
+    process = multiprocessing.get_context("spawn").Process(target=serve, args=(port, encoder_spec), daemon=True)
+    process.start()
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if not process.is_alive():
+            raise RuntimeError("El servicio terminó antes de estar listo")
+        try:
+            with urllib.request.urlopen(f"{url}/ready", timeout=5) as response:
+                if response.status == 200:
+                    return process, url
+        except Exception:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise TimeoutError("El servicio no llegó a estar listo")
+
+def load_catalog(redis_service, embeddings, attributes, keep):
+    if keep and int(redis_service.client.ft("avatar_idx").info().get("num_docs", 0)) == len(embeddings):
+        print(f"Reutilizando el catálogo de {len(embeddings)} avatares ya cargado")
+        return
+    print(f"Cargando {len(embeddings)} avatares sintéticos...")
+    redis_service.clear_avatars()
+    redis_service.store_avatars(catalog_records(embeddings, attributes))
+    wait_for_indexing(redis_service)
+
+def exact_neighbors(embeddings, queries, top_k, chunk_size=256):
+    """Ids de los top_k avatares más similares de cada consulta por fuerza bruta"""
+    truth = []
+    for start in range(0, len(queries), chunk_size):
+        scores = queries[start:start + chunk_size] @ embeddings.T
+        best = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        truth.extend({f"bench{i:08d}" for i in row} for row in best)
+    return truth
+
+def http_search(request):
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return [avatar["id"] for avatar in json.loads(response.read())]
+
+def run_level(search, truth, queries, concurrency):
+    """Lanza search(q) para cada consulta con concurrency hilos y resume latencia y recall"""
+    def worker(q):
+        start = time.perf_counter()
+        try:
+            found = search(q)
+            return q, time.perf_counter() - start, found, None
+        except Exception as e:
+            return q, time.perf_counter() - start, None, e
+
+    latencies = []
+    recalls = []
+    errors = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for q, latency, found, error in executor.map(worker, queries):
+            if error is not None:
+                errors += 1
+                continue
+            latencies.append(latency)
+            recalls.append(len(set(found) & truth[q]) / len(truth[q]))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": len(queries),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "recall": float(np.mean(recalls)) if recalls else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("REDIS_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("REDIS_PORT", 6379)))
+    parser.add_argument("--size", type=int, default=20000, help="Avatares del catálogo sintético")
+    parser.add_argument("--clusters", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--targets", nargs="+", default=TARGETS, choices=TARGETS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="Consultas por objetivo y nivel de concurrencia")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ef", type=int, help="EF_RUNTIME de las consultas (por defecto, el del índice)")
+    parser.add_argument("--engine", choices=["redis", "local"], default="redis", help="SEARCH_ENGINE del servicio")
+    parser.add_argument("--model", help="Modelo CLIP (ruta local o nombre) en lugar del codificador stub")
+    parser.add_argument("--keep-catalog", action="store_true",
+                        help="Reutilizar el catálogo si ya está cargado y no borrarlo al terminar")
+    parser.add_argument("--json", help="Fichero donde guardar la configuración y los resultados en JSON")
+    args = parser.parse_args()
+
+    # El servicio hereda el entorno: mismo Redis, sin carga de avatares propia
+    os.environ.update({
+        "REDIS_HOST": args.host,
+        "REDIS_PORT": str(args.port),
+        "SEARCH_ENGINE": args.engine,
+        "LOAD_AVATARS_IN_APP": "false"
+    })
+    encoder_spec = {"model": args.model, "size": args.size, "clusters": args.clusters, "seed": args.seed}
+    encoder = make_encoder(encoder_spec)
+    encoder.initialize()
+    embeddings, attributes = clustered_catalog(args.size, clusters=args.clusters, seed=args.seed)
+
+    # Consulta 0 de calentamiento y un bloque de consultas distintas por nivel
+    total = 1 + args.requests * len(args.concurrency)
+    levels = [range(1 + i * args.requests, 1 + (i + 1) * args.requests) for i in range(len(args.concurrency))]
+    texts = [f"synthetic avatar query {args.seed}-{q}" for q in range(total)]
+    queries = {"text": encoder.get_text_embeddings(texts)}
+    queries["redis"] = queries["text"]
+    images = []
+    if "image" in args.targets:
+        images_dir = tempfile.mkdtemp(prefix="avatar_search_suite_")
+        print(f"Generando {total} imágenes de consulta en {images_dir}...")
+        generate_images(images_dir, total, size=256, start=args.seed * total)
+        for name in sorted(os.listdir(images_dir)):
+            with open(os.path.join(images_dir, name), "rb") as f:
+                images.append(f.read())
+        queries["image"] = encoder.get_image_embeddings(images)
+    truth = {target: exact_neighbors(embeddings, queries[target], args.top_k) for target in args.targets}
+
+    redis_service = RedisService(host=args.host, port=args.port)
+    redis_service.connect()
+    redis_service.create_vector_index()
+    process = None
+    results = []
+    try:
+        load_catalog(redis_service, embeddings, attributes, args.keep_catalog)
+        if "text" in args.targets or "image" in args.targets:
+            process, url = start_service(encoder_spec)
+
+        searches = {
+            "redis": lambda q: [avatar["id"] for avatar in redis_service.find_similar_avatars(
+                queries["redis"][q], args.top_k, None, args.ef)],
+            "text": lambda q: http_search(text_request(url, texts[q], args.top_k, args.ef)),
+            "image": lambda q: http_search(image_request(url, f"query_{q}.png", images[q], args.top_k, args.ef))
+        }
+        for target in args.targets:
+            searches[target](0)
+            for concurrency, level in zip(args.concurrency, levels):
+                result = run_level(searches[target], truth[target], level, concurrency)
+                result["target"] = target
+                results.append(result)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+        if not args.keep_catalog:
+            redis_service.clear_avatars()
+        redis_service.close()
+
+    print(f"{'objetivo':<8} {'concurrencia':>12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'recall@' + str(args.top_k):>10} {'errores':>8}")
+    for r in results:
+        print(f"{r['target']:<8} {r['concurrency']:>12} {r['throughput']:>8.1f} {r['p50_ms']:>8.2f} "
+              f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['recall']:>10.3f} {r['errors']:>8}")
+
+    if args.json:
+        config = {key: value for key, value in vars(args).items() if key != "json"}
+        config.update({
+            "encoder": encoder.model_version,
+            "storage": redis_service.storage,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        })
+        with open(args.json, "w") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark de motores de búsqueda vectorial: RediSearch (HNSW) frente al índice NumPy en proceso.
+
+Para varios tamaños de catálogo sintético (agrupado en clusters, como los embeddings
+reales de CLIP) mide la latencia de una búsqueda top-k y el recall@k frente a la
+búsqueda exacta de:
+
+  - redis: RedisService.find_similar_avatars (round trip + consulta KNN)
+  - local-exact: LocalVectorIndex en modo exact (producto matricial + argpartition)
+  - local-ivf[n]: LocalVectorIndex en modo ivf con n listas sondeadas
+
+    docker run -d -p 6379:6379 redis/redis-stack:latest
+    python -m benchmarks.bench_vector_engines --sizes 1000 5000 20000 100000
+    python -m benchmarks.bench_vector_engines --skip-redis
+
+ATENCIÓN: sin --skip-redis borra todas las claves avatar:* de la instancia indicada.
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+from app.services.redis_service import RedisService
+from app.services.vector_index import LocalVectorIndex
+from benchmarks.bench_filtered_search import GENDERS, RACES, JOBS, AGES, catalog_records, wait_for_indexing, percentile
+
+def clustered_catalog(count, dim=512, clusters=64, spread=0.6, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    noise = rng.standard_normal((count, dim)).astype(np.float32) * spread / np.sqrt(dim)
+    embeddings = centers[rng.integers(clusters, size=count)] + noise
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    attributes = {
+        "gender": np.array(GENDERS)[rng.integers(len(GENDERS), size=count)],
+        "race": np.array(RACES)[rng.integers(len(RACES), size=count)],
+        "job": np.array(JOBS)[rng.integers(len(JOBS), size=count)],
+        "age": np.array(AGES)[rng.integers(len(AGES), size=count)],
+    }
+    return embeddings, attributes
+
+def measure(search, queries, truth):
+    latencies = []
+    recalls = []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len({avatar["id"] for avatar in found} & expected) / len(expected))
+    return {
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "qps": len(queries) / sum(latencies),
+        "recall": float(np.mean(recalls))
+    }
+
+def run(redis_service, sizes, probes, top_k, num_queries):
+    results = []
+    for size in sizes:
+        embeddings, attributes = clustered_catalog(size)
+        records = list(catalog_records(embeddings, attributes))
+        rng = np.random.default_rng(1)
+        queries = embeddings[rng.integers(size, size=num_queries)]
+        queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32) / np.sqrt(queries.shape[1])
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        scores = queries @ embeddings.T
+        truth = [{f"bench{i:08d}" for i in np.argsort(-row)[:top_k]} for row in scores]
+
+        engines = []
+        exact = LocalVectorIndex(mode="exact")
+        exact.build(records)
+        engines.append(("local-exact", exact.load_seconds, lambda q: exact.search(q, top_k)))
+        for n_probe in probes:
+            ivf = LocalVectorIndex(mode="ivf", n_probe=n_probe)
+            ivf.build(records)
+            engines.append((f"local-ivf[{n_probe}]", ivf.load_seconds, lambda q, ivf=ivf: ivf.search(q, top_k)))
+
+        if redis_service:
+            redis_service.clear_avatars()
+            start = time.perf_counter()
+            redis_service.store_avatars(records)
+            wait_for_indexing(redis_service)
+            build_seconds = time.perf_counter() - start
+            engines.append(("redis", build_seconds, lambda q: redis_service.find_similar_avatars(q, top_k)))
+
+        for name, build_seconds, search in engines:
+            result = measure(search, queries, truth)
+            result.update({"size": size, "engine": name, "build_seconds": build_seconds})
+            results.append(result)
+
+        if redis_service:
+            redis_service.clear_avatars()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("REDIS_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("REDIS_PORT", 6379)))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--probes", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--skip-redis", action="store_true", help="Comparar solo los modos del índice local")
+    parser.add_argument("--json", help="Fichero donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    redis_service = None
+    if not args.skip_redis:
+        redis_service = RedisService(host=args.host, port=args.port)
+        redis_service.connect()
+        redis_service.create_vector_index()
+    try:
+        results = run(redis_service, args.sizes, args.probes, args.top_k, args.queries)
+    finally:
+        if redis_service:
+            redis_service.close()
+
+    print(f"{'avatares':>9} {'motor':<15} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8} {'qps':>9} {'recall':>7}")
+    for r in results:
+        print(f"{r['size']:>9} {r['engine']:<15} {r['build_seconds']:>8.2f} {r['p50_ms']:>8.3f} "
+              f"{r['p95_ms']:>8.3f} {r['qps']:>9.0f} {r['recall']:>7.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+Prueba de carga de los endpoints de búsqueda del avatar-service.
+
+Lanza peticiones concurrentes contra un servicio en marcha y muestra cómo escala
+el throughput con la concurrencia:
+
+    python -m benchmarks.load_test_search --url http://localhost:8084 --concurrency 1 2 4 8 16 32
+    python -m benchmarks.load_test_search --endpoint image --image assets/avatars/00000-468694721.png
+"""
+import argparse
+import json
+import mimetypes
+import os
+import time
+import uuid
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+QUERIES = [
+    "elf mage", "female dwarf warrior", "old human paladin", "orc rogue",
+    "undead archer", "young elf archer", "male human warrior", "dwarf paladin"
+]
+
+def text_request(url, description, top_k, ef_runtime=None):
+    fields = {"description": description, "top_k": top_k}
+    if ef_runtime is not None:
+        fields["ef_runtime"] = ef_runtime
+    data = urllib.parse.urlencode(fields).encode()
+    return urllib.request.Request(f"{url}/search/text", data=data, method="POST")
+
+def image_request(url, image_path, image_bytes, top_k, ef_runtime=None):
+    boundary = uuid.uuid4().hex
+    content_type = mimetypes.guess_type(image_path)[0] or "application/octet-stream"
+    fields = {"top_k": top_k}
+    if ef_runtime is not None:
+        fields["ef_runtime"] = ef_runtime
+    body = "".join(
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n"
+        for name, value in fields.items()
+    ).encode() + (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; "
+        f"filename=\"{os.path.basename(image_path)}\"\r\nContent-Type: {content_type}\r\n\r\n"
+    ).encode() + image_bytes + f"\r\n--{boundary}--\r\n".encode()
+    request = urllib.request.Request(f"{url}/search/image", data=body, method="POST")
+    request.add_header("Content-Type", f"multipart/form-data; boundary={boundary}")
+    return request
+
+def run_level(make_request, concurrency, requests_per_level):
+    latencies = []
+    errors = 0
+
+    def worker(i):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(make_request(i), timeout=60) as response:
+                response.read()
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, e
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for latency, error in executor.map(worker, range(requests_per_level)):
+            if error is None:
+                latencies.append(latency)
+            else:
+                errors += 1
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000 if latencies else np.array([np.nan])
+    return {
+        "concurrency": concurrency,
+        "requests": requests_per_level,
+        "errors": errors,
+        "throughput": (requests_per_level - errors) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8084")
+    parser.add_argument("--endpoint", choices=["text", "image"], default="text")
+    parser.add_argument("--image", help="Imagen a enviar con --endpoint image")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Peticiones por nivel de concurrencia")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--json", help="Fichero donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    url = args.url.rstrip("/")
+    if args.endpoint == "image":
+        if not args.image:
+            parser.error("--endpoint image requiere --image")
+        with open(args.image, "rb") as f:
+            image_bytes = f.read()
+        make_request = lambda i: image_request(url, args.image, image_bytes, args.top_k)
+    else:
+        make_request = lambda i: text_request(url, QUERIES[i % len(QUERIES)], args.top_k)
+
+    # Calentamiento para no medir la primera inferencia
+    urllib.request.urlopen(make_request(0), timeout=120).read()
+
+    results = [run_level(make_request, c, args.requests) for c in args.concurrency]
+
+    print(f"{'concurrencia':>12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errores':>8}")
+    for r in results:
+        print(f"{r['concurrency']:>12} {r['throughput']:>8.1f} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Informe de memoria frente a recall según el formato de almacenamiento de los embeddings.
+
+Para cada formato (float32, float16, int8) y cada tamaño de catálogo sintético carga
+los avatares en un Redis Stack local y mide:
+
+  - used_memory de INFO memory antes y después de la carga (hashes + índice)
+  - vector_index_sz_mb y total_index_memory_sz_mb de FT.INFO
+  - recall@k de la búsqueda KNN frente a la búsqueda exacta en float32
+
+FLOAT16 requiere Redis Stack 7.4 (RediSearch 2.10) e INT8 Redis 8; los formatos que
+el servidor no admite se omiten con un aviso.
+
+    docker run -d -p 6379:6379 redis/redis-stack:latest
+    python -m benchmarks.report_embedding_memory --sizes 10000 50000 100000
+
+ATENCIÓN: borra todas las claves avatar:* y el índice avatar_idx de la instancia
+indicada; al terminar el servicio vuelve a crear el índice con su EMBEDDING_STORAGE.
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+from app.services.redis_service import RedisService, EMBEDDING_STORAGE_TYPES, STORAGE_KEY
+from benchmarks.bench_filtered_search import catalog_records, wait_for_indexing
+from benchmarks.bench_vector_engines import clustered_catalog
+
+def reset(redis_service):
+    if redis_service.index_available():
+        redis_service.client.execute_command("FT.DROPINDEX", "avatar_idx")
+    redis_service.clear_avatars()
+    redis_service.client.delete(STORAGE_KEY)
+
+def used_memory(redis_service):
+    return int(redis_service.client.info("memory")["used_memory"])
+
+def index_memory_mb(redis_service):
+    info = redis_service.client.ft("avatar_idx").info()
+    return (float(info.get("vector_index_sz_mb", 0) or 0),
+            float(info.get("total_index_memory_sz_mb", info.get("inverted_sz_mb", 0)) or 0))
+
+def measure_recall(redis_service, embeddings, queries, top_k):
+    recalls = []
+    for query, row in zip(queries, queries @ embeddings.T):
+        expected = {f"bench{i:08d}" for i in np.argsort(-row)[:top_k]}
+        found = {avatar["id"] for avatar in redis_service.find_similar_avatars(query, top_k)}
+        recalls.append(len(found & expected) / top_k)
+    return float(np.mean(recalls))
+
+def run(host, port, storages, sizes, top_k, num_queries):
+    results = []
+    for size in sizes:
+        embeddings, attributes = clustered_catalog(size)
+        rng = np.random.default_rng(1)
+        queries = embeddings[rng.integers(size, size=num_queries)]
+        queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32) / np.sqrt(queries.shape[1])
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        for storage in storages:
+            redis_service = RedisService(host=host, port=port, storage=storage)
+            redis_service.connect()
+            try:
+                reset(redis_service)
+                time.sleep(1)
+                baseline = used_memory(redis_service)
+                if not redis_service.create_vector_index():
+                    print(f"El servidor no admite el formato {storage}, se omite")
+                    continue
+                start = time.perf_counter()
+                redis_service.store_avatars(catalog_records(embeddings, attributes))
+                wait_for_indexing(redis_service)
+                load_seconds = time.perf_counter() - start
+                total = used_memory(redis_service) - baseline
+                vector_mb, index_mb = index_memory_mb(redis_service)
+                results.append({
+                    "size": size,
+                    "storage": storage,
+                    "load_seconds": load_seconds,
+                    "used_memory_mb": total / 2 ** 20,
+                    "bytes_per_avatar": total / size,
+                    "vector_index_mb": vector_mb,
+                    "total_index_mb": index_mb,
+                    "recall": measure_recall(redis_service, embeddings, queries, top_k)
+                })
+            finally:
+                reset(redis_service)
+                redis_service.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("REDIS_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("REDIS_PORT", 6379)))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--storages", nargs="+", default=list(EMBEDDING_STORAGE_TYPES), choices=list(EMBEDDING_STORAGE_TYPES))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--json", help="Fichero donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    results = run(args.host, args.port, args.storages, args.sizes, args.top_k, args.queries)
+
+    print(f"{'avatares':>9} {'formato':<8} {'memoria MB':>11} {'bytes/avatar':>13} {'vector MB':>10} {'índice MB':>10} {'recall':>7}")
+    for r in results:
+        print(f"{r['size']:>9} {r['storage']:<8} {r['used_memory_mb']:>11.1f} {r['bytes_per_avatar']:>13.0f} "
+              f"{r['vector_index_mb']:>10.1f} {r['total_index_mb']:>10.1f} {r['recall']:>7.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
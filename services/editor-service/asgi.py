@@ -0,0 +1,29 @@
+from fastapi import FastAPI
+from routes.editor_async import editor_router
+from config.cors import configure_asgi_cors
+from services.async_neo4j_service import AsyncNeo4jService
+
+# Modo de servicio asíncrono: gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+app = FastAPI(title="Editor Service API")
+
+# Configure CORS
+configure_asgi_cors(app)
+
+# Register routers
+app.include_router(editor_router)
+
+@app.on_event("startup")
+async def startup():
+    await AsyncNeo4jService.connect()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await AsyncNeo4jService.close()
+
+@app.get('/health')
+async def health():
+    return {'status': 'healthy'}
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=8080)
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Prueba de carga del editor-service: modo Flask (WSGI, driver síncrono) frente a ASGI.
+
+Lanza peticiones GET concurrentes, repartidas entre los endpoints indicados, contra
+cada servicio en marcha y compara el throughput y la latencia por nivel de
+concurrencia. Conviene arrancar ambos modos con EDITOR_CACHE=false para que cada
+petición llegue a Neo4j:
+
+    EDITOR_CACHE=false gunicorn --bind 0.0.0.0:8080 --workers 2 app:app
+    EDITOR_CACHE=false gunicorn -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:8081 --workers 2 asgi:app
+    python -m benchmarks.load_test --targets wsgi=http://localhost:8080 asgi=http://localhost:8081 \\
+        --paths /api/editor/worldmap /api/editor/dungeons/Moria/summary --concurrency 1 8 32
+"""
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PATHS = [
+    "/api/editor/worldmap",
+    "/api/editor/areas",
+    "/api/editor/dungeons",
+    "/api/editor/monsters/unused"
+]
+
+def percentile(values, q):
+    """Percentil con interpolación lineal, en milisegundos"""
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return (values[lower] + (values[upper] - values[lower]) * (position - lower)) * 1000
+
+def run_level(url, paths, concurrency, requests_per_level):
+    def worker(i):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(f"{url}{paths[i % len(paths)]}", timeout=60) as response:
+                response.read()
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, e
+
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for latency, error in executor.map(worker, range(requests_per_level)):
+            if error is None:
+                latencies.append(latency)
+            else:
+                errors += 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests_per_level,
+        "errors": errors,
+        "throughput": (requests_per_level - errors) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=["wsgi=http://localhost:8080", "asgi=http://localhost:8081"],
+                        help="Servicios a comparar como nombre=url; el primero es la referencia")
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS, help="Endpoints GET a los que se reparten las peticiones")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=500, help="Peticiones por nivel de concurrencia")
+    parser.add_argument("--json", help="Fichero donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    targets = [target.split("=", 1) for target in args.targets]
+    results = []
+    for name, url in targets:
+        url = url.rstrip("/")
+        # Calentamiento: conexión a Neo4j y primera ejecución de cada consulta
+        for path in args.paths:
+            urllib.request.urlopen(f"{url}{path}", timeout=120).read()
+        for concurrency in args.concurrency:
+            result = run_level(url, args.paths, concurrency, args.requests)
+            result["target"] = name
+            results.append(result)
+
+    baseline = {r["concurrency"]: r["throughput"] for r in results if r["target"] == targets[0][0]}
+    for r in results:
+        r["speedup"] = r["throughput"] / baseline[r["concurrency"]] if baseline[r["concurrency"]] else 0.0
+
+    print(f"{'servicio':<10} {'concurrencia':>12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'errores':>8} {'aceleración':>12}")
+    for r in results:
+        print(f"{r['target']:<10} {r['concurrency']:>12} {r['throughput']:>8.1f} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>8} {r['speedup']:>11.2f}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
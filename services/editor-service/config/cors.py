@@ -1,14 +1,33 @@
 from flask_cors import CORS
 
+CORS_ORIGINS = ["https://norsewind.studio", "https://admin.norsewind.studio"]
+CORS_ALLOW_HEADERS = ["Content-Type", "Authorization"]
+CORS_EXPOSE_HEADERS = ["Content-Length", "X-Rate-Limit"]
+CORS_MAX_AGE = 600
+
 def configure_cors(app):
     CORS(app, 
          resources={r"/api/*": {
-             "origins": ["https://norsewind.studio", "https://admin.norsewind.studio"],
+             "origins": CORS_ORIGINS,
              "supports_credentials": True,
-             "allow_headers": ["Content-Type", "Authorization"],
-             "expose_headers": ["Content-Length", "X-Rate-Limit"],
-             "max_age": 600,
+             "allow_headers": CORS_ALLOW_HEADERS,
+             "expose_headers": CORS_EXPOSE_HEADERS,
+             "max_age": CORS_MAX_AGE,
              "vary_header": True,
              "send_wildcard": False,
              "allow_private_network": False
-         }})
\ No newline at end of file
+         }})
+
+def configure_asgi_cors(app):
+    """La misma política para la app ASGI (asgi.py)"""
+    from fastapi.middleware.cors import CORSMiddleware
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["GET", "HEAD", "POST", "OPTIONS", "PUT", "PATCH", "DELETE"],
+        allow_headers=CORS_ALLOW_HEADERS,
+        expose_headers=CORS_EXPOSE_HEADERS,
+        max_age=CORS_MAX_AGE
+    )
\ No newline at end of file
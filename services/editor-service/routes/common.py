@@ -0,0 +1,87 @@
+import os
+import json
+
+# Máximo de ids por petición en los endpoints por lotes
+MAX_BATCH_IDS = int(os.environ.get("EDITOR_BATCH_MAX_IDS", 500))
+
+def parse_batch_ids(is_json, body, query_values):
+    """
+    Ids de una petición por lotes: un cuerpo JSON {"ids": [...]} o ?ids=a,b,c (o ids repetido).
+    Devuelve (ids sin duplicados en su orden original, mensaje de error o None).
+    """
+    if is_json:
+        ids = body.get('ids') if isinstance(body, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(value, str) for value in ids):
+            return None, 'The request body must be {"ids": [...]} with string ids'
+    else:
+        ids = [value for param in query_values for value in param.split(',') if value]
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return None, 'At least one id must be provided'
+    if len(ids) > MAX_BATCH_IDS:
+        return None, f'At most {MAX_BATCH_IDS} ids can be requested at once'
+    return ids, None
+
+# Formatos de respuesta en streaming (?stream=... o Accept: application/x-ndjson)
+STREAM_MEDIA_TYPES = {'json': 'application/json', 'ndjson': 'application/x-ndjson'}
+# Bytes que se acumulan antes de enviar un bloque de la respuesta
+STREAM_CHUNK_BYTES = int(os.environ.get("STREAM_CHUNK_BYTES", 64 * 1024))
+
+def parse_stream_format(stream_param, accept_header):
+    """
+    Formato de streaming pedido: 'json' (array JSON por bloques), 'ndjson' (un registro por
+    línea) o None para la respuesta normal. Devuelve (formato, mensaje de error o None).
+    """
+    if stream_param:
+        if stream_param not in STREAM_MEDIA_TYPES:
+            return None, f'stream must be one of {sorted(STREAM_MEDIA_TYPES)}'
+        return stream_param, None
+    if 'application/x-ndjson' in (accept_header or ''):
+        return 'ndjson', None
+    return None, None
+
+class StreamEncoder:
+    """
+    Serializa registros según llegan del cursor de Neo4j y los agrupa en bloques de unos
+    chunk_bytes, de modo que en memoria solo hay un bloque (más el lote de fetch_size del
+    driver) por grande que sea el resultado.
+    """
+
+    def __init__(self, stream_format, chunk_bytes=STREAM_CHUNK_BYTES):
+        self.stream_format = stream_format
+        self.chunk_bytes = chunk_bytes
+        self.buffer = ['['] if stream_format == 'json' else []
+        self.size = len(self.buffer)
+        self.count = 0
+
+    def add(self, record):
+        """Añade un registro; devuelve un bloque de bytes cuando el buffer se llena"""
+        line = json.dumps(record, separators=(',', ':'))
+        if self.stream_format == 'ndjson':
+            line += '\n'
+        elif self.count:
+            line = ',' + line
+        self.count += 1
+        self.buffer.append(line)
+        self.size += len(line)
+        if self.size >= self.chunk_bytes:
+            return self.flush()
+        return None
+
+    def flush(self):
+        chunk = ''.join(self.buffer).encode('utf-8')
+        self.buffer = []
+        self.size = 0
+        return chunk
+
+    def finish(self):
+        if self.stream_format == 'json':
+            self.buffer.append(']')
+        return self.flush()
+
+    def error(self, message):
+        """Último bloque ante un error a mitad de respuesta (el estado HTTP ya se envió)"""
+        if self.stream_format == 'ndjson':
+            self.buffer.append(json.dumps({'error': message}) + '\n')
+        # En el array JSON se omite el cierre: el cliente recibe un JSON inválido, no uno truncado válido
+        return self.flush()
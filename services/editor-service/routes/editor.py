@@ -1,8 +1,58 @@
-from flask import Blueprint, jsonify, request
+import itertools
+from flask import Blueprint, Response, jsonify, request
+from services import queries
 from services.neo4j_service import Neo4jService
+from routes.common import parse_batch_ids, parse_stream_format, StreamEncoder, STREAM_MEDIA_TYPES
 
 editor_bp = Blueprint('editor', __name__, url_prefix='/api/editor')
 
+def conditional_jsonify(result):
+    """
+    Respuesta JSON con ETag: si el cliente envía un If-None-Match que coincide se responde
+    304 sin cuerpo. no-cache obliga al navegador a revalidar en cada sondeo del editor.
+    """
+    response = jsonify(result)
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def streamed_jsonify(cypher, stream_format):
+    """Respuesta por bloques (chunked) con los registros de la consulta según llegan de Neo4j"""
+    records = Neo4jService.stream(cypher)
+    # El primer registro se lee antes de responder: un error de conexión o de consulta sigue siendo un 500
+    first = next(records, None)
+
+    def generate():
+        encoder = StreamEncoder(stream_format)
+        try:
+            for record in itertools.chain([first] if first is not None else [], records):
+                chunk = encoder.add(record)
+                if chunk:
+                    yield chunk
+        except Exception as e:
+            print(f"Error en consulta Neo4j en streaming: {str(e)}")
+            yield encoder.error(f"Error de base de datos: {str(e)}")
+            return
+        yield encoder.finish()
+
+    return Response(generate(), mimetype=STREAM_MEDIA_TYPES[stream_format])
+
+def query_jsonify(method, cypher):
+    """
+    Respuesta de un endpoint de lectura: en streaming si se pide con ?stream=json|ndjson o
+    Accept: application/x-ndjson (sin caché ni ETag) y, si no, la respuesta cacheada con ETag.
+    """
+    stream_format, error = parse_stream_format(request.args.get('stream'), request.headers.get('Accept'))
+    if error:
+        return jsonify({'error': error}), 400
+    if stream_format:
+        return streamed_jsonify(cypher, stream_format)
+    return conditional_jsonify(method())
+
+def request_ids():
+    body = request.get_json(silent=True) if request.is_json else None
+    return parse_batch_ids(request.is_json, body, request.args.getlist('ids'))
+
 @editor_bp.route('/loots/<loot_id>/rooms', methods=['GET'])
 def find_rooms_with_loot(loot_id):
     """
@@ -19,13 +69,34 @@ def get_monsters_in_room(room_id):
     result = Neo4jService.get_monsters_in_room(room_id)
     return jsonify(result)
 
+@editor_bp.route('/loots/rooms', methods=['GET', 'POST'])
+def find_rooms_with_loots():
+    """
+    Salas de varios tesoros en una sola consulta, agrupadas por id de tesoro.
+    """
+    loot_ids, error = request_ids()
+    if error:
+        return jsonify({'error': error}), 400
+    result = Neo4jService.find_rooms_with_loots(loot_ids)
+    return jsonify(result)
+
+@editor_bp.route('/rooms/monsters', methods=['GET', 'POST'])
+def get_monsters_in_rooms():
+    """
+    Monstruos de varias salas en una sola consulta, agrupados por id de sala.
+    """
+    room_ids, error = request_ids()
+    if error:
+        return jsonify({'error': error}), 400
+    result = Neo4jService.get_monsters_in_rooms(room_ids)
+    return jsonify(result)
+
 @editor_bp.route('/monsters/unused', methods=['GET'])
 def get_unused_monsters():
     """
     3. Obtener todos los monstruos que no están presentes en ninguna sala.
     """
-    result = Neo4jService.get_unused_monsters()
-    return jsonify(result)
+    return query_jsonify(Neo4jService.get_unused_monsters, queries.UNUSED_MONSTERS)
 
 @editor_bp.route('/paths/shortest', methods=['GET'])
 def get_shortest_path():
@@ -76,8 +147,25 @@ def get_world_map():
     """
     8. Mostrar el mapamundi del juego.
     """
-    result = Neo4jService.get_world_map()
-    return jsonify(result)
+    return query_jsonify(Neo4jService.get_world_map, queries.WORLD_MAP)
+
+@editor_bp.route('/dungeons/<dungeon_name>', methods=['GET'])
+def get_dungeon(dungeon_name):
+    """
+    Mazmorra completa para el editor: salas con sus monstruos y tesoros en una sola llamada.
+    """
+    rooms = Neo4jService.get_dungeon(dungeon_name)
+    if not rooms:
+        return jsonify({'error': f'Dungeon "{dungeon_name}" not found'}), 404
+    return conditional_jsonify({'name': dungeon_name, 'rooms': rooms})
+
+@editor_bp.route('/dungeons/<dungeon_name>/summary', methods=['GET'])
+def get_dungeon_summary(dungeon_name):
+    """
+    Resumen de una mazmorra: oro total, monstruos de más nivel y encuentros.
+    """
+    result = Neo4jService.get_dungeon_summary(dungeon_name)
+    return conditional_jsonify(result)
 
 @editor_bp.route('/dungeons/<dungeon_name>/gold', methods=['GET'])
 def get_dungeon_gold(dungeon_name):
@@ -85,7 +173,7 @@ def get_dungeon_gold(dungeon_name):
     9. Calcular el total de oro que valen los tesoros de una mazmorra.
     """
     result = Neo4jService.get_dungeon_gold(dungeon_name)
-    return jsonify(result)
+    return conditional_jsonify(result)
 
 @editor_bp.route('/dungeons/<dungeon_name>/high-level-monsters', methods=['GET'])
 def get_high_level_monsters(dungeon_name):
@@ -93,7 +181,7 @@ def get_high_level_monsters(dungeon_name):
     10. Buscar las salas que contienen los monstruos de más nivel de la mazmorra.
     """
     result = Neo4jService.get_high_level_monsters(dungeon_name)
-    return jsonify(result)
+    return conditional_jsonify(result)
 
 @editor_bp.route('/dungeons/<dungeon_name>/encounters', methods=['GET'])
 def get_encounters_by_exp(dungeon_name):
@@ -101,18 +189,14 @@ def get_encounters_by_exp(dungeon_name):
     11. Calcular la experiencia total de cada uno de los encuentros.
     """
     result = Neo4jService.get_encounters_by_exp(dungeon_name)
-    return jsonify(result)
+    return conditional_jsonify(result)
 
 @editor_bp.route('/areas', methods=['GET'])
 def get_all_areas():
     """Obtener todas las áreas del juego"""
-    query = "MATCH (a:Area) RETURN a.name AS name"
-    result = Neo4jService.query(query)
-    return jsonify(result)
+    return query_jsonify(Neo4jService.get_all_areas, queries.ALL_AREAS)
 
 @editor_bp.route('/dungeons', methods=['GET'])
 def get_all_dungeons():
     """Obtener todas las mazmorras del juego"""
-    query = "MATCH (r:Room) RETURN DISTINCT r.dungeon_name AS name"
-    result = Neo4jService.query(query)
-    return jsonify(result)
+    return query_jsonify(Neo4jService.get_all_dungeons, queries.ALL_DUNGEONS)
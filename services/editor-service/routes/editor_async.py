@@ -0,0 +1,162 @@
+import hashlib
+import json
+from typing import Optional
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from services import queries
+from services.async_neo4j_service import AsyncNeo4jService
+from routes.common import parse_batch_ids, parse_stream_format, StreamEncoder, STREAM_MEDIA_TYPES
+
+# Mismos endpoints y respuestas que routes/editor.py, servidos con AsyncNeo4jService
+editor_router = APIRouter(prefix='/api/editor')
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    return '*' in candidates or etag in [value[2:] if value.startswith('W/') else value for value in candidates]
+
+def conditional_json(request, result):
+    """Respuesta JSON con ETag y 304 ante un If-None-Match que coincide (como conditional_jsonify)"""
+    # Mismos bytes que jsonify (incluido el salto de línea final) para que el ETag coincida en ambos modos
+    body = json.dumps(result, sort_keys=True, separators=(',', ':')).encode('utf-8') + b'\n'
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type='application/json', headers=headers)
+
+async def streamed_json(cypher, stream_format):
+    records = AsyncNeo4jService.stream(cypher)
+    # Como en streamed_jsonify, los errores antes del primer registro siguen siendo un 500
+    try:
+        first = [await records.__anext__()]
+    except StopAsyncIteration:
+        first = []
+
+    async def generate():
+        encoder = StreamEncoder(stream_format)
+        try:
+            for record in first:
+                chunk = encoder.add(record)
+                if chunk:
+                    yield chunk
+            async for record in records:
+                chunk = encoder.add(record)
+                if chunk:
+                    yield chunk
+        except Exception as e:
+            print(f"Error en consulta Neo4j en streaming: {str(e)}")
+            yield encoder.error(f"Error de base de datos: {str(e)}")
+            return
+        yield encoder.finish()
+
+    return StreamingResponse(generate(), media_type=STREAM_MEDIA_TYPES[stream_format])
+
+async def query_json(request, method, cypher):
+    """Como query_jsonify: streaming bajo petición y, si no, respuesta cacheada con ETag"""
+    stream_format, error = parse_stream_format(request.query_params.get('stream'), request.headers.get('accept'))
+    if error:
+        return JSONResponse({'error': error}, status_code=400)
+    if stream_format:
+        return await streamed_json(cypher, stream_format)
+    return conditional_json(request, await method())
+
+async def request_ids(request):
+    is_json = request.headers.get('content-type', '').startswith('application/json')
+    body = None
+    if is_json:
+        try:
+            body = await request.json()
+        except ValueError:
+            pass
+    return parse_batch_ids(is_json, body, request.query_params.getlist('ids'))
+
+def missing_areas_error():
+    return JSONResponse({'error': 'Both "from" and "to" areas must be provided'}, status_code=400)
+
+@editor_router.get('/loots/{loot_id}/rooms')
+async def find_rooms_with_loot(loot_id: str):
+    return await AsyncNeo4jService.find_rooms_with_loot(loot_id)
+
+@editor_router.get('/rooms/{room_id}/monsters')
+async def get_monsters_in_room(room_id: str):
+    return await AsyncNeo4jService.get_monsters_in_room(room_id)
+
+@editor_router.api_route('/loots/rooms', methods=['GET', 'POST'])
+async def find_rooms_with_loots(request: Request):
+    loot_ids, error = await request_ids(request)
+    if error:
+        return JSONResponse({'error': error}, status_code=400)
+    return await AsyncNeo4jService.find_rooms_with_loots(loot_ids)
+
+@editor_router.api_route('/rooms/monsters', methods=['GET', 'POST'])
+async def get_monsters_in_rooms(request: Request):
+    room_ids, error = await request_ids(request)
+    if error:
+        return JSONResponse({'error': error}, status_code=400)
+    return await AsyncNeo4jService.get_monsters_in_rooms(room_ids)
+
+@editor_router.get('/monsters/unused')
+async def get_unused_monsters(request: Request):
+    return await query_json(request, AsyncNeo4jService.get_unused_monsters, queries.UNUSED_MONSTERS)
+
+@editor_router.get('/paths/shortest')
+async def get_shortest_path(from_area: Optional[str] = Query(None, alias='from'),
+                            to_area: Optional[str] = Query(None, alias='to')):
+    if not from_area or not to_area:
+        return missing_areas_error()
+    return await AsyncNeo4jService.get_shortest_path(from_area, to_area)
+
+@editor_router.get('/paths/enemies')
+async def get_enemies_in_path(from_area: Optional[str] = Query(None, alias='from'),
+                              to_area: Optional[str] = Query(None, alias='to')):
+    if not from_area or not to_area:
+        return missing_areas_error()
+    return await AsyncNeo4jService.get_enemies_in_path(from_area, to_area)
+
+@editor_router.get('/paths/areas')
+async def get_areas_in_path(from_area: Optional[str] = Query(None, alias='from'),
+                            to_area: Optional[str] = Query(None, alias='to')):
+    if not from_area or not to_area:
+        return missing_areas_error()
+    return await AsyncNeo4jService.get_areas_in_path(from_area, to_area)
+
+@editor_router.post('/areas/connections')
+async def create_area_connections():
+    return await AsyncNeo4jService.create_area_connections()
+
+@editor_router.get('/worldmap')
+async def get_world_map(request: Request):
+    return await query_json(request, AsyncNeo4jService.get_world_map, queries.WORLD_MAP)
+
+@editor_router.get('/dungeons/{dungeon_name}')
+async def get_dungeon(request: Request, dungeon_name: str):
+    rooms = await AsyncNeo4jService.get_dungeon(dungeon_name)
+    if not rooms:
+        return JSONResponse({'error': f'Dungeon "{dungeon_name}" not found'}, status_code=404)
+    return conditional_json(request, {'name': dungeon_name, 'rooms': rooms})
+
+@editor_router.get('/dungeons/{dungeon_name}/summary')
+async def get_dungeon_summary(request: Request, dungeon_name: str):
+    return conditional_json(request, await AsyncNeo4jService.get_dungeon_summary(dungeon_name))
+
+@editor_router.get('/dungeons/{dungeon_name}/gold')
+async def get_dungeon_gold(request: Request, dungeon_name: str):
+    return conditional_json(request, await AsyncNeo4jService.get_dungeon_gold(dungeon_name))
+
+@editor_router.get('/dungeons/{dungeon_name}/high-level-monsters')
+async def get_high_level_monsters(request: Request, dungeon_name: str):
+    return conditional_json(request, await AsyncNeo4jService.get_high_level_monsters(dungeon_name))
+
+@editor_router.get('/dungeons/{dungeon_name}/encounters')
+async def get_encounters_by_exp(request: Request, dungeon_name: str):
+    return conditional_json(request, await AsyncNeo4jService.get_encounters_by_exp(dungeon_name))
+
+@editor_router.get('/areas')
+async def get_all_areas(request: Request):
+    return await query_json(request, AsyncNeo4jService.get_all_areas, queries.ALL_AREAS)
+
+@editor_router.get('/dungeons')
+async def get_all_dungeons(request: Request):
+    return await query_json(request, AsyncNeo4jService.get_all_dungeons, queries.ALL_DUNGEONS)
@@ -0,0 +1,196 @@
+import asyncio
+import time
+from neo4j import AsyncGraphDatabase, READ_ACCESS
+from services import queries
+from services.neo4j_service import (
+    Neo4jConfig, WorldGraphConfig, QueryCacheConfig, build_world_graph, path_result,
+    enemies_in_path_result, group_by, dungeon_gold_result, dungeon_summary_result
+)
+from services.query_cache import QueryCache, cached_async_query
+
+class AsyncNeo4jService:
+    """
+    Versión asyncio de Neo4jService para el modo ASGI (asgi.py).
+
+    Usa el driver asíncrono de Neo4j con un pool de tamaño explícito; las lecturas van
+    por session.execute_read y las escrituras por execute_write, de modo que en un
+    clúster se enrutan al miembro adecuado y se reintentan ante errores transitorios.
+    Las consultas Cypher y el formato de los resultados son los del servicio síncrono.
+    """
+    _driver = None
+    query_cache = QueryCache(QueryCacheConfig.MAX_ENTRIES, QueryCacheConfig.TTL) if QueryCacheConfig.ENABLED else None
+    _world_graph = None
+    _world_graph_checked = None
+    _world_graph_lock = None
+
+    @classmethod
+    async def connect(cls):
+        """Crea el driver dentro del event loop del servidor (se llama al arrancar la app)"""
+        cls._world_graph_lock = asyncio.Lock()
+        for attempt in range(5):
+            driver = AsyncGraphDatabase.driver(
+                Neo4jConfig.URI,
+                auth=(Neo4jConfig.USER, Neo4jConfig.PASSWORD),
+                max_connection_pool_size=Neo4jConfig.POOL_SIZE,
+                connection_acquisition_timeout=Neo4jConfig.ACQUISITION_TIMEOUT
+            )
+            try:
+                await driver.verify_connectivity()
+                cls._driver = driver
+                print(f"Conexión asíncrona a Neo4j establecida en {Neo4jConfig.URI} "
+                      f"(pool de {Neo4jConfig.POOL_SIZE} conexiones)")
+                return
+            except Exception as e:
+                await driver.close()
+                print(f"Intento {attempt+1}: Error conectando a Neo4j: {str(e)}")
+                if attempt < 4:  # No dormir en el último intento
+                    await asyncio.sleep(5)
+        raise ConnectionError("No se pudo conectar a Neo4j después de 5 intentos")
+
+    @classmethod
+    async def close(cls):
+        if cls._driver is not None:
+            await cls._driver.close()
+            cls._driver = None
+
+    @classmethod
+    async def query(cls, cypher, params=None, write=False):
+        async def work(tx):
+            result = await tx.run(cypher, params or {})
+            return await result.data()
+
+        try:
+            async with cls._driver.session() as session:
+                if write:
+                    return await session.execute_write(work)
+                return await session.execute_read(work)
+        except Exception as e:
+            print(f"Error en consulta Neo4j: {str(e)}")
+            raise Exception(f"Error de base de datos: {str(e)}")
+
+    @classmethod
+    async def stream(cls, cypher, params=None, fetch_size=None):
+        """Generador asíncrono de los registros según llegan del cursor (ver Neo4jService.stream)"""
+        async with cls._driver.session(default_access_mode=READ_ACCESS,
+                                       fetch_size=fetch_size or Neo4jConfig.FETCH_SIZE) as session:
+            result = await session.run(cypher, params or {})
+            async for record in result:
+                yield record.data()
+
+    @classmethod
+    async def get_world_graph(cls):
+        if not WorldGraphConfig.ENABLED:
+            return None
+        checked = cls._world_graph_checked
+        if checked is None or time.monotonic() - checked >= WorldGraphConfig.CHECK_INTERVAL:
+            async with cls._world_graph_lock:
+                if cls._world_graph_checked == checked:
+                    await cls.refresh_world_graph()
+        return cls._world_graph
+
+    @classmethod
+    async def refresh_world_graph(cls):
+        rows = await cls.query(queries.WORLD_GRAPH)
+        # Precalcular las tablas de siguiente salto es CPU: fuera del event loop
+        cls._world_graph = await asyncio.to_thread(build_world_graph, cls._world_graph, rows)
+        cls._world_graph_checked = time.monotonic()
+
+    @classmethod
+    def invalidate_world_graph(cls):
+        cls._world_graph_checked = None
+
+    # Implementación de métodos específicos
+    @classmethod
+    async def find_rooms_with_loot(cls, loot_id):
+        return await cls.query(queries.ROOMS_WITH_LOOT, {"loot_id": loot_id})
+
+    @classmethod
+    async def get_monsters_in_room(cls, room_id):
+        return await cls.query(queries.MONSTERS_IN_ROOM, {"room_id": room_id})
+
+    @classmethod
+    async def find_rooms_with_loots(cls, loot_ids):
+        return group_by(await cls.query(queries.ROOMS_WITH_LOOTS, {"loot_ids": loot_ids}), "loot_id", "rooms")
+
+    @classmethod
+    async def get_monsters_in_rooms(cls, room_ids):
+        return group_by(await cls.query(queries.MONSTERS_IN_ROOMS, {"room_ids": room_ids}), "room_id", "monsters")
+
+    @classmethod
+    @cached_async_query("rooms", "monsters")
+    async def get_unused_monsters(cls):
+        return await cls.query(queries.UNUSED_MONSTERS)
+
+    @classmethod
+    async def get_shortest_path(cls, from_area, to_area):
+        world_graph = await cls.get_world_graph()
+        if world_graph is not None:
+            return path_result(world_graph, from_area, to_area, "path")
+        return await cls.query(queries.SHORTEST_PATH, {"from_area": from_area, "to_area": to_area})
+
+    @classmethod
+    async def get_enemies_in_path(cls, from_area, to_area):
+        world_graph = await cls.get_world_graph()
+        if world_graph is not None:
+            return enemies_in_path_result(world_graph, from_area, to_area)
+        return await cls.query(queries.ENEMIES_IN_PATH, {"from_area": from_area, "to_area": to_area})
+
+    @classmethod
+    async def get_areas_in_path(cls, from_area, to_area):
+        world_graph = await cls.get_world_graph()
+        if world_graph is not None:
+            return path_result(world_graph, from_area, to_area, "areas")
+        return await cls.query(queries.AREAS_IN_PATH, {"from_area": from_area, "to_area": to_area})
+
+    @classmethod
+    async def create_area_connections(cls):
+        result = await cls.query(queries.CREATE_AREA_CONNECTION, write=True)
+        if result:
+            cls.invalidate_world_graph()
+            if cls.query_cache is not None:
+                cls.query_cache.invalidate("areas")
+        return result
+
+    @classmethod
+    @cached_async_query("areas")
+    async def get_world_map(cls):
+        return await cls.query(queries.WORLD_MAP)
+
+    @classmethod
+    @cached_async_query("rooms", "loot")
+    async def get_dungeon_gold(cls, dungeon_name):
+        return dungeon_gold_result(await cls.query(queries.DUNGEON_GOLD, {"dungeon_name": dungeon_name}))
+
+    @classmethod
+    @cached_async_query("rooms", "monsters", "loot")
+    async def get_dungeon(cls, dungeon_name):
+        return await cls.query(queries.DUNGEON, {"dungeon_name": dungeon_name})
+
+    @classmethod
+    async def get_dungeon_summary(cls, dungeon_name):
+        """Las tres consultas del resumen se lanzan a la vez, cada una con su sesión del pool"""
+        return dungeon_summary_result(*await asyncio.gather(
+            cls.get_dungeon_gold(dungeon_name),
+            cls.get_high_level_monsters(dungeon_name),
+            cls.get_encounters_by_exp(dungeon_name)
+        ))
+
+    @classmethod
+    @cached_async_query("rooms", "monsters")
+    async def get_high_level_monsters(cls, dungeon_name):
+        return await cls.query(queries.HIGH_LEVEL_MONSTERS, {"dungeon_name": dungeon_name})
+
+    @classmethod
+    @cached_async_query("rooms", "monsters")
+    async def get_encounters_by_exp(cls, dungeon_name):
+        return await cls.query(queries.ENCOUNTERS_BY_EXP, {"dungeon_name": dungeon_name})
+
+    @classmethod
+    @cached_async_query("areas")
+    async def get_all_areas(cls):
+        return await cls.query(queries.ALL_AREAS)
+
+    @classmethod
+    @cached_async_query("rooms")
+    async def get_all_dungeons(cls):
+        return await cls.query(queries.ALL_DUNGEONS)
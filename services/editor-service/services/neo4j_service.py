@@ -1,14 +1,74 @@
 import os
 import time
-from neo4j import GraphDatabase
+import threading
+from neo4j import GraphDatabase, READ_ACCESS
+from services.world_graph import WorldGraph
+from services.query_cache import QueryCache, cached_query
+from services import queries
 
 class Neo4jConfig:
     URI = os.environ.get("NEO4J_URI", "bolt://neo4j:7687")
     USER = os.environ.get("NEO4J_USER", "neo4j")
     PASSWORD = os.environ.get("NEO4J_PASSWORD", "password")
+    # Conexiones máximas del pool del driver y segundos de espera por una conexión libre
+    POOL_SIZE = int(os.environ.get("NEO4J_POOL_SIZE", 50))
+    ACQUISITION_TIMEOUT = float(os.environ.get("NEO4J_POOL_TIMEOUT", 30))
+    # Registros que el driver pide a Neo4j en cada lote al leer un resultado en streaming
+    FETCH_SIZE = int(os.environ.get("NEO4J_FETCH_SIZE", 500))
+
+class WorldGraphConfig:
+    # Caminos entre áreas calculados en memoria en lugar de con shortestPath en Neo4j
+    ENABLED = os.environ.get("WORLD_GRAPH_CACHE", "true").lower() == "true"
+    # Segundos entre comprobaciones de si el grafo ha cambiado en Neo4j (escrituras de otros procesos)
+    CHECK_INTERVAL = float(os.environ.get("WORLD_GRAPH_CHECK_INTERVAL", 30))
+    # Máximo de áreas para precalcular las tablas de siguiente salto de todos los pares
+    ALL_PAIRS_MAX = int(os.environ.get("WORLD_GRAPH_ALL_PAIRS_MAX", 500))
+
+class QueryCacheConfig:
+    ENABLED = os.environ.get("EDITOR_CACHE", "true").lower() == "true"
+    MAX_ENTRIES = int(os.environ.get("EDITOR_CACHE_SIZE", 256))
+    # Segundos que un resultado se sirve sin volver a Neo4j (acota el retraso ante escrituras externas)
+    TTL = float(os.environ.get("EDITOR_CACHE_TTL", 30))
+
+def build_world_graph(current, rows):
+    """Reutiliza la instantánea actual si el contenido del grafo no ha cambiado"""
+    if current is not None and current.version == WorldGraph.version_of(rows):
+        return current
+    start = time.perf_counter()
+    world_graph = WorldGraph(rows, WorldGraphConfig.ALL_PAIRS_MAX)
+    print(f"Grafo de áreas cargado en memoria: {len(world_graph)} áreas en "
+          f"{time.perf_counter() - start:.3f}s")
+    return world_graph
+
+def path_result(world_graph, from_area, to_area, field):
+    path = world_graph.shortest_path(from_area, to_area)
+    return [{field: path}] if path else []
+
+def enemies_in_path_result(world_graph, from_area, to_area):
+    path = world_graph.shortest_path(from_area, to_area) or []
+    return [{"area_name": area, "enemies": world_graph.enemies[area]}
+            for area in path if world_graph.enemies[area]]
+
+def group_by(rows, key, field):
+    """{id: lista} a partir de las filas de una consulta UNWIND $ids ... collect()"""
+    return {row[key]: row[field] for row in rows}
+
+def dungeon_gold_result(rows):
+    return rows if rows else [{"total_gold": 0}]
+
+def dungeon_summary_result(gold, high_level_monsters, encounters):
+    return {
+        "total_gold": gold[0]["total_gold"],
+        "high_level_monsters": high_level_monsters,
+        "encounters": encounters
+    }
 
 class Neo4jService:
     _driver = None
+    query_cache = QueryCache(QueryCacheConfig.MAX_ENTRIES, QueryCacheConfig.TTL) if QueryCacheConfig.ENABLED else None
+    _world_graph = None
+    _world_graph_checked = None
+    _world_graph_lock = threading.Lock()
 
     @classmethod
     def get_driver(cls):
@@ -17,7 +77,9 @@ class Neo4jService:
                 try:
                     cls._driver = GraphDatabase.driver(
                         Neo4jConfig.URI,
-                        auth=(Neo4jConfig.USER, Neo4jConfig.PASSWORD)
+                        auth=(Neo4jConfig.USER, Neo4jConfig.PASSWORD),
+                        max_connection_pool_size=Neo4jConfig.POOL_SIZE,
+                        connection_acquisition_timeout=Neo4jConfig.ACQUISITION_TIMEOUT
                     )
                     # Verificación activa de conexión
                     with cls._driver.session() as session:
@@ -40,107 +102,146 @@ class Neo4jService:
                 result = session.run(cypher, params or {})
                 return [record.data() for record in result]
         except Exception as e:
-            app.logger.error(f"Error en consulta Neo4j: {str(e)}")
+            print(f"Error en consulta Neo4j: {str(e)}")
             # Re-lanzar como error HTTP 500 con detalles
             raise Exception(f"Error de base de datos: {str(e)}")
 
+    @classmethod
+    def stream(cls, cypher, params=None, fetch_size=None):
+        """
+        Generador de los registros de una consulta de lectura según llegan del cursor, sin
+        materializar la lista: el driver los pide en lotes de fetch_size. La sesión se
+        cierra al agotar o cerrar el generador.
+        """
+        driver = cls.get_driver()
+        with driver.session(default_access_mode=READ_ACCESS,
+                            fetch_size=fetch_size or Neo4jConfig.FETCH_SIZE) as session:
+            for record in session.run(cypher, params or {}):
+                yield record.data()
+
+    @classmethod
+    def get_world_graph(cls):
+        """
+        Instantánea del grafo de áreas, o None si está desactivada. Se carga en la primera
+        consulta de caminos y, pasado CHECK_INTERVAL, se vuelve a leer y solo se
+        reconstruye si su contenido ha cambiado.
+        """
+        if not WorldGraphConfig.ENABLED:
+            return None
+        checked = cls._world_graph_checked
+        if checked is None or time.monotonic() - checked >= WorldGraphConfig.CHECK_INTERVAL:
+            with cls._world_graph_lock:
+                if cls._world_graph_checked == checked:
+                    cls.refresh_world_graph()
+        return cls._world_graph
+
+    @classmethod
+    def refresh_world_graph(cls):
+        rows = cls.query(queries.WORLD_GRAPH)
+        cls._world_graph = build_world_graph(cls._world_graph, rows)
+        cls._world_graph_checked = time.monotonic()
+
+    @classmethod
+    def invalidate_world_graph(cls):
+        """Fuerza la comprobación del grafo en la siguiente consulta de caminos"""
+        with cls._world_graph_lock:
+            cls._world_graph_checked = None
+
     # Implementación de métodos específicos
     @classmethod
     def find_rooms_with_loot(cls, loot_id):
-        query = """
-        MATCH (l:Loot {id: $loot_id})<-[:CONTAINS]-(r:Room)
-        RETURN r.id AS room_id, r.name AS room_name, r.description AS room_description
-        """
-        return cls.query(query, {"loot_id": loot_id})
+        return cls.query(queries.ROOMS_WITH_LOOT, {"loot_id": loot_id})
 
     @classmethod
     def get_monsters_in_room(cls, room_id):
-        query = """
-        MATCH (r:Room {id: $room_id})-[:HAS]->(m:Monster)
-        RETURN m.id AS monster_id, m.name AS monster_name, m.level AS monster_level
-        """
-        return cls.query(query, {"room_id": room_id})
+        return cls.query(queries.MONSTERS_IN_ROOM, {"room_id": room_id})
 
     @classmethod
+    def find_rooms_with_loots(cls, loot_ids):
+        """Salas de cada tesoro en una sola consulta: {loot_id: [salas]} (lista vacía si no hay)"""
+        return group_by(cls.query(queries.ROOMS_WITH_LOOTS, {"loot_ids": loot_ids}), "loot_id", "rooms")
+
+    @classmethod
+    def get_monsters_in_rooms(cls, room_ids):
+        """Monstruos de cada sala en una sola consulta: {room_id: [monstruos]} (lista vacía si no hay)"""
+        return group_by(cls.query(queries.MONSTERS_IN_ROOMS, {"room_ids": room_ids}), "room_id", "monsters")
+
+    @classmethod
+    @cached_query("rooms", "monsters")
     def get_unused_monsters(cls):
-        query = """
-        MATCH (m:Monster)
-        WHERE NOT (m)<-[:HAS]-()
-        RETURN m.id AS monster_id, m.name AS monster_name, m.level AS monster_level
-        """
-        return cls.query(query)
+        return cls.query(queries.UNUSED_MONSTERS)
 
     @classmethod
     def get_shortest_path(cls, from_area, to_area):
-        query = """
-        MATCH path = shortestPath((a1:Area {name: $from_area})-[:CONNECTS_TO*]-(a2:Area {name: $to_area}))
-        RETURN [node in nodes(path) | node.name] AS path
-        """
-        return cls.query(query, {"from_area": from_area, "to_area": to_area})
+        world_graph = cls.get_world_graph()
+        if world_graph is not None:
+            return path_result(world_graph, from_area, to_area, "path")
+        return cls.query(queries.SHORTEST_PATH, {"from_area": from_area, "to_area": to_area})
 
     @classmethod
     def get_enemies_in_path(cls, from_area, to_area):
-        query = """
-        MATCH path = shortestPath((a1:Area {name: $from_area})-[:CONNECTS_TO*]-(a2:Area {name: $to_area}))
-        MATCH (a)-[:CONTAINS]->(e:Enemy)
-        WHERE a IN nodes(path)
-        RETURN a.name AS area_name, collect(e.name) AS enemies
-        """
-        return cls.query(query, {"from_area": from_area, "to_area": to_area})
+        world_graph = cls.get_world_graph()
+        if world_graph is not None:
+            return enemies_in_path_result(world_graph, from_area, to_area)
+        return cls.query(queries.ENEMIES_IN_PATH, {"from_area": from_area, "to_area": to_area})
 
     @classmethod
     def get_areas_in_path(cls, from_area, to_area):
-        query = """
-        MATCH path = shortestPath((a1:Area {name: $from_area})-[:CONNECTS_TO*]-(a2:Area {name: $to_area}))
-        RETURN [node in nodes(path) | node.name] AS areas
-        """
-        return cls.query(query, {"from_area": from_area, "to_area": to_area})
+        world_graph = cls.get_world_graph()
+        if world_graph is not None:
+            return path_result(world_graph, from_area, to_area, "areas")
+        return cls.query(queries.AREAS_IN_PATH, {"from_area": from_area, "to_area": to_area})
 
     @classmethod
     def create_area_connections(cls):
-        query = """
-        MATCH (a1:Area), (a2:Area)
-        WHERE a1 <> a2 AND NOT (a1)-[:CONNECTS_TO]-(a2)
-        WITH a1, a2 LIMIT 1
-        CREATE (a1)-[:CONNECTS_TO]->(a2)
-        RETURN a1.name AS from_area, a2.name AS to_area
-        """
-        return cls.query(query)
+        result = cls.query(queries.CREATE_AREA_CONNECTION)
+        if result:
+            cls.invalidate_world_graph()
+            if cls.query_cache is not None:
+                cls.query_cache.invalidate("areas")
+        return result
 
     @classmethod
+    @cached_query("areas")
     def get_world_map(cls):
-        query = """
-        MATCH (a:Area)
-        OPTIONAL MATCH (a)-[c:CONNECTS_TO]->(b:Area)
-        RETURN a.name AS area, collect(b.name) AS connected_areas
-        """
-        return cls.query(query)
+        return cls.query(queries.WORLD_MAP)
 
     @classmethod
+    @cached_query("rooms", "loot")
     def get_dungeon_gold(cls, dungeon_name):
-        query = """
-        MATCH (r:Room {dungeon_name: $dungeon_name})-[:CONTAINS]->(l:Loot)
-        RETURN sum(l.value) AS total_gold
-        """
-        result = cls.query(query, {"dungeon_name": dungeon_name})
-        return result if result else [{"total_gold": 0}]
+        return dungeon_gold_result(cls.query(queries.DUNGEON_GOLD, {"dungeon_name": dungeon_name}))
 
     @classmethod
+    @cached_query("rooms", "monsters", "loot")
+    def get_dungeon(cls, dungeon_name):
+        """Salas de una mazmorra con sus monstruos y tesoros, en una sola consulta"""
+        return cls.query(queries.DUNGEON, {"dungeon_name": dungeon_name})
+
+    @classmethod
+    def get_dungeon_summary(cls, dungeon_name):
+        """Oro, monstruos de más nivel y encuentros de una mazmorra (tres consultas seguidas)"""
+        return dungeon_summary_result(
+            cls.get_dungeon_gold(dungeon_name),
+            cls.get_high_level_monsters(dungeon_name),
+            cls.get_encounters_by_exp(dungeon_name)
+        )
+
+    @classmethod
+    @cached_query("rooms", "monsters")
     def get_high_level_monsters(cls, dungeon_name):
-        query = """
-        MATCH (r:Room {dungeon_name: $dungeon_name})-[:HAS]->(m:Monster)
-        WITH max(m.level) AS max_level
-        MATCH (r:Room {dungeon_name: $dungeon_name})-[:HAS]->(m:Monster {level: max_level})
-        RETURN r.name AS room_name, m.name AS monster_name, m.level AS monster_level
-        """
-        return cls.query(query, {"dungeon_name": dungeon_name})
+        return cls.query(queries.HIGH_LEVEL_MONSTERS, {"dungeon_name": dungeon_name})
 
     @classmethod
+    @cached_query("rooms", "monsters")
     def get_encounters_by_exp(cls, dungeon_name):
-        query = """
-        MATCH (r:Room {dungeon_name: $dungeon_name})-[:HAS]->(m:Monster)
-        WITH r, sum(m.exp) AS total_exp
-        RETURN r.name AS room_name, total_exp
-        ORDER BY total_exp DESC
-        """
-        return cls.query(query, {"dungeon_name": dungeon_name})
+        return cls.query(queries.ENCOUNTERS_BY_EXP, {"dungeon_name": dungeon_name})
+
+    @classmethod
+    @cached_query("areas")
+    def get_all_areas(cls):
+        return cls.query(queries.ALL_AREAS)
+
+    @classmethod
+    @cached_query("rooms")
+    def get_all_dungeons(cls):
+        return cls.query(queries.ALL_DUNGEONS)
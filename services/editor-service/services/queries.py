@@ -0,0 +1,99 @@
+# Consultas Cypher del editor, compartidas por Neo4jService (Flask) y AsyncNeo4jService (ASGI)
+
+ROOMS_WITH_LOOT = """
+MATCH (l:Loot {id: $loot_id})<-[:CONTAINS]-(r:Room)
+RETURN r.id AS room_id, r.name AS room_name, r.description AS room_description
+"""
+
+MONSTERS_IN_ROOM = """
+MATCH (r:Room {id: $room_id})-[:HAS]->(m:Monster)
+RETURN m.id AS monster_id, m.name AS monster_name, m.level AS monster_level
+"""
+
+ROOMS_WITH_LOOTS = """
+UNWIND $loot_ids AS loot_id
+OPTIONAL MATCH (l:Loot {id: loot_id})<-[:CONTAINS]-(r:Room)
+RETURN loot_id, collect(r {room_id: r.id, room_name: r.name, room_description: r.description}) AS rooms
+"""
+
+MONSTERS_IN_ROOMS = """
+UNWIND $room_ids AS room_id
+OPTIONAL MATCH (r:Room {id: room_id})-[:HAS]->(m:Monster)
+RETURN room_id, collect(m {monster_id: m.id, monster_name: m.name, monster_level: m.level}) AS monsters
+"""
+
+UNUSED_MONSTERS = """
+MATCH (m:Monster)
+WHERE NOT (m)<-[:HAS]-()
+RETURN m.id AS monster_id, m.name AS monster_name, m.level AS monster_level
+"""
+
+SHORTEST_PATH = """
+MATCH path = shortestPath((a1:Area {name: $from_area})-[:CONNECTS_TO*]-(a2:Area {name: $to_area}))
+RETURN [node in nodes(path) | node.name] AS path
+"""
+
+ENEMIES_IN_PATH = """
+MATCH path = shortestPath((a1:Area {name: $from_area})-[:CONNECTS_TO*]-(a2:Area {name: $to_area}))
+MATCH (a)-[:CONTAINS]->(e:Enemy)
+WHERE a IN nodes(path)
+RETURN a.name AS area_name, collect(e.name) AS enemies
+"""
+
+AREAS_IN_PATH = """
+MATCH path = shortestPath((a1:Area {name: $from_area})-[:CONNECTS_TO*]-(a2:Area {name: $to_area}))
+RETURN [node in nodes(path) | node.name] AS areas
+"""
+
+WORLD_GRAPH = """
+MATCH (a:Area)
+OPTIONAL MATCH (a)-[:CONNECTS_TO]->(b:Area)
+WITH a, collect(b.name) AS connected_areas
+OPTIONAL MATCH (a)-[:CONTAINS]->(e:Enemy)
+RETURN a.name AS area, connected_areas, collect(e.name) AS enemies
+"""
+
+CREATE_AREA_CONNECTION = """
+MATCH (a1:Area), (a2:Area)
+WHERE a1 <> a2 AND NOT (a1)-[:CONNECTS_TO]-(a2)
+WITH a1, a2 LIMIT 1
+CREATE (a1)-[:CONNECTS_TO]->(a2)
+RETURN a1.name AS from_area, a2.name AS to_area
+"""
+
+WORLD_MAP = """
+MATCH (a:Area)
+OPTIONAL MATCH (a)-[c:CONNECTS_TO]->(b:Area)
+RETURN a.name AS area, collect(b.name) AS connected_areas
+"""
+
+DUNGEON_GOLD = """
+MATCH (r:Room {dungeon_name: $dungeon_name})-[:CONTAINS]->(l:Loot)
+RETURN sum(l.value) AS total_gold
+"""
+
+DUNGEON = """
+MATCH (r:Room {dungeon_name: $dungeon_name})
+RETURN r.id AS room_id, r.name AS room_name, r.description AS room_description,
+       [(r)-[:HAS]->(m:Monster) | m {monster_id: m.id, monster_name: m.name, monster_level: m.level}] AS monsters,
+       [(r)-[:CONTAINS]->(l:Loot) | l {loot_id: l.id, loot_name: l.name, loot_value: l.value}] AS loot
+ORDER BY room_id
+"""
+
+HIGH_LEVEL_MONSTERS = """
+MATCH (r:Room {dungeon_name: $dungeon_name})-[:HAS]->(m:Monster)
+WITH max(m.level) AS max_level
+MATCH (r:Room {dungeon_name: $dungeon_name})-[:HAS]->(m:Monster {level: max_level})
+RETURN r.name AS room_name, m.name AS monster_name, m.level AS monster_level
+"""
+
+ENCOUNTERS_BY_EXP = """
+MATCH (r:Room {dungeon_name: $dungeon_name})-[:HAS]->(m:Monster)
+WITH r, sum(m.exp) AS total_exp
+RETURN r.name AS room_name, total_exp
+ORDER BY total_exp DESC
+"""
+
+ALL_AREAS = "MATCH (a:Area) RETURN a.name AS name"
+
+ALL_DUNGEONS = "MATCH (r:Room) RETURN DISTINCT r.dungeon_name AS name"
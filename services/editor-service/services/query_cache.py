@@ -0,0 +1,93 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class QueryCache:
+    """
+    Caché LRU con TTL para los resultados de las consultas de Neo4jService.
+
+    Cada entrada se guarda con los grupos de datos de los que depende (áreas, salas,
+    monstruos...), de modo que una escritura invalida solo las consultas afectadas. El
+    TTL acota cuánto tarda en verse una escritura hecha por otro proceso.
+    """
+
+    def __init__(self, max_entries=256, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value, groups):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, frozenset(groups), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *groups):
+        """Elimina las entradas que dependen de alguno de los grupos indicados"""
+        groups = set(groups)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[1] & groups]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def cached_query(*groups):
+    """
+    Decorador para los métodos de consulta de Neo4jService (bajo @classmethod): guarda el
+    resultado en cls.query_cache con el nombre del método y sus parámetros como clave.
+    Los resultados cacheados se comparten entre peticiones y no deben modificarse.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(cls, *args):
+            cache = cls.query_cache
+            if cache is None:
+                return method(cls, *args)
+            key = (method.__name__,) + args
+            result = cache.get(key)
+            if result is _MISSING:
+                result = method(cls, *args)
+                cache.set(key, result, groups)
+            return result
+        return wrapper
+    return decorator
+
+def cached_async_query(*groups):
+    """Equivalente de cached_query para los métodos corrutina de AsyncNeo4jService"""
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(cls, *args):
+            cache = cls.query_cache
+            if cache is None:
+                return await method(cls, *args)
+            key = (method.__name__,) + args
+            result = cache.get(key)
+            if result is _MISSING:
+                result = await method(cls, *args)
+                cache.set(key, result, groups)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,79 @@
+import hashlib
+import json
+from array import array
+from collections import deque
+
+class WorldGraph:
+    """
+    Instantánea en memoria del grafo de áreas (Area y CONNECTS_TO) con los enemigos de cada área.
+
+    Las conexiones se tratan como no dirigidas, igual que el patrón -[:CONNECTS_TO*]- de
+    las consultas de caminos. Si el mapa tiene como mucho all_pairs_max áreas se
+    precalcula, para cada área destino, la tabla de siguiente salto de todas las demás
+    (un BFS por destino); un camino se reconstruye entonces siguiendo la tabla, sin
+    recorrer el grafo. Con mapas más grandes se hace un BFS por consulta.
+    """
+
+    def __init__(self, rows, all_pairs_max=500):
+        rows = [row for row in rows if row["area"] is not None]
+        self.version = self.version_of(rows)
+        self.names = sorted({row["area"] for row in rows})
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.enemies = {name: [] for name in self.names}
+        neighbors = [set() for _ in self.names]
+        for row in rows:
+            source = self.index[row["area"]]
+            self.enemies[row["area"]].extend(enemy for enemy in row["enemies"] if enemy is not None)
+            for name in row["connected_areas"]:
+                target = self.index.get(name)
+                if target is not None and target != source:
+                    neighbors[source].add(target)
+                    neighbors[target].add(source)
+        self.neighbors = [sorted(adjacent) for adjacent in neighbors]
+        self.next_hop = None
+        if len(self.names) <= all_pairs_max:
+            self.next_hop = [self._bfs(target) for target in range(len(self.names))]
+
+    @staticmethod
+    def version_of(rows):
+        """Huella del contenido del grafo, independiente del orden de las filas"""
+        canonical = sorted(
+            (row["area"], sorted(name for name in row["connected_areas"] if name is not None),
+             sorted(enemy for enemy in row["enemies"] if enemy is not None))
+            for row in rows if row["area"] is not None
+        )
+        return hashlib.sha1(json.dumps(canonical).encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return len(self.names)
+
+    def _bfs(self, target):
+        # hops[u] es el vecino de u por el que se llega antes a target (-1 si no hay camino)
+        hops = array("i", [-1]) * len(self.names)
+        hops[target] = target
+        pending = deque([target])
+        while pending:
+            node = pending.popleft()
+            for neighbor in self.neighbors[node]:
+                if hops[neighbor] < 0:
+                    hops[neighbor] = node
+                    pending.append(neighbor)
+        return hops
+
+    def shortest_path(self, from_area, to_area):
+        """
+        Nombres de las áreas de un camino más corto entre dos áreas, o None si alguna no
+        existe, no están conectadas o son la misma (shortestPath necesita al menos una
+        relación y no admite el mismo nodo como inicio y fin).
+        """
+        source = self.index.get(from_area)
+        target = self.index.get(to_area)
+        if source is None or target is None or source == target:
+            return None
+        hops = self.next_hop[target] if self.next_hop is not None else self._bfs(target)
+        if hops[source] < 0:
+            return None
+        path = [source]
+        while path[-1] != target:
+            path.append(hops[path[-1]])
+        return [self.names[node] for node in path]